@@ -0,0 +1,82 @@
+"""
+Micro-benchmark of the JSON codecs.
+
+Measures, for every codec whose backend is installed:
+
+* loads: decoding an outage payload into dicts
+* from_dict: decoding it into `Outage` instances with lazy dates through
+  dicts, like `OutageService.get_outages(lazy=True)`
+* typed: decoding it straight into `Outage` instances, for codecs that decode
+  models
+* dumps: encoding the rows posted to a site
+
+Usage:
+    python -m benchmarks.bench_codec --outages 100000
+"""
+import argparse
+import json
+import time
+from typing import Callable, Dict, List
+
+from benchmarks.bench_parse import make_outages
+from src.codec import JsonCodec, get_available_codecs, get_codec
+from src.model import Outage
+
+
+def measure(func: Callable[[], None], repeat: int) -> float:
+    """
+    :return: fastest time of `repeat` runs, in seconds
+    :rtype: float
+    """
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def from_dicts(codec: JsonCodec, payload: bytes) -> List[Outage]:
+    return [Outage.from_dict(outage, True) for outage in codec.loads(payload)]
+
+
+def main() -> Dict[str, Dict[str, float]]:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--outages", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    outages = make_outages(args.outages)
+    payload = json.dumps(outages).encode()
+    rows = [dict(outage, name="Battery 1") for outage in outages]
+    rows_size = len(get_codec("json").dumps(rows))
+    megabytes = len(payload) / 1e6
+    print(
+        f"{len(outages)} outages, {megabytes:.1f} MB payload, "
+        f"{rows_size / 1e6:.1f} MB of rows"
+    )
+
+    results = {}
+    for name in get_available_codecs():
+        codec = get_codec(name)
+        cases = {
+            "loads": (lambda: codec.loads(payload), len(payload)),
+            "from_dict": (lambda: from_dicts(codec, payload), len(payload)),
+            "dumps": (lambda: codec.dumps(rows), rows_size),
+        }
+        if codec.decodes_models:
+            cases["typed"] = (
+                lambda: codec.decode(payload, List[Outage]), len(payload))
+        results[name] = {}
+        for case, (func, size) in cases.items():
+            seconds = measure(func, args.repeat)
+            results[name][case] = size / seconds / 1e6
+            print(
+                f"{name:>8} {case:>9}: {size / seconds / 1e6:8.1f} MB/s "
+                f"{len(outages) / seconds:12.0f} outages/s"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measures memory per outage of `Outage` against `CompactOutage`, including
+the strings kept alive by the models once the decoded JSON is released.
+
+Usage:
+    python -m benchmarks.bench_memory --outages 100000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+from typing import Callable, Dict
+
+from benchmarks.bench_parse import make_outages
+from src.compact_model import CompactOutage
+from src.model import Outage
+
+
+def measure(payload: bytes, parse: Callable[[Dict], object]) -> float:
+    """
+    :return: bytes allocated per outage by the parsed models
+    :rtype: float
+    """
+    gc.collect()
+    tracemalloc.start()
+    outages = [parse(outage) for outage in json.loads(payload)]
+    gc.collect()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current / len(outages)
+
+
+def main() -> Dict[str, float]:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--outages", type=int, default=100000)
+    parser.add_argument("--devices", type=int, default=1000)
+    args = parser.parse_args()
+
+    payload = json.dumps(make_outages(args.outages, args.devices)).encode()
+    cases = {
+        "Outage": Outage.from_dict,
+        "Outage (lazy)": lambda outage: Outage.from_dict(outage, True),
+        "CompactOutage": CompactOutage.from_dict,
+        "CompactOutage (no intern)": (
+            lambda outage: CompactOutage.from_dict(outage, False)),
+    }
+
+    results = {}
+    for name, parse in cases.items():
+        results[name] = measure(payload, parse)
+        print(f"{name:>26}: {results[name]:8.1f} bytes/outage")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmarks overlap queries of a device with OutageIndex against a linear scan
+of the outage list.
+
+Usage:
+    python -m benchmarks.bench_outage_index --outages 1000000 --queries 100
+"""
+import argparse
+import random
+import time
+from typing import Dict
+
+from benchmarks.bench_parse import make_outages
+from src.compact_model import CompactOutage
+from src.outage_index import OutageIndex
+
+DAY_MS = 24 * 60 * 60 * 1000
+
+
+def main() -> Dict[str, float]:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--outages", type=int, default=1000000)
+    parser.add_argument("--devices", type=int, default=1000)
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    outages = [
+        CompactOutage.from_dict(outage)
+        for outage in make_outages(args.outages, args.devices)
+    ]
+    rnd = random.Random(0)
+    queries = [
+        (rnd.choice(outages).id, begin, begin + 7 * DAY_MS)
+        for begin in (
+            rnd.choice(outages).begin_ms for _ in range(args.queries))
+    ]
+
+    started = time.perf_counter()
+    index = OutageIndex(outages)
+    build_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    expected = [
+        [
+            outage for outage in outages
+            if outage.id == device_id
+            and outage.begin_ms <= end and outage.end_ms >= start
+        ]
+        for device_id, start, end in queries
+    ]
+    scan_seconds = (time.perf_counter() - started) / args.queries
+
+    started = time.perf_counter()
+    found = [
+        index.overlapping(start, end, device_id)
+        for device_id, start, end in queries
+    ]
+    index_seconds = (time.perf_counter() - started) / args.queries
+
+    assert all(
+        sorted(result, key=id) == sorted(scan, key=id)
+        for result, scan in zip(found, expected)
+    )
+    print(f"{'build':>12}: {build_seconds * 1000:10.1f} ms")
+    print(f"{'scan':>12}: {scan_seconds * 1000:10.3f} ms/query")
+    print(f"{'index':>12}: {index_seconds * 1000:10.3f} ms/query")
+    print(f"{'speedup':>12}: {scan_seconds / index_seconds:10.0f}x")
+    return {
+        "build": build_seconds,
+        "scan": scan_seconds,
+        "index": index_seconds,
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Benchmarks filtering outages of a site with `filter_outages` against the
+vectorized OutageTable filter.
+
+Usage:
+    python -m benchmarks.bench_outage_table --outages 1000000
+"""
+import argparse
+import time
+from typing import Dict
+
+from benchmarks.bench_parse import make_outages
+from main import filter_outages
+from src.model import Device, Outage
+from src.outage_filter import OutageFilter
+from src.outage_table import OutageTable, parse_epoch_ms
+
+START_DATE = "2022-01-01T00:00:00.000Z"
+
+
+def main() -> Dict[str, float]:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--outages", type=int, default=1000000)
+    parser.add_argument("--devices", type=int, default=10000)
+    parser.add_argument("--site-devices", type=int, default=200)
+    args = parser.parse_args()
+
+    outage_dicts = make_outages(args.outages, args.devices)
+    device_ids = sorted({outage["id"] for outage in outage_dicts})
+    devices = [
+        Device(id=device_id, name=f"Device {device_id}")
+        for device_id in device_ids[:args.site_devices]
+    ]
+
+    outages = [Outage.from_dict(outage) for outage in outage_dicts]
+    table = OutageTable.from_dicts(outage_dicts)
+    start_ms = int(parse_epoch_ms([START_DATE])[0])
+
+    started = time.perf_counter()
+    expected = filter_outages(outages, devices, START_DATE)
+    list_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    mask = table.mask(device_ids[:args.site_devices], start_ms)
+    mask_seconds = time.perf_counter() - started
+
+    started = time.perf_counter()
+    rows = OutageFilter(devices, START_DATE).apply_table(table)
+    table_seconds = time.perf_counter() - started
+
+    assert len(rows) == len(expected) == int(mask.sum())
+    print(f"{'filter_outages':>24}: {list_seconds * 1000:10.1f} ms")
+    print(f"{'OutageTable.mask':>24}: {mask_seconds * 1000:10.1f} ms")
+    print(f"{'OutageFilter.apply_table':>24}: {table_seconds * 1000:10.1f} ms")
+    print(f"{'speedup (mask)':>24}: {list_seconds / mask_seconds:10.1f}x")
+    print(f"{'speedup (rows)':>24}: {list_seconds / table_seconds:10.1f}x")
+    return {
+        "filter_outages": list_seconds,
+        "mask": mask_seconds,
+        "apply_table": table_seconds,
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Micro-benchmark of outage timestamp parsing.
+
+Compares `dateutil.parser.parse`, which `Outage.from_dict` used before, with
+`parse_datetime`, with lazy `Outage.from_dict` and with `parse_outages` on
+`--workers` processes.
+
+Usage:
+    python -m benchmarks.bench_parse --outages 100000 --workers 4
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List
+
+import dateutil.parser as dt_parser
+
+from src.model import Outage, parse_datetime
+from src.parallel_parse import parse_outages
+
+
+def make_outages(
+    n_outages: int,
+    n_devices: int = 1000,
+    seed: int = 0
+) -> List[Dict[str, str]]:
+    """
+    :return: outage dictionaries in the format of the Outage API
+    :rtype: List[Dict[str, str]]
+    """
+    rnd = random.Random(seed)
+    device_ids = ["%08x" % rnd.randrange(16 ** 8) for _ in range(n_devices)]
+    start = datetime(2020, 1, 1, tzinfo=timezone.utc)
+    outages = []
+    for _ in range(n_outages):
+        begin = start + timedelta(milliseconds=rnd.randrange(10 ** 11))
+        end = begin + timedelta(milliseconds=rnd.randrange(10 ** 9))
+        outages.append({
+            "id": rnd.choice(device_ids),
+            "begin": begin.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+            "end": end.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",
+        })
+    return outages
+
+
+def measure(func: Callable[[], None], n_items: int) -> float:
+    """
+    :return: items per second
+    :rtype: float
+    """
+    started = time.perf_counter()
+    func()
+    return n_items / (time.perf_counter() - started)
+
+
+def main() -> Dict[str, float]:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--outages", type=int, default=100000)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    outages = make_outages(args.outages)
+    timestamps = [outage["begin"] for outage in outages]
+
+    cases = {
+        "dateutil.parser.parse": (
+            lambda: [dt_parser.parse(value) for value in timestamps],
+            len(timestamps)),
+        "parse_datetime": (
+            lambda: [parse_datetime(value) for value in timestamps],
+            len(timestamps)),
+        "Outage.from_dict": (
+            lambda: [Outage.from_dict(outage) for outage in outages],
+            len(outages)),
+        "Outage.from_dict(lazy)": (
+            lambda: [Outage.from_dict(outage, True) for outage in outages],
+            len(outages)),
+        f"parse_outages({args.workers})": (
+            lambda: parse_outages(
+                outages, args.workers, -(-len(outages) // args.workers)),
+            len(outages)),
+    }
+
+    results = {}
+    for name, (func, n_items) in cases.items():
+        results[name] = measure(func, n_items)
+        print(f"{name:>24}: {results[name]:12.0f} items/s")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Benchmarks connection reuse of Requester against a local stub server.
+
+Compares a fresh session per request (the previous behaviour, reproduced by
+closing the requester after every call) with the pooled session.
+
+Usage:
+    python -m benchmarks.bench_requester --requests 500
+"""
+import argparse
+import time
+from typing import Dict, Tuple
+
+from src.requester import Requester
+from src.stub_server import StubData, StubServer
+
+
+def run_case(
+    server: StubServer,
+    n_requests: int,
+    pooled: bool
+) -> Tuple[int, float]:
+    """
+    :return: number of connections opened and requests per second
+    :rtype: Tuple[int, float]
+    """
+    connections = server.connections
+    requester = Requester(server.url, server.api_key)
+    started = time.perf_counter()
+    for _ in range(n_requests):
+        requester.get("site-info/site-0000")
+        if not pooled:
+            requester.close()
+    elapsed = time.perf_counter() - started
+    requester.close()
+
+    return server.connections - connections, n_requests / elapsed
+
+
+def main() -> Dict[str, Dict[str, float]]:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    args = parser.parse_args()
+
+    results = {}
+    with StubServer(StubData.generate(n_outages=0)) as server:
+        for name, pooled in (("per-call session", False), ("pooled", True)):
+            connections, rps = run_case(server, args.requests, pooled)
+            results[name] = {"connections": connections, "rps": rps}
+            print(
+                f"{name:>16}: {connections:5d} connections, "
+                f"{rps:9.1f} requests/s"
+            )
+    return results
+
+
+if __name__ == "__main__":
+    main()
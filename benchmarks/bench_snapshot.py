@@ -0,0 +1,78 @@
+"""
+Micro-benchmark of outage table snapshots.
+
+Measures writing a snapshot, loading it and filtering the loaded table by
+devices and dates, and compares loading with decoding the same outages from
+JSON into a table, which is measured on at most `--json-outages` outages and
+scaled up.
+
+Usage:
+    python -m benchmarks.bench_snapshot --outages 1000000
+"""
+import argparse
+import json
+import os
+import tempfile
+from typing import Dict
+
+import numpy as np
+
+from benchmarks.bench_codec import measure
+from benchmarks.bench_parse import make_outages
+from src.outage_table import OutageTable
+from src.snapshot import load_snapshot, write_snapshot
+
+
+def make_table(count: int, devices: int = 1000, seed: int = 0) -> OutageTable:
+    """
+    :return: table of `count` random outages of `devices` devices
+    :rtype: OutageTable
+    """
+    rng = np.random.default_rng(seed)
+    begin = rng.integers(1_600_000_000_000, 1_650_000_000_000, count)
+    return OutageTable(
+        [f"{index:08x}" for index in range(devices)],
+        rng.integers(0, devices, count).astype(np.int32),
+        begin,
+        begin + rng.integers(1000, 86_400_000, count)
+    )
+
+
+def main() -> Dict[str, float]:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--outages", type=int, default=1000000)
+    parser.add_argument("--json-outages", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    table = make_table(args.outages)
+    devices = table.device_ids[::2]
+    start_ms = 1_620_000_000_000
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "outages.snap")
+        results = {
+            "write": measure(
+                lambda: write_snapshot(path, table), args.repeat),
+            "load": measure(lambda: load_snapshot(path), args.repeat),
+        }
+        loaded = load_snapshot(path)
+        results["mask"] = measure(
+            lambda: loaded.mask(devices, start_ms), args.repeat)
+        size = os.path.getsize(path)
+
+    json_outages = min(args.outages, args.json_outages)
+    payload = json.dumps(make_outages(json_outages)).encode()
+    results["json"] = measure(
+        lambda: OutageTable.from_dicts(json.loads(payload)), 1
+    ) * args.outages / json_outages
+
+    print(f"{args.outages} outages, {size / 1e6:.1f} MB snapshot")
+    for case, seconds in results.items():
+        print(f"{case:>6}: {seconds * 1000:10.2f} ms")
+    print(f"load is {results['json'] / results['load']:.0f}x faster than json")
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,226 @@
+"""
+End-to-end benchmark suite of the pipeline in `main.py`, with regression
+tracking.
+
+Every stage is measured in isolation at several data scales, and the full
+`main.run` is measured against the local stub server:
+
+* json_decode: `json.loads` of the `GET /outages` body
+* outage_from_dict: `Outage.from_dict` of every outage
+* site_info_from_dict: `SiteInfo.from_dict` of every site
+* filter_outages: `filter_outages` for the devices of a site
+* post_serialization: encoding the POST body like `requests` does
+* run: `main.run` for a site, including HTTP
+
+Results are written as JSON and can be compared with a previous run; stages
+whose minimum time, the statistic least affected by noise, grew by more than
+`--threshold` are reported as regressions and make the command exit with 1.
+
+Usage:
+    python -m benchmarks.suite --scales 1000 10000 100000 \\
+        --output results.json
+    python -m benchmarks.suite --output new.json --compare results.json \\
+        --threshold 0.1
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List
+from unittest import mock
+
+from requests.models import PreparedRequest
+
+import main as app
+from src.model import Outage, SiteInfo
+from src.stub_server import StubData, StubServer
+
+START_DATE = "2022-01-01T00:00:00.000Z"
+SITE_ID = "site-0000"
+
+Results = Dict[str, Dict[str, Dict[str, float]]]
+
+
+def measure(func: Callable[[], Any], repeat: int) -> Dict[str, float]:
+    """
+    :return: minimum and median seconds of `repeat` calls of `func`
+    :rtype: Dict[str, float]
+    """
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return {"min": min(timings), "median": statistics.median(timings)}
+
+
+def run_main(server: StubServer) -> None:
+    """
+    Runs `main.run` for SITE_ID in a temporary directory whose credential
+    file points at the stub server
+    """
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.mkdir(os.path.join(directory, "assets"))
+        credentials = os.path.join(directory, "assets", "credentials.json")
+        with open(credentials, "w") as fp:
+            json.dump({"api_url": server.url, "api_key": server.api_key}, fp)
+
+        argv = ["main.py", "--site-id", SITE_ID, "--start-date", START_DATE]
+        os.chdir(directory)
+        try:
+            with mock.patch.object(sys, "argv", argv):
+                app.run()
+        finally:
+            os.chdir(cwd)
+
+
+def run_scale(n_outages: int, repeat: int) -> Dict[str, Dict[str, float]]:
+    """
+    :return: timings of every stage for `n_outages` outages
+    :rtype: Dict[str, Dict[str, float]]
+    """
+    data = StubData.generate(
+        n_devices=max(100, n_outages // 100),
+        n_sites=100,
+        n_outages=n_outages,
+        devices_per_site=50
+    )
+    body = json.dumps(data.outages).encode()
+    outage_dicts = json.loads(body)
+    outages = [Outage.from_dict(outage) for outage in outage_dicts]
+    site_dicts = list(data.sites.values())
+    site_info = SiteInfo.from_dict(data.sites[SITE_ID])
+    post_body = app.filter_outages(outages, site_info.devices, START_DATE)
+
+    def serialize() -> None:
+        request = PreparedRequest()
+        request.prepare_headers({})
+        request.prepare_body(data=None, files=None, json=post_body)
+
+    stages = {
+        "json_decode": lambda: json.loads(body),
+        "outage_from_dict": lambda: [
+            Outage.from_dict(outage) for outage in outage_dicts],
+        "site_info_from_dict": lambda: [
+            SiteInfo.from_dict(site) for site in site_dicts],
+        "filter_outages": lambda: app.filter_outages(
+            outages, site_info.devices, START_DATE),
+        "post_serialization": serialize,
+    }
+    results = {
+        name: measure(func, repeat) for name, func in stages.items()}
+
+    with StubServer(data) as server:
+        results["run"] = measure(lambda: run_main(server), repeat)
+    return results
+
+
+def get_metadata() -> Dict[str, str]:
+    """
+    :return: python version, platform, time and git commit of the run
+    :rtype: Dict[str, str]
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = ""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "time": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+    }
+
+
+def compare(
+    results: Results,
+    baseline: Results,
+    threshold: float
+) -> List[str]:
+    """
+    Prints a comparison of the minimum times with the baseline
+
+    :param results: results of this run, by scale and stage
+    :type results: Results
+    :param baseline: results of a previous run, by scale and stage
+    :type baseline: Results
+    :param threshold: relative slowdown reported as a regression, i.e. 0.1
+        for 10%
+    :type threshold: float
+    :return: names of regressed stages as "<scale>/<stage>"
+    :rtype: List[str]
+    """
+    regressions = []
+    print(f"{'stage':>32} {'baseline':>12} {'current':>12} {'change':>8}")
+    for scale, stages in results.items():
+        for stage, timing in stages.items():
+            previous = baseline.get(scale, {}).get(stage)
+            if previous is None:
+                continue
+            change = timing["min"] / previous["min"] - 1
+            regressed = change > threshold
+            if regressed:
+                regressions.append(f"{scale}/{stage}")
+            print(
+                f"{scale + '/' + stage:>32} "
+                f"{previous['min'] * 1000:10.2f}ms "
+                f"{timing['min'] * 1000:10.2f}ms "
+                f"{change:+8.1%}{'  REGRESSION' if regressed else ''}"
+            )
+    return regressions
+
+
+def main() -> Results:
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--scales", type=int, nargs="+", default=[1000, 10000, 100000],
+        help="numbers of outages to run the suite with")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--output", help="file to write the results to")
+    parser.add_argument(
+        "--compare", help="results file of a previous run to compare with")
+    parser.add_argument(
+        "--threshold", type=float, default=0.1,
+        help="relative slowdown reported as a regression, i.e. 0.1 for 10%%")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    results = {}
+    for n_outages in args.scales:
+        results[str(n_outages)] = stages = run_scale(n_outages, args.repeat)
+        for stage, timing in stages.items():
+            print(
+                f"{n_outages:>8} {stage:>20}: "
+                f"{timing['median'] * 1000:10.2f} ms median, "
+                f"{timing['min'] * 1000:10.2f} ms min"
+            )
+
+    if args.output:
+        with open(args.output, "w") as fp:
+            json.dump(
+                {"metadata": get_metadata(), "results": results},
+                fp, indent=2)
+
+    if args.compare:
+        with open(args.compare) as fp:
+            baseline = json.load(fp)["results"]
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("Regressions: " + ", ".join(regressions))
+            sys.exit(1)
+    return results
+
+
+if __name__ == "__main__":
+    main()
@@ -1,44 +1,142 @@
 """
 Main process of retrieving, calculating, and sending outages
+
+Only the standard library and light modules are imported at load time, so
+that `--help` and short runs do not pay for `requests`, NumPy or dateutil.
+Everything else is imported by the functions that need it.
 """
+from __future__ import annotations
+
 import argparse
+import json
 import logging
 import sys
-from typing import Dict, List
-
-import dateutil.parser as dt_parser
+import tempfile
+from contextlib import ExitStack
+from datetime import datetime, timedelta, timezone
+from typing import (
+    TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union)
 
 from src.credential_manager import CredentialManager
-from src.model import Device, Outage
-from src.outage_service import OutageService
-from src.requester import Requester
+from src.instrumentation import (
+    NO_INSTRUMENTATION, Instrumentation, MetricsRecorder)
+from src.response_cache import ResponseCache
+from src.scheduler import FileLock, Scheduler
+
+if TYPE_CHECKING:
+    from src.codec import JsonCodec
+    from src.compact_model import CompactOutage
+    from src.model import Device, Outage, SiteInfo
+    from src.outage_filter import OutageFilter
+    from src.outage_service import OutageService
+    from src.outage_table import OutageTable
+    from src.sync_state import SyncState
+    from src.throttle import Throttle
+
+    Outages = Union[
+        List[Outage], List[CompactOutage], Iterator[Outage], OutageTable]
 
 logging.basicConfig(stream=sys.stdout, level=logging.INFO)
 LOG = logging.getLogger(__name__)
 
 
-def get_outage_service() -> OutageService:
+def get_outage_service(
+    pool_maxsize: int = 10,
+    cache: Optional[ResponseCache] = None,
+    throttle: Optional[Throttle] = None,
+    instrumentation: Instrumentation = NO_INSTRUMENTATION,
+    site_info_max_age: Optional[float] = None,
+    compression: Optional[str] = None,
+    compression_threshold: int = 1024,
+    accept_encoding: Optional[str] = None,
+    codec: Optional[JsonCodec] = None,
+    count_transfer: bool = False,
+    page_size: Optional[int] = None,
+    page_workers: int = 4,
+    timeout: Optional[Tuple[float, float]] = None
+) -> OutageService:
     """
+    :param pool_maxsize: maximum number of pooled connections. Defaults to 10
+    :type pool_maxsize: int
+    :param cache: cache of get responses. Defaults to None
+    :type cache: Optional[ResponseCache]
+    :param throttle: throttle shared by all API calls. Defaults to None
+    :type throttle: Optional[Throttle]
+    :param instrumentation: instrumentation of API calls and stages.
+        Defaults to no instrumentation
+    :type instrumentation: Instrumentation
+    :param site_info_max_age: seconds site infos are reused for. Defaults to
+        None, which means they are always retrieved
+    :type site_info_max_age: Optional[float]
+    :param compression: content encoding of large post bodies, gzip or br.
+        Defaults to None, which means they are not compressed
+    :type compression: Optional[str]
+    :param compression_threshold: minimum size of compressed post bodies, in
+        bytes. Defaults to 1024
+    :type compression_threshold: int
+    :param accept_encoding: Accept-Encoding header of the requests. Defaults
+        to None, which leaves the default of requests
+    :type accept_encoding: Optional[str]
+    :param codec: JSON codec of the requests. Defaults to None, which means
+        the `json` module through requests
+    :type codec: Optional[JsonCodec]
+    :param count_transfer: whether the bytes sent and received are counted.
+        Defaults to False
+    :type count_transfer: bool
+    :param page_size: number of outages per page. Defaults to None, which
+        means outages are retrieved in a single request
+    :type page_size: Optional[int]
+    :param page_workers: maximum number of pages retrieved concurrently.
+        Defaults to 4
+    :type page_workers: int
+    :param timeout: connect and read timeouts of the requests, in seconds.
+        Defaults to None, which means waiting forever
+    :type timeout: Optional[Tuple[float, float]]
     :return: outage service instance
     :rtype: OutageService
     """
+    from src.outage_service import OutageService
+    from src.requester import Requester
+
     credential_manager = CredentialManager("assets/credentials.json")
     api_url = credential_manager.get_api_url()
     api_key = credential_manager.get_api_key()
-    requester = Requester(api_url, api_key)
-    return OutageService(requester)
+    requester = Requester(
+        api_url,
+        api_key,
+        pool_maxsize=pool_maxsize,
+        cache=cache,
+        throttle=throttle,
+        instrumentation=instrumentation,
+        compression=compression,
+        compression_threshold=compression_threshold,
+        accept_encoding=accept_encoding,
+        codec=codec,
+        timeout=timeout,
+        count_transfer=count_transfer
+    )
+    return OutageService(
+        requester,
+        site_info_max_age,
+        page_size=page_size,
+        page_workers=page_workers
+    )
 
 
 def filter_outages(
     outages: List[Outage],
     devices: List[Device],
-    start_date: str
+    start_date: str,
+    end_date: Optional[str] = None,
+    min_duration: Optional[timedelta] = None
 ) -> List[Dict]:
     """
     Applies the filter to the outages to select corresponding outages.
 
     * Select outages that belong to devices of the site.
     * Select outages that begin after START_DATE
+    * Select outages that end before END_DATE, if given
+    * Select outages that last at least MIN_DURATION, if given
 
     :param outages: list of outages
     :type outages: List[Outage]
@@ -46,21 +144,17 @@ def filter_outages(
     :type devices: List[Devices]
     :param start_date: start date where outages should begin after this date
     :type start_date: str
+    :param end_date: end date where outages should end before this date
+    :type end_date: Optional[str]
+    :param min_duration: minimum duration of the selected outages
+    :type min_duration: Optional[timedelta]
     :return: List of outage body dictionaries
     :rtype: List[Dict]
     """
-    valid_devices = {device.id: device.name for device in devices}
-    return [
-        {
-            "id": outage.id,
-            "name": valid_devices[outage.id],
-            "begin": outage.begin,
-            "end": outage.end
-        }
-        for outage in outages
-        if outage.begin_datetime >= dt_parser.parse(start_date)
-        and outage.id in valid_devices
-    ]
+    from src.outage_filter import OutageFilter
+
+    outage_filter = OutageFilter(devices, start_date, end_date, min_duration)
+    return outage_filter.apply(outages)
 
 
 def parse_args() -> argparse.Namespace:
@@ -69,43 +163,884 @@ def parse_args() -> argparse.Namespace:
     :rtype: argparse.Namespace
     """
     parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "command",
+        nargs="?",
+        choices=["post", "stats"],
+        default="post",
+        help=(
+            "post: post the outages of the site (default). stats: compute "
+            "downtime and availability of the site and its devices between "
+            "--start-date and --end-date (or now)"
+        )
+    )
     parser.add_argument("--site-id", default="norwich-pear-tree")
     parser.add_argument("--start-date", default="2022-01-01T00:00:00.000Z")
+    parser.add_argument("--end-date")
+    parser.add_argument(
+        "--min-duration",
+        type=float,
+        help="minimum outage duration in seconds"
+    )
+    parser.add_argument(
+        "--site-ids",
+        nargs="+",
+        help="process many sites in one run instead of --site-id"
+    )
+    parser.add_argument(
+        "--sites-file",
+        help="file with one site id per line, processed like --site-ids"
+    )
+    parser.add_argument("--max-workers", type=int, default=8)
+    parser.add_argument(
+        "--dedupe",
+        action="store_true",
+        help="drop exact duplicates of the selected outages before posting"
+    )
+    parser.add_argument(
+        "--coalesce",
+        action="store_true",
+        help=(
+            "merge overlapping or adjacent selected outages of a device "
+            "before posting"
+        )
+    )
+    parser.add_argument(
+        "--chunk-rows",
+        type=int,
+        help="post outages in chunks of at most this many rows"
+    )
+    parser.add_argument(
+        "--chunk-bytes",
+        type=int,
+        help="post outages in chunks of at most this many bytes"
+    )
+    parser.add_argument(
+        "--post-workers",
+        type=int,
+        default=4,
+        help="maximum number of chunks posted concurrently per site"
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="post only outages that are new or changed since the last run"
+    )
+    parser.add_argument(
+        "--state-file",
+        default="assets/sync_state.sqlite3",
+        help="state of incremental runs"
+    )
+    parser.add_argument(
+        "--lookback",
+        type=float,
+        default=86400,
+        help=(
+            "seconds before the watermark that are checked again in "
+            "incremental runs"
+        )
+    )
+    parser.add_argument(
+        "--cache-dir",
+        help="cache get responses in this directory and revalidate them"
+    )
+    parser.add_argument(
+        "--cache-max-bytes",
+        type=int,
+        default=256 * 1024 * 1024
+    )
+    parser.add_argument(
+        "--cache-ttl",
+        type=float,
+        help="seconds to serve cached responses that have no validators"
+    )
+    parser.add_argument(
+        "--connect-timeout",
+        type=float,
+        default=10,
+        help="seconds to wait for a connection to the Outage API"
+    )
+    parser.add_argument(
+        "--read-timeout",
+        type=float,
+        default=60,
+        help=(
+            "seconds to wait for every read of an Outage API response, "
+            "after which the request fails"
+        )
+    )
+    parser.add_argument(
+        "--rate-limit",
+        type=float,
+        help="maximum number of API requests per second"
+    )
+    parser.add_argument(
+        "--burst",
+        type=int,
+        default=1,
+        help="number of requests that can exceed --rate-limit at once"
+    )
+    parser.add_argument(
+        "--adaptive-concurrency",
+        action="store_true",
+        help=(
+            "adapt the number of concurrent API requests to 429/5xx "
+            "responses and retry them with jittered backoff"
+        )
+    )
+    parser.add_argument(
+        "--compress",
+        choices=["gzip", "br"],
+        help=(
+            "compress post bodies of at least --compress-threshold bytes "
+            "with this encoding (br needs the brotli package)"
+        )
+    )
+    parser.add_argument(
+        "--compress-threshold",
+        type=int,
+        default=1024,
+        help="minimum size of compressed post bodies, in bytes"
+    )
+    parser.add_argument(
+        "--accept-encoding",
+        nargs="+",
+        help=(
+            "encodings API responses may be compressed with, among gzip, "
+            "deflate and br (with the brotli package), or identity for "
+            "uncompressed responses. Defaults to all of them"
+        )
+    )
+    parser.add_argument(
+        "--transfer-metrics",
+        action="store_true",
+        help=(
+            "log the bytes sent and received on the wire and before "
+            "compression or after decompression (always with --compress)"
+        )
+    )
+    parser.add_argument(
+        "--json-codec",
+        choices=["auto", "json", "orjson", "msgspec"],
+        default="auto",
+        help=(
+            "JSON codec of API requests. auto uses msgspec or orjson if "
+            "installed and the json module otherwise"
+        )
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help=(
+            "keep running and repeat every --interval seconds, posting only "
+            "new or changed outages (implies --incremental)"
+        )
+    )
+    parser.add_argument(
+        "--interval",
+        type=float,
+        default=300,
+        help="seconds between the starts of two --watch cycles"
+    )
+    parser.add_argument(
+        "--jitter",
+        type=float,
+        default=0,
+        help="maximum random seconds added to the wait between cycles"
+    )
+    parser.add_argument(
+        "--lock-file",
+        help=(
+            "skip cycles while another process holds this lock file, i.e. "
+            "another watcher or a cron run"
+        )
+    )
+    parser.add_argument(
+        "--site-info-max-age",
+        type=float,
+        default=3600,
+        help="seconds site infos are reused for in --watch mode"
+    )
+    parser.add_argument(
+        "--top",
+        type=int,
+        default=10,
+        help="number of devices with the most downtime listed by stats"
+    )
+    parser.add_argument(
+        "--post-stats",
+        action="store_true",
+        help="post the statistics computed by stats to the Outage API"
+    )
+    parser.add_argument(
+        "--metrics-file",
+        help=(
+            "write timings of the stages and API calls of the run and "
+            "outage counts to this file"
+        )
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=["prometheus", "json"],
+        default="prometheus",
+        help="format of --metrics-file"
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="decode and filter outages while they are downloaded"
+    )
+    parser.add_argument(
+        "--compact",
+        action="store_true",
+        help="keep outages in memory-compact objects"
+    )
+    parser.add_argument(
+        "--parse-workers",
+        type=int,
+        help=(
+            "parse the dates of large outage payloads with this many "
+            "processes"
+        )
+    )
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="keep outages in a columnar table and filter with NumPy"
+    )
+    parser.add_argument(
+        "--page-size",
+        type=int,
+        help=(
+            "retrieve outages in pages of this many outages, with the page "
+            "and page_size params of the Outage API"
+        )
+    )
+    parser.add_argument(
+        "--page-workers",
+        type=int,
+        default=4,
+        help="maximum number of outage pages retrieved concurrently"
+    )
+    parser.add_argument(
+        "--push-down-start-date",
+        action="store_true",
+        help=(
+            "retrieve only outages beginning after --start-date (or the "
+            "watermark in incremental runs), with the begin_from param of "
+            "the Outage API"
+        )
+    )
+    parser.add_argument(
+        "--snapshot",
+        help=(
+            "load outages from this snapshot instead of the Outage API "
+            "(implies --columnar)"
+        )
+    )
+    parser.add_argument(
+        "--write-snapshot",
+        help=(
+            "write the retrieved outages to this snapshot (implies "
+            "--columnar)"
+        )
+    )
     known_args, _ = parser.parse_known_args()
     return known_args
 
 
-def run() -> None:
+def read_site_ids(args: argparse.Namespace) -> List[str]:
     """
-    Runs the main process:
+    Collects site ids of a batch run from --site-ids and --sites-file.
+    Blank lines and lines starting with `#` in the sites file are ignored.
 
-    * Retrieves outages
-    * Gets the site info of SITE_ID
-    * Filters outages based on devices of the particular site and START_DATE
-    * Attaches device name and posts the outages of SITE_ID
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :return: site ids in the given order, empty if not a batch run
+    :rtype: List[str]
     """
-    args = parse_args()
-    site_id, start_date = args.site_id, args.start_date
-    LOG.info("Start with arguments: %s", args)
+    site_ids = list(args.site_ids or [])
+    if args.sites_file:
+        with open(args.sites_file, "r") as fp:
+            site_ids.extend(
+                line.strip() for line in fp
+                if line.strip() and not line.lstrip().startswith("#")
+            )
+    return site_ids
+
+
+def make_outage_filter(
+    devices: List[Device],
+    args: argparse.Namespace,
+    start_date: Optional[str] = None
+) -> OutageFilter:
+    """
+    :param devices: list of devices corresponding to the site
+    :type devices: List[Devices]
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :param start_date: start date overriding --start-date
+    :type start_date: Optional[str]
+    :return: outage filter of the site built from the filter arguments
+    :rtype: OutageFilter
+    """
+    from src.outage_filter import OutageFilter
+
+    min_duration = None
+    if args.min_duration is not None:
+        min_duration = timedelta(seconds=args.min_duration)
+    return OutageFilter(
+        devices,
+        start_date or args.start_date,
+        args.end_date,
+        min_duration
+    )
+
+
+def get_begin_from(
+    site_ids: List[str],
+    args: argparse.Namespace,
+    sync_state: Optional[SyncState] = None
+) -> Optional[str]:
+    """
+    :param site_ids: identifiers of the sites the outages are retrieved for
+    :type site_ids: List[str]
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :param sync_state: state of incremental runs, None for full runs
+    :type sync_state: Optional[SyncState]
+    :return: date from which outages are retrieved with
+        --push-down-start-date, which is the earliest start date of the
+        sites, None otherwise
+    :rtype: Optional[str]
+    """
+    if not args.push_down_start_date:
+        return None
+    if sync_state is None or not site_ids:
+        return args.start_date
+
+    from src.model import parse_datetime, to_epoch_ms
+
+    return min(
+        (
+            sync_state.get_start_date(site_id, args.start_date)
+            for site_id in site_ids
+        ),
+        key=lambda start_date: to_epoch_ms(parse_datetime(start_date))
+    )
+
+
+def get_outage_table(
+    outage_service: OutageService,
+    args: argparse.Namespace,
+    begin_from: Optional[str] = None
+) -> OutageTable:
+    """
+    :param outage_service: outage service instance
+    :type outage_service: OutageService
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :param begin_from: if given, only outages beginning at or after this
+        date are retrieved from the Outage API. Defaults to None
+    :type begin_from: Optional[str]
+    :return: outages of --snapshot if it is given, otherwise of the Outage
+        API, which are written to --write-snapshot if it is given
+    :rtype: OutageTable
+    """
+    if args.snapshot:
+        table = outage_service.load_snapshot(args.snapshot)
+        LOG.info("Loaded %s outages from %s", len(table), args.snapshot)
+        return table
+    if args.write_snapshot:
+        table = outage_service.save_snapshot(args.write_snapshot, begin_from)
+        LOG.info("Wrote %s outages to %s", len(table), args.write_snapshot)
+        return table
+    return outage_service.get_outage_table(begin_from)
+
+
+def get_outages(
+    outage_service: OutageService,
+    args: argparse.Namespace,
+    begin_from: Optional[str] = None
+) -> Outages:
+    """
+    :param outage_service: outage service instance
+    :type outage_service: OutageService
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :param begin_from: if given, only outages beginning at or after this
+        date are retrieved (see `get_begin_from`). Defaults to None
+    :type begin_from: Optional[str]
+    :return: outages, as a columnar table if --columnar or a snapshot is
+        given, as an iterator over the response stream if --stream is given
+        or as compact outages if --compact is given
+    :rtype: Outages
+    """
+    if args.columnar or args.snapshot or args.write_snapshot:
+        return get_outage_table(outage_service, args, begin_from)
+    if args.stream:
+        return outage_service.iter_outages(begin_from=begin_from)
+    if args.compact:
+        return outage_service.get_compact_outages(begin_from=begin_from)
+    return outage_service.get_outages(
+        workers=args.parse_workers, begin_from=begin_from)
+
 
-    outage_service = get_outage_service()
+def select_outages(
+    outage_filter: OutageFilter,
+    outages: Outages
+) -> List[Dict]:
+    """
+    :param outage_filter: outage filter of the site
+    :type outage_filter: OutageFilter
+    :param outages: outages as returned by `get_outages`
+    :type outages: Outages
+    :return: List of outage body dictionaries
+    :rtype: List[Dict]
+    """
+    if isinstance(outages, (list, Iterator)):
+        return outage_filter.apply(outages)
+    # anything else is an OutageTable, which is not imported to check it so
+    # that runs without --columnar do not import NumPy
+    return outage_filter.apply_table(outages)
+
+
+def select_site_outages(
+    site_id: str,
+    site_info: SiteInfo,
+    outages: Outages,
+    args: argparse.Namespace,
+    sync_state: Optional[SyncState] = None,
+    instrumentation: Instrumentation = NO_INSTRUMENTATION
+) -> List[Dict]:
+    """
+    Selects the outages to post to the site. With --dedupe and --coalesce,
+    duplicates are dropped and overlapping outages of a device are merged
+    (see `normalize`). In incremental runs, filtering starts from the
+    watermark of the site and outages that have already been posted are
+    dropped.
 
-    site_info = outage_service.get_site_info(site_id)
+    :param site_id: site identifier
+    :type site_id: str
+    :param site_info: site information
+    :type site_info: SiteInfo
+    :param outages: outages as returned by `get_outages`
+    :type outages: Outages
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :param sync_state: state of incremental runs, None for full runs
+    :type sync_state: Optional[SyncState]
+    :param instrumentation: instrumentation of the run. Defaults to no
+        instrumentation
+    :type instrumentation: Instrumentation
+    :return: List of outage body dictionaries
+    :rtype: List[Dict]
+    """
+    start_date = args.start_date
+    if sync_state is not None:
+        start_date = sync_state.get_start_date(site_id, start_date)
+
+    outage_filter = make_outage_filter(site_info.devices, args, start_date)
+    with instrumentation.stage("select"):
+        selected = select_outages(outage_filter, outages)
+
+    if args.dedupe or args.coalesce:
+        from src.normalize import normalize
+
+        with instrumentation.stage("normalize"):
+            result = normalize(selected, args.dedupe, args.coalesce)
+        selected = result.rows
+        LOG.info(
+            "Site %s: removed %s duplicate and %s coalesced outages",
+            site_id,
+            result.duplicates,
+            result.coalesced
+        )
+        instrumentation.count("outages_duplicates", result.duplicates)
+        instrumentation.count("outages_coalesced", result.coalesced)
+
+    if sync_state is not None:
+        candidates = len(selected)
+        selected = sync_state.select_unposted(site_id, selected)
+        LOG.info(
+            "Site %s: %s of %s outages since %s are new or changed",
+            site_id,
+            len(selected),
+            candidates,
+            start_date
+        )
+    instrumentation.count("outages_selected", len(selected))
+    return selected
+
+
+def post_outages(
+    outage_service: OutageService,
+    site_id: str,
+    outages: List[Dict],
+    args: argparse.Namespace,
+    sync_state: Optional[SyncState] = None
+) -> None:
+    """
+    Posts outages of the site at once, or in chunks if --chunk-rows or
+    --chunk-bytes is given. In incremental runs, posted outages are recorded
+    once they have been posted. If some chunks fail, the outages of the
+    other chunks are recorded without advancing the watermark, so the next
+    run posts only the failed ones.
+
+    :param outage_service: outage service instance
+    :type outage_service: OutageService
+    :param site_id: site identifier
+    :type site_id: str
+    :param outages: list of outage body dictionaries
+    :type outages: List[Dict]
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :param sync_state: state of incremental runs, None for full runs
+    :type sync_state: Optional[SyncState]
+    :raises: `RuntimeError` if any chunk could not be posted
+    """
+    if sync_state is not None and not outages:
+        LOG.info("Nothing to post for site %s", site_id)
+        return
+
+    if args.chunk_rows is None and args.chunk_bytes is None:
+        outage_service.post_outages_to_site(site_id, outages)
+        if sync_state is not None:
+            sync_state.record_posted(site_id, outages)
+        return
+
+    results = outage_service.post_outages_in_chunks(
+        site_id,
+        outages,
+        max_rows=args.chunk_rows,
+        max_bytes=args.chunk_bytes,
+        max_workers=args.post_workers
+    )
+    failed = [result for result in results if not result.ok]
+    for result in failed:
+        LOG.error(
+            "Chunk %s (%s rows) of site %s failed after %s attempts: %s",
+            result.index,
+            result.rows,
+            site_id,
+            result.attempts,
+            result.error
+        )
+    if sync_state is not None:
+        sync_state.record_posted(
+            site_id,
+            [
+                outage for result in results if result.ok
+                for outage in result.outages
+            ],
+            advance_watermark=not failed
+        )
+    if failed:
+        raise RuntimeError(
+            f"{len(failed)} of {len(results)} chunks of site {site_id} "
+            "could not be posted"
+        )
+    LOG.info("Posted %s chunks for site %s", len(results), site_id)
+
+
+def run_site(
+    outage_service: OutageService,
+    site_id: str,
+    args: argparse.Namespace,
+    sync_state: Optional[SyncState] = None
+) -> None:
+    """
+    Runs the main process for a single site
+
+    :param outage_service: outage service instance
+    :type outage_service: OutageService
+    :param site_id: site identifier
+    :type site_id: str
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :param sync_state: state of incremental runs, None for full runs
+    :type sync_state: Optional[SyncState]
+    """
+    instrumentation = outage_service.instrumentation
+    with instrumentation.stage("get_site_info"):
+        site_info = outage_service.get_site_info(site_id)
     LOG.info(
         "Retrieved site info of site %s. Number of devices: %s",
         site_id,
         len(site_info.devices)
     )
 
-    outages = outage_service.get_outages()
-    LOG.info("Retrieved %s outages", len(outages))
+    begin_from = get_begin_from([site_id], args, sync_state)
+    with instrumentation.stage("get_outages"):
+        outages = get_outages(outage_service, args, begin_from)
+    if not args.stream:
+        LOG.info("Retrieved %s outages", len(outages))
+        instrumentation.count("outages_retrieved", len(outages))
 
-    outages = filter_outages(outages, site_info.devices, start_date)
+    outages = select_site_outages(
+        site_id, site_info, outages, args, sync_state, instrumentation)
 
     LOG.info("Posting %s outages for site %s", len(outages), site_id)
-    outage_service.post_outages_to_site(site_id, outages)
+    with instrumentation.stage("post"):
+        post_outages(outage_service, site_id, outages, args, sync_state)
+    instrumentation.count("outages_posted", len(outages))
     LOG.info("Posted successfully")
 
 
+def run_batch(
+    outage_service: OutageService,
+    site_ids: List[str],
+    args: argparse.Namespace,
+    sync_state: Optional[SyncState] = None
+) -> None:
+    """
+    Runs the main process for many sites. Outages are retrieved only once and
+    shared by all sites, which are then processed concurrently.
+
+    :param outage_service: outage service instance
+    :type outage_service: OutageService
+    :param site_ids: site identifiers
+    :type site_ids: List[str]
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :param sync_state: state of incremental runs, None for full runs
+    :type sync_state: Optional[SyncState]
+    """
+    if args.stream:
+        LOG.warning("--stream is ignored, outages are shared by all sites")
+        args = argparse.Namespace(**dict(vars(args), stream=False))
+
+    instrumentation = outage_service.instrumentation
+    begin_from = get_begin_from(site_ids, args, sync_state)
+    with instrumentation.stage("get_outages"):
+        outages = get_outages(outage_service, args, begin_from)
+    LOG.info("Retrieved %s outages", len(outages))
+    instrumentation.count("outages_retrieved", len(outages))
+
+    def select_batch_outages(site_info: SiteInfo) -> List[Dict]:
+        selected = select_site_outages(
+            site_info.id,
+            site_info,
+            outages,
+            args,
+            sync_state,
+            instrumentation
+        )
+        LOG.info(
+            "Posting %s outages for site %s (%s devices)",
+            len(selected),
+            site_info.id,
+            len(site_info.devices)
+        )
+        return selected
+
+    def post_batch_outages(site_id: str, selected: List[Dict]) -> None:
+        with instrumentation.stage("post"):
+            post_outages(outage_service, site_id, selected, args, sync_state)
+        instrumentation.count("outages_posted", len(selected))
+
+    posted = outage_service.post_outages_to_sites(
+        site_ids,
+        select_batch_outages,
+        max_workers=args.max_workers,
+        post_outages=post_batch_outages
+    )
+    LOG.info(
+        "Posted %s outages to %s sites successfully",
+        sum(posted.values()),
+        len(posted)
+    )
+
+
+def run_stats(
+    outage_service: OutageService,
+    site_ids: List[str],
+    args: argparse.Namespace
+) -> List[Dict]:
+    """
+    Computes downtime and availability statistics of the sites and their
+    devices between --start-date and --end-date, or now if it is not given.
+    The statistics of every site are printed as JSON, and posted if
+    --post-stats is given.
+
+    :param outage_service: outage service instance
+    :type outage_service: OutageService
+    :param site_ids: site identifiers
+    :type site_ids: List[str]
+    :param args: application arguments
+    :type args: argparse.Namespace
+    :return: statistics of every site, with the --top devices
+    :rtype: List[Dict]
+    """
+    from src.model import parse_datetime, to_epoch_ms
+    from src.outage_stats import compute_site_stats
+
+    instrumentation = outage_service.instrumentation
+    end_datetime = (
+        parse_datetime(args.end_date) if args.end_date
+        else datetime.now(timezone.utc)
+    )
+    start_ms = to_epoch_ms(parse_datetime(args.start_date))
+    end_ms = to_epoch_ms(end_datetime)
+
+    with instrumentation.stage("get_outages"):
+        table = get_outage_table(outage_service, args)
+    LOG.info("Retrieved %s outages", len(table))
+
+    results = []
+    for site_id in site_ids:
+        with instrumentation.stage("get_site_info"):
+            site_info = outage_service.get_site_info(site_id)
+        with instrumentation.stage("stats"):
+            site_stats = compute_site_stats(
+                table, site_info, start_ms, end_ms)
+        stats = site_stats.to_dict(top=args.top)
+        LOG.info(
+            "Site %s: %s outages, %s ms downtime, availability %s%%",
+            site_id,
+            site_stats.outage_count,
+            site_stats.downtime_ms,
+            site_stats.availability
+        )
+        print(json.dumps(stats, indent=2))
+        if args.post_stats:
+            with instrumentation.stage("post"):
+                outage_service.post_site_stats(site_id, stats)
+            LOG.info("Posted statistics of site %s", site_id)
+        results.append(stats)
+    return results
+
+
+def run() -> None:
+    """
+    Runs the main process:
+
+    * Retrieves outages
+    * Gets the site info of SITE_ID
+    * Filters outages based on devices of the particular site, START_DATE
+      and the optional END_DATE and MIN_DURATION
+    * Attaches device name and posts the outages of SITE_ID
+
+    If --site-ids or --sites-file is given, the same is done for every site
+    with a single retrieval of outages (see `run_batch`).
+
+    With --incremental, only outages that are new or changed since the
+    previous incremental run are posted (see `SyncState`).
+
+    The stats command computes statistics instead of posting outages (see
+    `run_stats`).
+
+    With --watch, the process keeps running and repeats every --interval
+    seconds with the same connections, cached responses and site infos (see
+    `Scheduler`), until it receives SIGTERM or SIGINT.
+    """
+    args = parse_args()
+    if args.watch:
+        args.incremental = True
+    LOG.info("Start with arguments: %s", args)
+
+    site_ids = read_site_ids(args)
+    pool_maxsize = max(10, args.post_workers, args.page_workers)
+    if site_ids:
+        pool_maxsize = max(
+            args.max_workers * args.post_workers, args.page_workers)
+
+    with ExitStack() as stack:
+        sync_state = None
+        if args.incremental:
+            from src.sync_state import SyncState
+
+            sync_state = stack.enter_context(SyncState(
+                args.state_file, timedelta(seconds=args.lookback)))
+        cache_dir = args.cache_dir
+        if args.watch and cache_dir is None:
+            # unchanged outages are then revalidated instead of parsed again
+            cache_dir = stack.enter_context(tempfile.TemporaryDirectory())
+        cache = None
+        if cache_dir:
+            cache = ResponseCache(
+                cache_dir, args.cache_max_bytes, args.cache_ttl)
+        instrumentation = NO_INSTRUMENTATION
+        if args.metrics_file:
+            instrumentation = MetricsRecorder()
+        throttle = None
+        if args.rate_limit is not None or args.adaptive_concurrency:
+            from src.throttle import Throttle
+
+            throttle = Throttle(
+                rate=args.rate_limit,
+                burst=args.burst,
+                adaptive=args.adaptive_concurrency,
+                max_concurrency=pool_maxsize
+            )
+        accept_encoding = None
+        if args.accept_encoding:
+            from src.compression import get_accept_encoding
+
+            accept_encoding = get_accept_encoding(args.accept_encoding)
+        from src.codec import get_codec
+
+        codec = get_codec(args.json_codec)
+        LOG.info("Using the %s JSON codec", codec.name)
+        outage_service = stack.enter_context(get_outage_service(
+            pool_maxsize,
+            cache,
+            throttle,
+            instrumentation,
+            args.site_info_max_age if args.watch else None,
+            args.compress,
+            args.compress_threshold,
+            accept_encoding,
+            codec,
+            args.transfer_metrics,
+            args.page_size,
+            args.page_workers,
+            (args.connect_timeout, args.read_timeout)
+        ))
+
+        def run_cycle() -> None:
+            try:
+                with instrumentation.stage("run"):
+                    if args.command == "stats":
+                        run_stats(
+                            outage_service, site_ids or [args.site_id], args)
+                    elif site_ids:
+                        run_batch(outage_service, site_ids, args, sync_state)
+                    else:
+                        run_site(
+                            outage_service, args.site_id, args, sync_state)
+            finally:
+                # metrics of failed runs are written too, they tell where it
+                # broke
+                if args.metrics_file:
+                    instrumentation.write(
+                        args.metrics_file, args.metrics_format)
+
+        if args.watch:
+            scheduler = Scheduler(
+                run_cycle, args.interval, args.jitter, args.lock_file)
+            scheduler.install_signal_handlers()
+            LOG.info("Watching every %s seconds", args.interval)
+            scheduler.run()
+            LOG.info("Stopped watching: %s", scheduler.get_metrics())
+        else:
+            with FileLock(args.lock_file) as locked:
+                if not locked:
+                    LOG.warning(
+                        "%s is locked by another process, not running",
+                        args.lock_file
+                    )
+                    return
+                run_cycle()
+
+        if throttle is not None:
+            LOG.info("Request metrics: %s", throttle.get_metrics())
+        if args.compress or args.transfer_metrics:
+            LOG.info(
+                "Transfer metrics: %s",
+                outage_service.requester.transfer.get_metrics()
+            )
+
+
 if __name__ == "__main__":
     run()
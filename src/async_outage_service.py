@@ -0,0 +1,122 @@
+"""
+asyncio counterpart of OutageService
+"""
+import asyncio
+from typing import Callable, Dict, Iterable, List, Optional
+
+from .async_requester import AsyncRequester
+from .model import Outage, SiteInfo
+
+
+class AsyncOutageService:
+
+    def __init__(self, requester: AsyncRequester, max_concurrency: int = 10):
+        """
+        :param requester: requester instance to make API calls
+        :type requester: AsyncRequester
+        :param max_concurrency: maximum number of API calls of this service
+            that are in flight at the same time. Defaults to 10
+        :type max_concurrency: int
+        """
+        self.requester = requester
+        self._max_concurrency = max_concurrency
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    async def __aenter__(self) -> "AsyncOutageService":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Closes the requester and releases its pooled connections
+
+        :return: None
+        :rtype: None
+        """
+        await self.requester.close()
+
+    def _get_semaphore(self) -> asyncio.Semaphore:
+        """
+        The semaphore is created lazily so that it belongs to the running
+        event loop.
+
+        :return: semaphore limiting concurrent API calls
+        :rtype: asyncio.Semaphore
+        """
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._semaphore
+
+    async def get_outages(self) -> List[Outage]:
+        """
+        Retrieves outages from the Outage API and returns them
+
+        :return: list of outages
+        :rtype: List[Outage]
+        """
+        async with self._get_semaphore():
+            outages = await self.requester.get("outages")
+        return [Outage.from_dict(outage) for outage in outages]
+
+    async def get_site_info(self, site_id: str) -> SiteInfo:
+        """
+        Retrieves information of the specified site
+
+        :param site_id: site identifier
+        :type site_id: str
+        :return: site information dictionary
+        :rtype: SiteInfo
+        """
+        async with self._get_semaphore():
+            site_info = await self.requester.get(f"site-info/{site_id}")
+        return SiteInfo.from_dict(site_info)
+
+    async def post_outages_to_site(
+        self,
+        site_id: str,
+        outages: List
+    ) -> None:
+        """
+        Posts outages of the specified site to the Outage API
+
+        :param site_id: site identifier
+        :type site_id: str
+        :param outages: list of outages to post
+        :type outages: List
+        :return: None
+        :rtype: None
+        """
+        async with self._get_semaphore():
+            await self.requester.post(f"site-outages/{site_id}", outages)
+
+    async def post_outages_to_sites(
+        self,
+        site_ids: Iterable[str],
+        select_outages: Callable[[SiteInfo], List]
+    ) -> Dict[str, int]:
+        """
+        Processes many sites concurrently. For every site, its site info is
+        retrieved, `select_outages` is called with it to build the outages to
+        post, and the result is posted to the site. Concurrency is bounded
+        by `max_concurrency`.
+
+        :param site_ids: site identifiers
+        :type site_ids: Iterable[str]
+        :param select_outages: callable that returns the outages to post for
+            the given site info
+        :type select_outages: Callable[[SiteInfo], List]
+        :return: number of posted outages per site identifier
+        :rtype: Dict[str, int]
+        """
+        async def process_site(site_id: str) -> int:
+            site_info = await self.get_site_info(site_id)
+            outages = select_outages(site_info)
+            await self.post_outages_to_site(site_id, outages)
+            return len(outages)
+
+        site_ids = list(dict.fromkeys(site_ids))
+        posted: List[int] = await asyncio.gather(
+            *(process_site(site_id) for site_id in site_ids))
+        return dict(zip(site_ids, posted))
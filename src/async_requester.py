@@ -0,0 +1,235 @@
+"""
+AsyncRequester is the asyncio counterpart of Requester. It abstracts all
+requests have been made and attachs anything required (i.e. api key) to the
+request without blocking the event loop
+"""
+import asyncio
+from urllib.parse import urljoin
+from typing import Any, Dict, List, Optional, Union
+
+import aiohttp
+import requests
+
+
+class AsyncRequester:
+
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        max_retries: int = 5,
+        backoff_factor: float = 0.1,
+        pool_maxsize: int = 10
+    ):
+        """
+        :param base_url: Base API URL. (i.e. https://localhost:5000)
+        :type base_url: str
+        :param api_key: API key which is used for auth
+        :type api_key: str
+        :param max_retries: number of retries in case request faces with an
+            unexpected response from the server. Defaults to 5
+        :type max_retries: int
+        :param backoff_factor: base of the exponential backoff between
+            retries, in seconds. Defaults to 0.1
+        :type backoff_factor: float
+        :param pool_maxsize: maximum number of simultaneous connections.
+            Defaults to 10
+        :type pool_maxsize: int
+        """
+        self._base_url = base_url
+        self._api_key = api_key
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._pool_maxsize = pool_maxsize
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def __aenter__(self) -> "AsyncRequester":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def close(self) -> None:
+        """
+        Closes the underlying session and releases pooled connections
+
+        :return: None
+        :rtype: None
+        """
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def _get_headers(self) -> Dict[str, str]:
+        """
+        :return: request headers. Accept and X-API-Key
+        :rtype: Dict[str, str]
+        """
+        return {
+            "Accept": "application/json",
+            "X-API-Key": self._api_key
+        }
+
+    def _get_request_session(self) -> aiohttp.ClientSession:
+        """
+        Returns the session of this requester, creating it on first use. It
+        must be called from within the event loop that runs the requests.
+
+        :return: request session instance
+        :rtype: aiohttp.ClientSession
+        """
+        if self._session is None:
+            connector = aiohttp.TCPConnector(limit=self._pool_maxsize)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+
+    async def _handle_response(
+        self,
+        res: aiohttp.ClientResponse
+    ) -> aiohttp.ClientResponse:
+        """
+        Handles the API response and raises a `requests.exceptions.HTTPError`
+        if status code of the response is not 200, so callers can handle
+        failures the same way as with `Requester`.
+
+        :param res: response instance
+        :type res: aiohttp.ClientResponse
+        :return: response when status code of the response is 200
+        :rtype: aiohttp.ClientResponse
+        :raises: `requests.exceptions.HTTPError` with the response as a
+            `requests.Response` if status code of the repsonse is not 200.
+        """
+        if res.status != 200:
+            kind = "Client" if res.status < 500 else "Server"
+            response = _to_response(res, await res.read())
+            try:
+                body = response.json()
+            except ValueError:
+                body = None
+            msg = (
+                f"{res.status} {kind} Error: {res.reason} "
+                f"for url: {res.url} {body}"
+            )
+            raise requests.exceptions.HTTPError(msg, response=response)
+
+        return res
+
+    async def _request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Dict[str, Any],
+        body: Any = None
+    ) -> Union[List, Dict]:
+        """
+        Sends the request. Like with `Requester`, get requests are retried
+        with exponential backoff on connection errors, timeouts and 500
+        responses, and post requests are not retried.
+
+        :return: response serialized to python list or dict
+        :rtype: Union[List, Dict]
+        :raises: `requests.exceptions.RequestException` if the request
+            fails, i.e. `requests.exceptions.ConnectionError` for aiohttp
+            connection errors and `requests.exceptions.Timeout` for timeouts
+        """
+        url = urljoin(self._base_url, endpoint)
+        session = self._get_request_session()
+        kwargs = {"headers": self._get_headers(), "params": params}
+        if method == "POST":
+            kwargs["json"] = body
+        max_retries = self._max_retries if method == "GET" else 0
+
+        attempt = 0
+        while True:
+            try:
+                async with session.request(method, url, **kwargs) as res:
+                    if res.status != 500 or attempt >= max_retries:
+                        res = await self._handle_response(res)
+                        return await res.json(content_type=None)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as exc:
+                if attempt >= max_retries or not isinstance(
+                    exc, (aiohttp.ClientConnectionError, asyncio.TimeoutError)
+                ):
+                    raise _to_request_exception(exc) from exc
+            attempt += 1
+            await asyncio.sleep(self._backoff_factor * (2 ** (attempt - 1)))
+
+    async def get(
+        self,
+        endpoint: str,
+        **params: Dict[str, Any]
+    ) -> Union[List, Dict]:
+        """
+        Sends get requests to the given endpoint, and with optional params.
+
+        :param endpoint: endpoint of the API to send the get request
+        :type endpoint: str
+        :param params: keyword arguments which will be used as query-string
+            params. There will be no query-string param if no keyword-argument
+            is specified. (i.e. sort=id, order=asc)
+        :type params: Dict[str, Any]
+        :return: response serialized to python list or dict
+        :rtype: Union[List, Dict]
+        """
+        return await self._request("GET", endpoint, params)
+
+    async def post(
+        self,
+        endpoint: str,
+        body: Dict[Any, Any],
+        **params: Dict[str, Any]
+    ) -> Union[List, Dict]:
+        """
+        Sends post requests to the given endpoint and with the given body,
+        if specified.
+
+        :param endpoint: endpoint of the API to send the get request
+        :type endpoint: str
+        :param body: POST request body
+        :type body: Dict[Any, Any]
+        :param params: keyword arguments which will be used as query-string
+            params. There will be no query-string param if no keyword-argument
+            is specified. (i.e. sort=id, order=asc)
+        :type params: Dict[str, Any]
+        :return: response serialized to python list or dict
+        :rtype: Union[List, Dict]
+        """
+        return await self._request("POST", endpoint, params, body)
+
+
+def _to_response(
+    res: aiohttp.ClientResponse,
+    body: bytes
+) -> requests.Response:
+    """
+    :param res: aiohttp response
+    :type res: aiohttp.ClientResponse
+    :param body: body of the response
+    :type body: bytes
+    :return: the response as a `requests.Response`, so callers can inspect
+        it the same way as the responses of `Requester`
+    :rtype: requests.Response
+    """
+    response = requests.Response()
+    response.status_code = res.status
+    response.reason = res.reason
+    response.url = str(res.url)
+    response.headers.update(res.headers)
+    response._content = body
+    return response
+
+
+def _to_request_exception(
+    exc: Exception
+) -> requests.exceptions.RequestException:
+    """
+    :param exc: aiohttp client error or timeout
+    :type exc: Exception
+    :return: the matching requests exception
+    :rtype: requests.exceptions.RequestException
+    """
+    if isinstance(exc, asyncio.TimeoutError):
+        return requests.exceptions.Timeout(str(exc) or "Request timed out")
+    if isinstance(exc, aiohttp.ClientConnectionError):
+        return requests.exceptions.ConnectionError(str(exc))
+    return requests.exceptions.RequestException(str(exc))
@@ -0,0 +1,153 @@
+"""
+JSON codecs of request and response bodies. msgspec and orjson are used when
+they are installed, the standard library otherwise.
+"""
+import json
+import typing
+from typing import Any, Dict, List, Optional, Type
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - msgspec is optional
+    msgspec = None
+
+
+def convert(data: Any, type_: Any) -> Any:
+    """
+    Converts decoded JSON into models
+
+    :param data: decoded JSON
+    :type data: Any
+    :param type_: model class with a `from_dict` method, or a list of them,
+        i.e. `List[Outage]`
+    :type type_: Any
+    :return: models
+    :rtype: Any
+    """
+    if typing.get_origin(type_) is list:
+        (item_type,) = typing.get_args(type_)
+        return [convert(item, item_type) for item in data]
+    return type_.from_dict(data)
+
+
+class JsonCodec:
+    """
+    Codec of the standard library `json` module, and the base of the codecs
+    of faster backends
+    """
+
+    name = "json"
+    # whether `decode` builds models without decoding into dicts first
+    decodes_models = False
+
+    def loads(self, data: bytes) -> Any:
+        """
+        :param data: JSON document
+        :type data: bytes
+        :return: document serialized to python objects
+        :rtype: Any
+        """
+        return json.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        """
+        :param obj: python object to encode
+        :type obj: Any
+        :return: compact JSON document
+        :rtype: bytes
+        """
+        return json.dumps(
+            obj, separators=(",", ":"), allow_nan=False).encode("utf-8")
+
+    def decode(self, data: bytes, type_: Any) -> Any:
+        """
+        :param data: JSON document
+        :type data: bytes
+        :param type_: model class, or a list of them, i.e. `List[Outage]`
+        :type type_: Any
+        :return: document decoded into models, like their `from_dict`
+        :rtype: Any
+        """
+        return convert(self.loads(data), type_)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    Codec of `orjson`, which decodes and encodes several times faster than
+    the standard library
+    """
+
+    name = "orjson"
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return orjson.dumps(obj)
+
+
+class MsgspecCodec(JsonCodec):
+    """
+    Codec of `msgspec`, which also decodes documents straight into the
+    dataclasses of the models, without intermediate dicts. Dates of outages
+    decoded this way are parsed on first access, like `Outage.from_dict`
+    with lazy=True.
+    """
+
+    name = "msgspec"
+    decodes_models = True
+
+    def loads(self, data: bytes) -> Any:
+        return msgspec.json.decode(data)
+
+    def dumps(self, obj: Any) -> bytes:
+        return msgspec.json.encode(obj)
+
+    def decode(self, data: bytes, type_: Any) -> Any:
+        return msgspec.json.decode(data, type=type_)
+
+
+CODECS: Dict[str, Type[JsonCodec]] = {
+    "json": JsonCodec,
+    "orjson": OrjsonCodec,
+    "msgspec": MsgspecCodec,
+}
+
+
+def get_available_codecs() -> List[str]:
+    """
+    :return: names of the codecs whose backend is installed, fastest first
+    :rtype: List[str]
+    """
+    available = []
+    if msgspec is not None:
+        available.append("msgspec")
+    if orjson is not None:
+        available.append("orjson")
+    available.append("json")
+    return available
+
+
+def get_codec(name: Optional[str] = None) -> JsonCodec:
+    """
+    :param name: json, orjson or msgspec. Defaults to None, which means the
+        fastest codec available
+    :type name: Optional[str]
+    :return: codec
+    :rtype: JsonCodec
+    :raises: `ValueError` if the backend of the codec is not installed
+    """
+    available = get_available_codecs()
+    if name is None or name == "auto":
+        name = available[0]
+    if name not in available:
+        raise ValueError(
+            f"Unsupported JSON codec {name!r}, "
+            f"available: {', '.join(available)}"
+        )
+    return CODECS[name]()
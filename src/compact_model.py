@@ -0,0 +1,140 @@
+"""
+Memory-compact variants of the request and response models. They have the
+same `from_dict` constructors and value equality as the models in `model`,
+but use `__slots__` instead of a per-instance `__dict__`, keep timestamps as
+int epoch milliseconds and can intern repeated device ids.
+"""
+import sys
+from datetime import datetime
+from typing import Any, Dict, List, Tuple
+
+from .model import format_datetime, from_epoch_ms, parse_datetime, to_epoch_ms
+
+
+class _Compact:
+
+    __slots__ = ()
+
+    def _astuple(self) -> Tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other: Any) -> bool:
+        if other.__class__ is self.__class__:
+            return self._astuple() == other._astuple()
+        return NotImplemented
+
+    def __repr__(self) -> str:
+        fields = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{self.__class__.__name__}({fields})"
+
+
+class CompactOutage(_Compact):
+    """
+    Outage stored as its device id and begin/end epoch milliseconds. `begin`
+    and `end` are formatted back in the `YYYY-MM-DDTHH:MM:SS.sssZ` format of
+    the API, normalized to UTC.
+    """
+
+    __slots__ = ("id", "begin_ms", "end_ms")
+
+    def __init__(self, id: str, begin_ms: int, end_ms: int):
+        self.id = id
+        self.begin_ms = begin_ms
+        self.end_ms = end_ms
+
+    @classmethod
+    def from_dict(cls, outage_dict: Dict[str, str], intern_ids: bool = True):
+        """
+        Helper method to obtain CompactOutage instance from a dictionary
+
+        :param outage_dict: outage dictionary
+        :type outage_dict: Dict[str, str]
+        :param intern_ids: if True, device ids are interned so outages of the
+            same device share a single string. Defaults to True
+        :type intern_ids: bool
+        :return: CompactOutage instance
+        :rtype: CompactOutage
+        """
+        id_ = outage_dict["id"]
+        return cls(
+            sys.intern(id_) if intern_ids else id_,
+            to_epoch_ms(parse_datetime(outage_dict["begin"])),
+            to_epoch_ms(parse_datetime(outage_dict["end"]))
+        )
+
+    @property
+    def begin(self) -> str:
+        return format_datetime(self.begin_datetime)
+
+    @property
+    def end(self) -> str:
+        return format_datetime(self.end_datetime)
+
+    @property
+    def begin_datetime(self) -> datetime:
+        return from_epoch_ms(self.begin_ms)
+
+    @property
+    def end_datetime(self) -> datetime:
+        return from_epoch_ms(self.end_ms)
+
+
+class CompactDevice(_Compact):
+
+    __slots__ = ("id", "name")
+
+    def __init__(self, id: str, name: str):
+        self.id = id
+        self.name = name
+
+    @classmethod
+    def from_dict(cls, device_dict: Dict[str, str], intern_ids: bool = True):
+        """
+        Helper method to obtain CompactDevice instance from a dictionary
+
+        :param device_dict: device dictionary
+        :type device_dict: Dict[str, str]
+        :param intern_ids: if True, device ids are interned. Defaults to True
+        :type intern_ids: bool
+        :return: CompactDevice instance
+        :rtype: CompactDevice
+        """
+        id_ = device_dict["id"]
+        return cls(sys.intern(id_) if intern_ids else id_, device_dict["name"])
+
+
+class CompactSiteInfo(_Compact):
+
+    __slots__ = ("id", "name", "devices")
+
+    def __init__(self, id: str, name: str, devices: List[CompactDevice]):
+        self.id = id
+        self.name = name
+        self.devices = devices
+
+    @classmethod
+    def from_dict(
+        cls,
+        site_info_dict: Dict[str, Any],
+        intern_ids: bool = True
+    ):
+        """
+        Helper method to obtain CompactSiteInfo instance from a dictionary
+
+        :param site_info_dict: site info dictionary
+        :type site_info_dict: Dict[str, Any]
+        :param intern_ids: if True, device ids are interned. Defaults to True
+        :type intern_ids: bool
+        :return: CompactSiteInfo instance
+        :rtype: CompactSiteInfo
+        """
+        devices = [
+            CompactDevice.from_dict(device, intern_ids)
+            for device in site_info_dict["devices"]
+        ]
+        return cls(
+            id=site_info_dict["id"],
+            name=site_info_dict["name"],
+            devices=devices
+        )
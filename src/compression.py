@@ -0,0 +1,172 @@
+"""
+Content encodings of request and response bodies, and counters of the bytes
+they save on the wire
+"""
+import gzip
+import threading
+import zlib
+from typing import Dict, List, Optional
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+GZIP = "gzip"
+BROTLI = "br"
+
+_DECODE_ERRORS = (OSError, EOFError, zlib.error)
+if brotli is not None:
+    _DECODE_ERRORS += (brotli.error,)
+
+# levels that compress JSON nearly as well as the maximum at a fraction of
+# its CPU time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def get_encodings() -> List[str]:
+    """
+    :return: encodings request bodies can be compressed with. Brotli needs
+        the `brotli` package
+    :rtype: List[str]
+    """
+    if brotli is None:
+        return [GZIP]
+    return [GZIP, BROTLI]
+
+
+def get_response_encodings() -> List[str]:
+    """
+    :return: encodings that responses are decoded from while they are read,
+        i.e. gzip and deflate, and br if `brotli` is installed
+    :rtype: List[str]
+    """
+    from urllib3.util.request import ACCEPT_ENCODING
+
+    return ACCEPT_ENCODING.split(",")
+
+
+def get_accept_encoding(encodings: Optional[List[str]] = None) -> str:
+    """
+    :param encodings: encodings that responses may be compressed with, or
+        identity alone for uncompressed responses. Defaults to None, which
+        means every encoding of `get_response_encodings`, which is what
+        requests accepts anyway
+    :type encodings: Optional[List[str]]
+    :return: value of the `Accept-Encoding` header
+    :rtype: str
+    :raises: `ValueError` if an encoding cannot be decoded
+    """
+    available = get_response_encodings()
+    if encodings is None:
+        return ",".join(available)
+    unsupported = [
+        encoding for encoding in encodings
+        if encoding not in available and encoding != "identity"
+    ]
+    if unsupported or not encodings:
+        raise ValueError(
+            f"Unsupported response encodings {unsupported!r}, "
+            f"available: {', '.join(available + ['identity'])}"
+        )
+    return ",".join(encodings)
+
+
+def compress(data: bytes, encoding: str) -> bytes:
+    """
+    :param data: body to compress
+    :type data: bytes
+    :param encoding: content encoding, gzip or br
+    :type encoding: str
+    :return: compressed body
+    :rtype: bytes
+    :raises: `ValueError` if the encoding is not available
+    """
+    if encoding == GZIP:
+        # mtime is fixed so that equal bodies are compressed equally
+        return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    if encoding == BROTLI and brotli is not None:
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    raise ValueError(
+        f"Unsupported content encoding {encoding!r}, "
+        f"available: {', '.join(get_encodings())}"
+    )
+
+
+def decompress(data: bytes, encoding: str) -> bytes:
+    """
+    :param data: compressed body
+    :type data: bytes
+    :param encoding: content encoding, gzip, deflate, br or identity
+    :type encoding: str
+    :return: decompressed body
+    :rtype: bytes
+    :raises: `ValueError` if the encoding is not available or the body is
+        not valid
+    """
+    encoding = encoding.strip().lower()
+    try:
+        if encoding in ("", "identity"):
+            return data
+        if encoding == GZIP:
+            return gzip.decompress(data)
+        if encoding == "deflate":
+            return zlib.decompress(data)
+        if encoding == BROTLI and brotli is not None:
+            return brotli.decompress(data)
+    except _DECODE_ERRORS as exc:
+        raise ValueError(f"Invalid {encoding} body: {exc}") from exc
+    raise ValueError(f"Unsupported content encoding {encoding!r}")
+
+
+class TransferCounter:
+    """
+    Counts bytes of request and response bodies as they go over the wire
+    and before compression or after decompression. Thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts = {
+            "bytes_sent": 0,
+            "bytes_sent_uncompressed": 0,
+            "bytes_received": 0,
+            "bytes_received_decoded": 0,
+        }
+
+    def add_sent(self, wire: int, uncompressed: int) -> None:
+        """
+        :param wire: size of the body as sent
+        :type wire: int
+        :param uncompressed: size of the body before compression
+        :type uncompressed: int
+        """
+        with self._lock:
+            self._counts["bytes_sent"] += wire
+            self._counts["bytes_sent_uncompressed"] += uncompressed
+
+    def add_received(self, wire: int, decoded: int) -> None:
+        """
+        :param wire: size of the body as received
+        :type wire: int
+        :param decoded: size of the body after decompression
+        :type decoded: int
+        """
+        with self._lock:
+            self._counts["bytes_received"] += wire
+            self._counts["bytes_received_decoded"] += decoded
+
+    def get_metrics(self) -> Dict[str, int]:
+        """
+        :return: byte counts, and the bytes saved by compression in both
+            directions
+        :rtype: Dict[str, int]
+        """
+        with self._lock:
+            metrics = dict(self._counts)
+        metrics["bytes_saved_sent"] = (
+            metrics["bytes_sent_uncompressed"] - metrics["bytes_sent"])
+        metrics["bytes_saved_received"] = (
+            metrics["bytes_received_decoded"] - metrics["bytes_received"])
+        return metrics
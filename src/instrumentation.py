@@ -0,0 +1,247 @@
+"""
+Instrumentation hooks of stages, API calls and counts of a run.
+
+`Instrumentation` does nothing and is the default everywhere, so disabled
+instrumentation costs an attribute lookup per hook. `MetricsRecorder`
+aggregates what it is told and exports it in Prometheus text format or JSON.
+"""
+import json
+import re
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, ContextManager, Dict, Iterator, Tuple
+
+_NULL_CONTEXT = nullcontext()
+_METRIC_PREFIX = "outage_calculator"
+
+
+class Instrumentation:
+    """
+    No-op instrumentation. Subclasses override the hooks they need and set
+    `enabled` to True so that callers measure what they report.
+    """
+
+    enabled = False
+
+    def stage(self, name: str) -> ContextManager[None]:
+        """
+        :param name: name of the stage, i.e. get_outages
+        :type name: str
+        :return: context manager timing the stage
+        :rtype: ContextManager[None]
+        """
+        return _NULL_CONTEXT
+
+    def record_request(
+        self,
+        method: str,
+        endpoint: str,
+        status: int,
+        seconds: float,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        retries: int = 0
+    ) -> None:
+        """
+        :param method: http method, i.e. get
+        :type method: str
+        :param endpoint: first segment of the endpoint, i.e. site-info
+        :type endpoint: str
+        :param status: status code of the last response, 0 if there was none
+        :type status: int
+        :param seconds: seconds spent in the call, including retries
+        :type seconds: float
+        :param bytes_sent: size of the request body
+        :type bytes_sent: int
+        :param bytes_received: size of the response body
+        :type bytes_received: int
+        :param retries: number of retries of the call
+        :type retries: int
+        """
+
+    def count(self, name: str, value: int = 1) -> None:
+        """
+        :param name: name of the counter, i.e. outages_posted
+        :type name: str
+        :param value: value added to the counter. Defaults to 1
+        :type value: int
+        """
+
+
+NO_INSTRUMENTATION = Instrumentation()
+
+
+def _sanitize(name: str) -> str:
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"')
+
+
+class MetricsRecorder(Instrumentation):
+    """
+    Thread-safe instrumentation that aggregates stage timings, API calls by
+    method, endpoint and status, and counters
+    """
+
+    enabled = True
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        """
+        :param clock: clock in seconds used to time stages
+        :type clock: Callable[[], float]
+        """
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._stages: Dict[str, Dict[str, float]] = {}
+        self._requests: Dict[Tuple[str, str, int], Dict[str, float]] = {}
+        self._counters: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = self._clock()
+        try:
+            yield
+        finally:
+            seconds = self._clock() - started
+            with self._lock:
+                stage = self._stages.setdefault(
+                    name, {"count": 0, "seconds": 0.0})
+                stage["count"] += 1
+                stage["seconds"] += seconds
+
+    def record_request(
+        self,
+        method: str,
+        endpoint: str,
+        status: int,
+        seconds: float,
+        bytes_sent: int = 0,
+        bytes_received: int = 0,
+        retries: int = 0
+    ) -> None:
+        with self._lock:
+            record = self._requests.setdefault(
+                (method, endpoint, status),
+                {
+                    "count": 0,
+                    "seconds": 0.0,
+                    "bytes_sent": 0,
+                    "bytes_received": 0,
+                    "retries": 0,
+                }
+            )
+            record["count"] += 1
+            record["seconds"] += seconds
+            record["bytes_sent"] += bytes_sent
+            record["bytes_received"] += bytes_received
+            record["retries"] += retries
+
+    def count(self, name: str, value: int = 1) -> None:
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        :return: snapshot of stages by name, requests as a list of records
+            with their method, endpoint and status, and counters by name
+        :rtype: Dict[str, Any]
+        """
+        with self._lock:
+            return {
+                "stages": {
+                    name: dict(stage) for name, stage in self._stages.items()
+                },
+                "requests": [
+                    dict(record, method=method, endpoint=endpoint,
+                         status=status)
+                    for (method, endpoint, status), record
+                    in self._requests.items()
+                ],
+                "counters": dict(self._counters),
+            }
+
+    def to_json(self) -> str:
+        """
+        :return: metrics as a single line of JSON
+        :rtype: str
+        """
+        return json.dumps(self.get_metrics(), sort_keys=True)
+
+    def to_prometheus(self) -> str:
+        """
+        :return: metrics in Prometheus text exposition format
+        :rtype: str
+        """
+        metrics = self.get_metrics()
+        lines = []
+
+        def add(name, kind, help_text, samples):
+            if not samples:
+                return
+            name = f"{_METRIC_PREFIX}_{name}"
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ",".join(
+                    f'{key}="{_escape(label)}"'
+                    for key, label in labels.items()
+                )
+                lines.append(
+                    f"{name}{{{label_text}}} {value}" if label_text
+                    else f"{name} {value}"
+                )
+
+        stages = metrics["stages"].items()
+        add("stage_seconds_total", "counter", "Seconds spent in a stage.", [
+            ({"stage": name}, stage["seconds"]) for name, stage in stages])
+        add("stage_runs_total", "counter", "Number of runs of a stage.", [
+            ({"stage": name}, stage["count"]) for name, stage in stages])
+
+        requests = [
+            ({
+                "method": record["method"],
+                "endpoint": record["endpoint"],
+                "status": record["status"],
+            }, record)
+            for record in metrics["requests"]
+        ]
+        for field, name, help_text in (
+            ("count", "requests_total", "Number of API calls."),
+            ("seconds", "request_seconds_total",
+             "Seconds spent in API calls, including retries."),
+            ("bytes_sent", "request_sent_bytes_total",
+             "Bytes of API request bodies."),
+            ("bytes_received", "request_received_bytes_total",
+             "Bytes of API response bodies."),
+            ("retries", "request_retries_total", "Retries of API calls."),
+        ):
+            add(name, "counter", help_text, [
+                (labels, record[field]) for labels, record in requests])
+
+        for name, value in sorted(metrics["counters"].items()):
+            add(f"{_sanitize(name)}_total", "counter", f"Count of {name}.", [
+                ({}, value)])
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str, output_format: str = "prometheus") -> None:
+        """
+        Writes the metrics to the file
+
+        :param path: path of the file
+        :type path: str
+        :param output_format: prometheus or json. Defaults to prometheus
+        :type output_format: str
+        :raises: `ValueError` if the format is unknown
+        """
+        if output_format == "prometheus":
+            text = self.to_prometheus()
+        elif output_format == "json":
+            text = self.to_json() + "\n"
+        else:
+            raise ValueError(f"Unknown metrics format: {output_format}")
+        with open(path, "w") as fp:
+            fp.write(text)
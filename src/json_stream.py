@@ -0,0 +1,76 @@
+"""
+Incremental decoding of JSON arrays from a stream of byte chunks
+"""
+import codecs
+import json
+from typing import Any, Iterable, Iterator
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_END = _WHITESPACE + ",]"
+
+
+def iter_json_array(chunks: Iterable[bytes]) -> Iterator[Any]:
+    """
+    Decodes a JSON array element by element while the chunks are read, so
+    only the undecoded tail of the stream is kept in memory instead of the
+    whole document.
+
+    :param chunks: UTF-8 encoded JSON document split into arbitrary chunks
+    :type chunks: Iterable[bytes]
+    :return: iterator of the decoded array elements
+    :rtype: Iterator[Any]
+    :raises: `json.JSONDecodeError` if the document is not a valid JSON
+        array
+    """
+    decoder = json.JSONDecoder()
+    utf8_decoder = codecs.getincrementaldecoder("utf-8")()
+    chunks = iter(chunks)
+    buf, pos, eof = "", 0, False
+    # 0: before "[", 1: before an element or "]", 2: before "," or "]"
+    state = 0
+
+    while True:
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+
+        if pos < len(buf):
+            char = buf[pos]
+            if state == 0:
+                if char != "[":
+                    raise json.JSONDecodeError("Expecting '['", buf, pos)
+                pos, state = pos + 1, 1
+                continue
+            if char == "]" and state in (1, 2):
+                return
+            if state == 2:
+                if char != ",":
+                    raise json.JSONDecodeError(
+                        "Expecting ',' delimiter", buf, pos)
+                pos, state = pos + 1, 3
+                continue
+            try:
+                element, end = decoder.raw_decode(buf, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                # a number may continue in the next chunk (i.e. "15" + "00.0"),
+                # so it is accepted only once the character after it is known
+                complete = end < len(buf) and (
+                    buf[end] in _NUMBER_END
+                    or not isinstance(element, (int, float))
+                )
+                if complete or eof:
+                    yield element
+                    pos, state = end, 2
+                    continue
+        elif eof:
+            raise json.JSONDecodeError("Unexpected end of data", buf, pos)
+
+        chunk = next(chunks, None)
+        if chunk is None:
+            eof = True
+            text = utf8_decoder.decode(b"", final=True)
+        else:
+            text = utf8_decoder.decode(chunk)
+        buf, pos = buf[pos:] + text, 0
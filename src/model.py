@@ -2,35 +2,122 @@
 Request and response models
 """
 
-from dataclasses import dataclass
-from datetime import datetime
-import dateutil.parser as dt_parser
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
 from typing import Dict, Optional, List
 
 
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def parse_datetime(value: str) -> datetime:
+    """
+    Parses a timestamp of the Outage API. The `YYYY-MM-DDTHH:MM:SS.sssZ`
+    format that the API returns is parsed with `datetime.fromisoformat`,
+    anything else falls back to `dateutil.parser.parse`.
+
+    :param value: timestamp string
+    :type value: str
+    :return: parsed datetime
+    :rtype: datetime
+    """
+    if len(value) == 24 and value[23] == "Z" and value[10] == "T":
+        try:
+            return datetime.fromisoformat(
+                value[:23]).replace(tzinfo=timezone.utc)
+        except ValueError:
+            pass
+    # imported here, it is only needed for other formats and slow to import
+    import dateutil.parser as dt_parser
+    return dt_parser.parse(value)
+
+
+def to_epoch_ms(value: datetime) -> int:
+    """
+    :param value: datetime to convert. Naive datetimes are taken as UTC
+    :type value: datetime
+    :return: milliseconds since the Unix epoch
+    :rtype: int
+    """
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (value - _EPOCH) // timedelta(milliseconds=1)
+
+
+def from_epoch_ms(value: int) -> datetime:
+    """
+    :param value: milliseconds since the Unix epoch
+    :type value: int
+    :return: aware UTC datetime
+    :rtype: datetime
+    """
+    return _EPOCH + timedelta(milliseconds=value)
+
+
+def format_datetime(value: datetime) -> str:
+    """
+    :param value: datetime to format. Naive datetimes are taken as UTC
+    :type value: datetime
+    :return: timestamp in the `YYYY-MM-DDTHH:MM:SS.sssZ` format of the API
+    :rtype: str
+    """
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+
+
+class _LazyDatetime:
+    """
+    Descriptor of a datetime field that is parsed from the string field
+    `source` on first access, unless a value has been assigned before.
+    """
+
+    def __init__(self, source: str):
+        self._source = source
+
+    def __set_name__(self, owner, name: str) -> None:
+        self._name = "_" + name
+
+    def __get__(self, instance, owner=None) -> Optional[datetime]:
+        if instance is None:
+            return None
+        value = instance.__dict__.get(self._name)
+        if value is None:
+            value = parse_datetime(getattr(instance, self._source))
+            instance.__dict__[self._name] = value
+        return value
+
+    def __set__(self, instance, value: Optional[datetime]) -> None:
+        instance.__dict__[self._name] = value
+
+
 @dataclass
 class Outage:
 
     id: str
     begin: str
     end: str
-    begin_datetime: Optional[datetime] = None
-    end_datetime: Optional[datetime] = None
+    begin_datetime: Optional[datetime] = _LazyDatetime("begin")
+    end_datetime: Optional[datetime] = _LazyDatetime("end")
 
     @classmethod
-    def from_dict(cls, outage_dict: Dict[str, str]):
+    def from_dict(cls, outage_dict: Dict[str, str], lazy: bool = False):
         """
         Helper method to obtain Outage instance from a dictionary. Also,
         begin_datetime and end_datetime attributes are set.
 
         :param outage_dict: outage dictionary
         :type outage_dict: Dict[str, str]
+        :param lazy: if True, begin_datetime and end_datetime are not parsed
+            here but on their first access. Defaults to False
+        :type lazy: bool
         :return: Outage instance
         :rtype: Outage
         """
         outage = cls(**outage_dict)
-        outage.begin_datetime = dt_parser.parse(outage.begin)
-        outage.end_datetime = dt_parser.parse(outage.end)
+        if not lazy:
+            outage.begin_datetime = parse_datetime(outage.begin)
+            outage.end_datetime = parse_datetime(outage.end)
 
         return outage
 
@@ -79,3 +166,96 @@ class SiteInfo:
             name=site_info_dict["name"],
             devices=devices
         )
+
+
+@dataclass
+class ChunkResult:
+
+    index: int
+    rows: int
+    attempts: int
+    error: Optional[str] = None
+    # outages of the chunk
+    outages: Optional[List] = field(default=None, repr=False, compare=False)
+
+    @property
+    def ok(self) -> bool:
+        """
+        :return: whether the chunk has been posted successfully
+        :rtype: bool
+        """
+        return self.error is None
+
+
+@dataclass
+class NormalizeResult:
+
+    rows: List[Dict]
+    duplicates: int = 0
+    coalesced: int = 0
+
+    @property
+    def removed(self) -> int:
+        """
+        :return: number of rows removed by deduplication and coalescing
+        :rtype: int
+        """
+        return self.duplicates + self.coalesced
+
+
+@dataclass
+class DeviceStats:
+
+    id: str
+    name: str
+    outage_count: int
+    total_duration_ms: int
+    downtime_ms: int
+    availability: Optional[float] = None
+
+    def to_dict(self) -> Dict:
+        """
+        :return: device statistics in the format they are posted in
+        :rtype: Dict
+        """
+        return asdict(self)
+
+
+@dataclass
+class SiteStats:
+
+    id: str
+    name: str
+    begin: str
+    end: str
+    outage_count: int
+    total_duration_ms: int
+    downtime_ms: int
+    availability: Optional[float]
+    devices: List[DeviceStats]
+
+    def get_top_devices(self, n: int) -> List[DeviceStats]:
+        """
+        :param n: number of devices
+        :type n: int
+        :return: the n devices with the most downtime, most first
+        :rtype: List[DeviceStats]
+        """
+        return sorted(
+            self.devices,
+            key=lambda device: (-device.downtime_ms, device.id)
+        )[:n]
+
+    def to_dict(self, top: Optional[int] = None) -> Dict:
+        """
+        :param top: if given, only the `top` devices with the most downtime
+            are included. Defaults to None, which means all devices
+        :type top: Optional[int]
+        :return: site statistics in the format they are posted in
+        :rtype: Dict
+        """
+        stats = asdict(self)
+        if top is not None:
+            stats["devices"] = [
+                device.to_dict() for device in self.get_top_devices(top)]
+        return stats
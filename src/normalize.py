@@ -0,0 +1,93 @@
+"""
+Normalization of the outage rows selected for a site before they are posted
+"""
+from typing import Dict, List, Tuple
+
+from .model import NormalizeResult, parse_datetime, to_epoch_ms
+
+
+def dedupe(rows: List[Dict]) -> List[Dict]:
+    """
+    Drops exact duplicates in a single pass, with a set of the
+    (id, begin, end) of the rows seen so far
+
+    :param rows: outage body dictionaries
+    :type rows: List[Dict]
+    :return: first occurrence of every outage, in the original order
+    :rtype: List[Dict]
+    """
+    seen = set()
+    unique = []
+    for row in rows:
+        key = (row["id"], row["begin"], row["end"])
+        if key not in seen:
+            seen.add(key)
+            unique.append(row)
+    return unique
+
+
+def coalesce(rows: List[Dict]) -> List[Dict]:
+    """
+    Merges overlapping or adjacent outages of the same device. The outages
+    of every device are sorted by begin and swept once, extending the
+    current outage while the next one begins before or when it ends.
+
+    A merged outage is the first of its outages with the latest end. Dates
+    are compared as instants but kept in their original format.
+
+    :param rows: outage body dictionaries
+    :type rows: List[Dict]
+    :return: outages of every device sorted by begin, devices in the order
+        they first appear
+    :rtype: List[Dict]
+    """
+    by_device: Dict[str, List[Tuple[int, int, Dict]]] = {}
+    for row in rows:
+        by_device.setdefault(row["id"], []).append((
+            to_epoch_ms(parse_datetime(row["begin"])),
+            to_epoch_ms(parse_datetime(row["end"])),
+            row
+        ))
+
+    merged = []
+    for intervals in by_device.values():
+        intervals.sort(key=lambda interval: interval[:2])
+        current_end, current = intervals[0][1], intervals[0][2]
+        for begin, end, row in intervals[1:]:
+            if begin <= current_end:
+                if end > current_end:
+                    current_end = end
+                    current = dict(current, end=row["end"])
+                continue
+            merged.append(current)
+            current_end, current = end, row
+        merged.append(current)
+    return merged
+
+
+def normalize(
+    rows: List[Dict],
+    remove_duplicates: bool = True,
+    coalesce_overlaps: bool = False
+) -> NormalizeResult:
+    """
+    :param rows: outage body dictionaries
+    :type rows: List[Dict]
+    :param remove_duplicates: whether exact duplicates are dropped (see
+        `dedupe`). Defaults to True
+    :type remove_duplicates: bool
+    :param coalesce_overlaps: whether overlapping or adjacent outages of a
+        device are merged (see `coalesce`). Defaults to False
+    :type coalesce_overlaps: bool
+    :return: normalized rows and the number of rows removed by each step
+    :rtype: NormalizeResult
+    """
+    result = NormalizeResult(rows)
+    if remove_duplicates:
+        result.rows = dedupe(result.rows)
+        result.duplicates = len(rows) - len(result.rows)
+    if coalesce_overlaps:
+        deduped = len(result.rows)
+        result.rows = coalesce(result.rows)
+        result.coalesced = deduped - len(result.rows)
+    return result
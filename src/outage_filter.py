@@ -0,0 +1,137 @@
+"""
+Reusable filter that selects outages of a site
+"""
+from datetime import timedelta
+from typing import (
+    TYPE_CHECKING, Callable, Dict, Iterable, Iterator, List, Optional)
+
+from .model import Device, Outage, parse_datetime, to_epoch_ms
+
+if TYPE_CHECKING:
+    # NumPy is imported only by runs that build outage tables
+    from .outage_table import OutageTable
+
+
+class OutageFilter:
+
+    def __init__(
+        self,
+        devices: List[Device],
+        start_date: str,
+        end_date: Optional[str] = None,
+        min_duration: Optional[timedelta] = None
+    ):
+        """
+        The device index and the date cutoffs are built once, so the same
+        filter can be applied to any number of outage batches.
+
+        :param devices: list of devices corresponding to the site
+        :type devices: List[Device]
+        :param start_date: start date where outages should begin after this
+            date
+        :type start_date: str
+        :param end_date: end date where outages should end before this date.
+            Defaults to None, which means no end date cutoff
+        :type end_date: Optional[str]
+        :param min_duration: minimum duration of the selected outages.
+            Defaults to None, which means no minimum duration
+        :type min_duration: Optional[timedelta]
+        """
+        self._device_names = {device.id: device.name for device in devices}
+        self._start_datetime = parse_datetime(start_date)
+        self._end_datetime = None
+        self._min_duration = min_duration
+        self._predicates: List[Callable[[Outage], bool]] = []
+
+        if end_date is not None:
+            end_datetime = self._end_datetime = parse_datetime(end_date)
+            self._predicates.append(
+                lambda outage: outage.end_datetime <= end_datetime)
+        if min_duration is not None:
+            self._predicates.append(
+                lambda outage: (
+                    outage.end_datetime - outage.begin_datetime
+                    >= min_duration
+                )
+            )
+
+    def matches(self, outage: Outage) -> bool:
+        """
+        Predicates are evaluated from the cheapest to the most expensive:
+
+        * Select outages that belong to devices of the site.
+        * Select outages that begin after START_DATE
+        * Select outages that satisfy the optional END_DATE and MIN_DURATION
+
+        :param outage: outage to check
+        :type outage: Outage
+        :return: whether the outage is selected by this filter
+        :rtype: bool
+        """
+        return (
+            outage.id in self._device_names
+            and outage.begin_datetime >= self._start_datetime
+            and all(predicate(outage) for predicate in self._predicates)
+        )
+
+    def iter_rows(self, outages: Iterable[Outage]) -> Iterator[Dict]:
+        """
+        Lazily filters the outages in a single pass and yields the outage body
+        dictionaries with the device name attached. Any iterable, including
+        generators, can be given.
+
+        :param outages: outages to filter
+        :type outages: Iterable[Outage]
+        :return: iterator of outage body dictionaries
+        :rtype: Iterator[Dict]
+        """
+        device_names = self._device_names
+        start_datetime = self._start_datetime
+        predicates = self._predicates
+
+        for outage in outages:
+            name = device_names.get(outage.id)
+            if (
+                name is not None
+                and outage.begin_datetime >= start_datetime
+                and all(predicate(outage) for predicate in predicates)
+            ):
+                yield {
+                    "id": outage.id,
+                    "name": name,
+                    "begin": outage.begin,
+                    "end": outage.end
+                }
+
+    def apply(self, outages: Iterable[Outage]) -> List[Dict]:
+        """
+        :param outages: outages to filter
+        :type outages: Iterable[Outage]
+        :return: List of outage body dictionaries
+        :rtype: List[Dict]
+        """
+        return list(self.iter_rows(outages))
+
+    def apply_table(self, table: "OutageTable") -> List[Dict]:
+        """
+        Same as `apply` for an OutageTable, with all conditions evaluated as
+        vectorized masks
+
+        :param table: outages to filter
+        :type table: OutageTable
+        :return: List of outage body dictionaries
+        :rtype: List[Dict]
+        """
+        mask = table.mask(
+            self._device_names,
+            to_epoch_ms(self._start_datetime),
+            end_ms=(
+                to_epoch_ms(self._end_datetime)
+                if self._end_datetime is not None else None
+            ),
+            min_duration_ms=(
+                self._min_duration // timedelta(milliseconds=1)
+                if self._min_duration is not None else None
+            )
+        )
+        return table.select(mask).to_dicts(self._device_names)
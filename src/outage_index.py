@@ -0,0 +1,280 @@
+"""
+Index of outages by device for time-window queries
+"""
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .compact_model import CompactOutage
+from .model import Outage, parse_datetime, to_epoch_ms
+
+IndexedOutage = Union[Outage, CompactOutage]
+Time = Union[datetime, str, int]
+
+
+def _to_ms(value: Time) -> int:
+    """
+    :param value: datetime, timestamp string or epoch milliseconds
+    :type value: Time
+    :return: milliseconds since the Unix epoch
+    :rtype: int
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    return to_epoch_ms(value)
+
+
+def _get_bounds(outage: IndexedOutage) -> Tuple[int, int]:
+    """
+    :return: begin and end of the outage in epoch milliseconds
+    :rtype: Tuple[int, int]
+    """
+    if isinstance(outage, CompactOutage):
+        return outage.begin_ms, outage.end_ms
+    return (
+        to_epoch_ms(outage.begin_datetime), to_epoch_ms(outage.end_datetime))
+
+
+class _DeviceIndex:
+    """
+    Outages of a device sorted by begin, with a segment tree of the maximum
+    end over ranges of them. Outages added after the last build are kept in
+    an unsorted buffer until it is merged by the next build.
+    """
+
+    __slots__ = ("begins", "ends", "outages", "tree", "size", "pending")
+
+    def __init__(self):
+        self.begins: List[int] = []
+        self.ends: List[int] = []
+        self.outages: List[IndexedOutage] = []
+        self.tree: List[int] = []
+        self.size = 0
+        self.pending: List[Tuple[int, int, IndexedOutage]] = []
+
+    def build(self) -> None:
+        """
+        Merges the pending outages and rebuilds the segment tree
+        """
+        rows = list(zip(self.begins, self.ends, self.outages))
+        # sorted rows are a single run for the merge of the sort
+        rows.extend(sorted(self.pending, key=lambda row: row[0]))
+        rows.sort(key=lambda row: row[0])
+        self.pending = []
+        self.begins = [row[0] for row in rows]
+        self.ends = [row[1] for row in rows]
+        self.outages = [row[2] for row in rows]
+
+        size = 1
+        while size < len(rows):
+            size *= 2
+        tree = [-2 ** 63] * (2 * size)
+        tree[size:size + len(rows)] = self.ends
+        for node in range(size - 1, 0, -1):
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+        self.size = size
+        self.tree = tree
+
+    def overlapping(self, start: int, end: int) -> List[IndexedOutage]:
+        """
+        :return: outages with begin <= end and end >= start, by begin
+        :rtype: List[IndexedOutage]
+        """
+        stop = bisect_right(self.begins, end)
+        tree = self.tree
+        size = self.size
+        found = []
+        # walks the subtrees of the first `stop` leaves, skipping every
+        # subtree whose outages all end before `start`
+        nodes = [(1, 0, size)] if stop and tree[1] >= start else []
+        while nodes:
+            node, low, high = nodes.pop()
+            if node >= size:
+                found.append(low)
+                continue
+            middle = (low + high) // 2
+            # the right child is pushed first so leaves pop in order
+            if middle < stop and tree[2 * node + 1] >= start:
+                nodes.append((2 * node + 1, middle, high))
+            if tree[2 * node] >= start:
+                nodes.append((2 * node, low, middle))
+        outages = [self.outages[index] for index in found]
+        return self._with_pending(
+            outages,
+            lambda begin, end_: begin <= end and end_ >= start
+        )
+
+    def begin_range(self, start: int, end: int) -> List[IndexedOutage]:
+        """
+        :return: outages with start <= begin <= end, by begin
+        :rtype: List[IndexedOutage]
+        """
+        outages = self.outages[
+            bisect_left(self.begins, start):bisect_right(self.begins, end)]
+        return self._with_pending(
+            outages, lambda begin, end_: start <= begin <= end)
+
+    def _with_pending(self, outages, matches) -> List[IndexedOutage]:
+        if not self.pending:
+            return outages
+        extra = [
+            row for row in self.pending if matches(row[0], row[1])]
+        if not extra:
+            return outages
+        rows = [(_get_bounds(outage)[0], outage) for outage in outages]
+        rows.extend((row[0], row[2]) for row in extra)
+        rows.sort(key=lambda row: row[0])
+        return [row[1] for row in rows]
+
+
+class OutageIndex:
+    """
+    Answers "which outages of a device begin in, overlap or are active at a
+    time window" without scanning all outages. Outages of a device are kept
+    sorted by begin; begin-range queries bisect them in O(log n + k) and
+    overlap and point queries walk a segment tree of the maximum end, in
+    O(log n) per reported outage.
+
+    Outages added after construction are buffered per device and merged when
+    the buffer exceeds `rebuild_threshold`, so inserts are amortized and
+    queries scan at most that many buffered outages.
+
+    Times are datetimes (naive ones are taken as UTC), timestamp strings or
+    epoch milliseconds. All bounds are inclusive.
+    """
+
+    def __init__(
+        self,
+        outages: Iterable[IndexedOutage] = (),
+        rebuild_threshold: int = 256
+    ):
+        """
+        :param outages: outages to index
+        :type outages: Iterable[IndexedOutage]
+        :param rebuild_threshold: number of buffered outages of a device that
+            triggers a rebuild of its index. Defaults to 256
+        :type rebuild_threshold: int
+        """
+        self._rebuild_threshold = rebuild_threshold
+        self._devices: Dict[str, _DeviceIndex] = {}
+        self._count = 0
+        for outage in outages:
+            self._add(outage)
+        for device in self._devices.values():
+            device.build()
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def device_ids(self) -> List[str]:
+        """
+        :return: ids of the devices with outages
+        :rtype: List[str]
+        """
+        return list(self._devices)
+
+    def _add(self, outage: IndexedOutage) -> _DeviceIndex:
+        device = self._devices.get(outage.id)
+        if device is None:
+            device = self._devices[outage.id] = _DeviceIndex()
+        begin, end = _get_bounds(outage)
+        device.pending.append((begin, end, outage))
+        self._count += 1
+        return device
+
+    def add(self, outage: IndexedOutage) -> None:
+        """
+        Adds an outage to the index
+
+        :param outage: outage to add
+        :type outage: IndexedOutage
+        """
+        device = self._add(outage)
+        if len(device.pending) > self._rebuild_threshold:
+            device.build()
+
+    def extend(self, outages: Iterable[IndexedOutage]) -> None:
+        """
+        Adds outages to the index
+
+        :param outages: outages to add
+        :type outages: Iterable[IndexedOutage]
+        """
+        for outage in outages:
+            self.add(outage)
+
+    def _get_devices(self, device_id: Optional[str]) -> List[_DeviceIndex]:
+        if device_id is None:
+            return list(self._devices.values())
+        device = self._devices.get(device_id)
+        return [] if device is None else [device]
+
+    def begin_range(
+        self,
+        start: Time,
+        end: Time,
+        device_id: Optional[str] = None
+    ) -> List[IndexedOutage]:
+        """
+        :param start: earliest begin
+        :type start: Time
+        :param end: latest begin
+        :type end: Time
+        :param device_id: device of the outages. Defaults to None, which
+            means all devices
+        :type device_id: Optional[str]
+        :return: outages beginning between start and end, ordered by begin
+            within each device
+        :rtype: List[IndexedOutage]
+        """
+        start_ms, end_ms = _to_ms(start), _to_ms(end)
+        return [
+            outage
+            for device in self._get_devices(device_id)
+            for outage in device.begin_range(start_ms, end_ms)
+        ]
+
+    def overlapping(
+        self,
+        start: Time,
+        end: Time,
+        device_id: Optional[str] = None
+    ) -> List[IndexedOutage]:
+        """
+        :param start: start of the window
+        :type start: Time
+        :param end: end of the window
+        :type end: Time
+        :param device_id: device of the outages. Defaults to None, which
+            means all devices
+        :type device_id: Optional[str]
+        :return: outages active at any time of the window, ordered by begin
+            within each device
+        :rtype: List[IndexedOutage]
+        """
+        start_ms, end_ms = _to_ms(start), _to_ms(end)
+        return [
+            outage
+            for device in self._get_devices(device_id)
+            for outage in device.overlapping(start_ms, end_ms)
+        ]
+
+    def active_at(
+        self,
+        time: Time,
+        device_id: Optional[str] = None
+    ) -> List[IndexedOutage]:
+        """
+        :param time: point in time
+        :type time: Time
+        :param device_id: device of the outages. Defaults to None, which
+            means all devices
+        :type device_id: Optional[str]
+        :return: outages active at the time, ordered by begin within each
+            device
+        :rtype: List[IndexedOutage]
+        """
+        return self.overlapping(time, time, device_id)
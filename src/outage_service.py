@@ -2,31 +2,408 @@
 Service that is responsible for communicating with Outage API
 """
 
-from typing import List
+import json
+import logging
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED, Future, ThreadPoolExecutor, as_completed, wait)
+from itertools import islice
+from typing import (
+    TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional,
+    Tuple, Union)
 
-from .model import Outage, SiteInfo
+import requests
+
+from .codec import JsonCodec
+from .compact_model import CompactOutage
+from .instrumentation import NO_INSTRUMENTATION, Instrumentation
+from .model import (
+    ChunkResult, Outage, SiteInfo, format_datetime, parse_datetime)
+from .parallel_parse import parse_outages
 from .requester import Requester
 
+if TYPE_CHECKING:
+    # NumPy is imported only by runs that build outage tables
+    from .outage_table import OutageTable
+
+LOG = logging.getLogger(__name__)
+
 
 class OutageService:
 
-    def __init__(self, requester: Requester):
+    # base of the exponential backoff between retries of a page, in seconds
+    page_backoff_factor = 0.1
+
+    def __init__(
+        self,
+        requester: Requester,
+        site_info_max_age: Optional[float] = None,
+        page_size: Optional[int] = None,
+        page_workers: int = 4,
+        page_retries: int = 3
+    ):
         """
         :param requester: requester instance to make API calls
         :type requester: Requester
+        :param site_info_max_age: if given, site infos are kept in memory and
+            retrieved again only once they are older than this many seconds.
+            Defaults to None, which means site infos are always retrieved
+        :type site_info_max_age: Optional[float]
+        :param page_size: if given, outages are retrieved in pages of this
+            many outages with the `page` and `page_size` query-string params
+            (see `get_pages`). Defaults to None, which means in a single
+            request
+        :type page_size: Optional[int]
+        :param page_workers: maximum number of pages retrieved concurrently.
+            The requester should have at least this many pooled connections.
+            Defaults to 4
+        :type page_workers: int
+        :param page_retries: number of retries of a failing page. Defaults
+            to 3
+        :type page_retries: int
         """
+        if page_size is not None and page_size < 1:
+            raise ValueError("page_size should be at least 1")
         self.requester = requester
+        self._site_info_max_age = site_info_max_age
+        self._page_size = page_size
+        self._page_workers = max(page_workers, 1)
+        self._page_retries = page_retries
+        self._site_infos: Dict[str, Tuple[float, SiteInfo]] = {}
+        # models parsed from the latest response of every endpoint, with
+        # the variant of the parsing, reused while a caching requester
+        # returns the very same response object
+        self._parsed: Dict[str, Tuple[Any, Any, Any]] = {}
+
+    def __enter__(self) -> "OutageService":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
-    def get_outages(self) -> List[Outage]:
+    def close(self) -> None:
+        """
+        Closes the requester and releases its pooled connections
+
+        :return: None
+        :rtype: None
+        """
+        self.requester.close()
+
+    @property
+    def instrumentation(self) -> Instrumentation:
+        """
+        :return: instrumentation of the requester
+        :rtype: Instrumentation
         """
-        Retrieves outages from the Outage API and returns them
+        return getattr(self.requester, "instrumentation", NO_INSTRUMENTATION)
+
+    def _parse(
+        self,
+        endpoint: str,
+        data: Any,
+        parse: Callable[[Any], Any],
+        variant: Any = None
+    ) -> Any:
+        """
+        Parses the response data, or returns the models parsed from it
+        before if the requester caches responses and served the same object.
+        Only the models of the latest response of every endpoint are kept,
+        so responses to other params, i.e. another `begin_from`, replace
+        them instead of piling up.
+
+        :param endpoint: endpoint of the response
+        :type endpoint: str
+        :param data: response serialized to python list or dict
+        :type data: Any
+        :param parse: callable that parses the data to models
+        :type parse: Callable[[Any], Any]
+        :param variant: what `parse` builds, if it builds different models
+            of the same endpoint. Defaults to None
+        :type variant: Any
+        :return: parsed models
+        :rtype: Any
+        """
+        if getattr(self.requester, "cache", None) is None:
+            with self.instrumentation.stage("parse"):
+                return parse(data)
+
+        parsed = self._parsed.get(endpoint)
+        if parsed is not None and parsed[0] == variant and parsed[1] is data:
+            return parsed[2]
+
+        with self.instrumentation.stage("parse"):
+            models = parse(data)
+        self._parsed[endpoint] = (variant, data, models)
+        return models
+
+    def get_pages(self, endpoint: str, page_size: int, **params: Any) -> List:
+        """
+        Retrieves all pages of a paginated endpoint, with the `page` (from 1)
+        and `page_size` query-string params, and returns their items in page
+        order. Up to `page_workers` pages are retrieved concurrently and each
+        page is retried on its own on connection errors and 5xx/429
+        responses. The first page shorter than the page size is the last one;
+        pages requested after it in the meantime are dropped. An endpoint
+        that ignores the params, i.e. returns more items than the page size
+        or a full first page again as the second one, fails the retrieval
+        instead of being paged forever.
+
+        :param endpoint: endpoint of the API
+        :type endpoint: str
+        :param page_size: number of items per page
+        :type page_size: int
+        :param params: keyword arguments which will be used as query-string
+            params besides `page` and `page_size`
+        :type params: Any
+        :return: items of all pages
+        :rtype: List
+        :raises: `requests.exceptions.RequestException` of the first page
+            that failed, or `ValueError` if the endpoint ignores the params,
+            after the pages in flight are finished
+        """
+        def get_page(page: int) -> List:
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    return self.requester.get(
+                        endpoint, page=page, page_size=page_size, **params)
+                except requests.exceptions.RequestException as exc:
+                    if attempt > self._page_retries or not _is_retryable(exc):
+                        raise
+                time.sleep(self.page_backoff_factor * (2 ** (attempt - 1)))
+
+        pages: Dict[int, List] = {}
+        last_page: Optional[int] = None
+        next_page = 1
+        with ThreadPoolExecutor(max_workers=self._page_workers) as executor:
+            futures: Dict[Future, int] = {}
+            try:
+                while True:
+                    while last_page is None and (
+                        len(futures) < self._page_workers
+                    ):
+                        futures[executor.submit(get_page, next_page)] = (
+                            next_page)
+                        next_page += 1
+                    if not futures:
+                        break
+                    done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        page = futures.pop(future)
+                        items = pages[page] = future.result()
+                        _check_page(pages, page, page_size)
+                        if len(items) < page_size and (
+                            last_page is None or page < last_page
+                        ):
+                            last_page = page
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+        return [
+            item for page in range(1, last_page + 1) for item in pages[page]
+        ]
 
+    def _get_outages_data(self, begin_from: Optional[str] = None) -> Any:
+        """
+        :param begin_from: if given, only outages beginning at or after this
+            date are retrieved
+        :type begin_from: Optional[str]
+        :return: outages serialized to python dicts, retrieved in pages if
+            the service has a page size
+        :rtype: Any
+        """
+        params = _get_outages_params(begin_from)
+        if self._page_size is None:
+            return self.requester.get("outages", **params)
+        return self.get_pages("outages", self._page_size, **params)
+
+    def save_snapshot(
+        self,
+        path: str,
+        begin_from: Optional[str] = None
+    ) -> "OutageTable":
+        """
+        Retrieves outages from the Outage API and writes them to a binary
+        snapshot, which `load_snapshot` maps back without parsing them
+
+        :param path: snapshot file
+        :type path: str
+        :param begin_from: if given, only outages beginning at or after this
+            date are retrieved. Defaults to None
+        :type begin_from: Optional[str]
+        :return: outage table that has been written
+        :rtype: OutageTable
+        """
+        from .snapshot import write_snapshot
+
+        table = self.get_outage_table(begin_from)
+        with self.instrumentation.stage("write_snapshot"):
+            write_snapshot(path, table)
+        return table
+
+    def load_snapshot(self, path: str) -> "OutageTable":
+        """
+        Loads outages from a snapshot written by `save_snapshot` instead of
+        the Outage API. The columns of the table are memory-mapped, so this
+        takes about the same time however many outages there are.
+
+        :param path: snapshot file
+        :type path: str
+        :return: outage table
+        :rtype: OutageTable
+        :raises: `ValueError` if the file is not a valid snapshot
+        """
+        from .snapshot import load_snapshot
+
+        with self.instrumentation.stage("load_snapshot"):
+            return load_snapshot(path)
+
+    def _decodes_models(self) -> bool:
+        """
+        :return: whether the requester decodes site infos straight into
+            models, which its codec does unless responses are cached
+        :rtype: bool
+        """
+        codec = getattr(self.requester, "codec", None)
+        return (
+            isinstance(codec, JsonCodec)
+            and codec.decodes_models
+            and getattr(self.requester, "cache", None) is None
+        )
+
+    def get_outages(
+        self,
+        lazy: bool = False,
+        workers: Optional[int] = None,
+        begin_from: Optional[str] = None
+    ) -> List[Outage]:
+        """
+        Retrieves outages from the Outage API and returns them. They are
+        built from decoded dicts even with codecs that decode models, which
+        build outages several times slower because of their lazy dates (see
+        `benchmarks.bench_codec`).
+
+        :param lazy: if True, dates of the outages are parsed on first access
+            instead of here. Defaults to False
+        :type lazy: bool
+        :param workers: if given and lazy is False, dates of large payloads
+            are parsed by this many processes (see `parse_outages`). The
+            result is the same. Defaults to None
+        :type workers: Optional[int]
+        :param begin_from: if given, only outages beginning at or after this
+            date are retrieved. Defaults to None
+        :type begin_from: Optional[str]
         :return: list of outages
         :rtype: List[Outage]
         """
-        outages = self.requester.get("outages")
-        outages = [Outage.from_dict(outage) for outage in outages]
-        return outages
+        if workers is not None and not lazy:
+            def parse(data):
+                return parse_outages(data, workers)
+        else:
+            def parse(data):
+                return [Outage.from_dict(outage, lazy) for outage in data]
+
+        outages = self._parse(
+            "outages",
+            self._get_outages_data(begin_from),
+            parse,
+            ("outages", lazy)
+        )
+        return list(outages)
+
+    def get_compact_outages(
+        self,
+        intern_ids: bool = True,
+        begin_from: Optional[str] = None
+    ) -> List[CompactOutage]:
+        """
+        Retrieves outages from the Outage API and returns them as compact
+        outages, which need a fraction of the memory of `Outage` instances
+
+        :param intern_ids: if True, device ids are interned so outages of the
+            same device share a single string. Defaults to True
+        :type intern_ids: bool
+        :param begin_from: if given, only outages beginning at or after this
+            date are retrieved. Defaults to None
+        :type begin_from: Optional[str]
+        :return: list of compact outages
+        :rtype: List[CompactOutage]
+        """
+        outages = self._parse(
+            "outages",
+            self._get_outages_data(begin_from),
+            lambda data: [
+                CompactOutage.from_dict(outage, intern_ids) for outage in data
+            ],
+            ("compact-outages", intern_ids)
+        )
+        return list(outages)
+
+    def iter_outages(
+        self,
+        lazy: bool = False,
+        batch_size: Optional[int] = None,
+        begin_from: Optional[str] = None
+    ) -> Iterator[Union[Outage, List[Outage]]]:
+        """
+        Retrieves outages from the Outage API and yields them while the
+        response is being decoded, so memory does not grow with the number
+        of outages as long as the caller does not keep them. Outages are
+        always streamed from a single request, even if the service has a
+        page size.
+
+        :param lazy: if True, dates of the outages are parsed on first access
+            instead of here. Defaults to False
+        :type lazy: bool
+        :param batch_size: if given, lists of up to this many outages are
+            yielded instead of single outages
+        :type batch_size: Optional[int]
+        :param begin_from: if given, only outages beginning at or after this
+            date are retrieved. Defaults to None
+        :type begin_from: Optional[str]
+        :return: iterator of outages or outage batches
+        :rtype: Iterator[Union[Outage, List[Outage]]]
+        """
+        params = _get_outages_params(begin_from)
+        outages = (
+            Outage.from_dict(outage, lazy)
+            for outage in self.requester.iter_array("outages", **params)
+        )
+        if batch_size is None:
+            yield from outages
+            return
+
+        batch = list(islice(outages, batch_size))
+        while batch:
+            yield batch
+            batch = list(islice(outages, batch_size))
+
+    def get_outage_table(
+        self,
+        begin_from: Optional[str] = None
+    ) -> "OutageTable":
+        """
+        Retrieves outages from the Outage API and returns them as a columnar
+        table, without building an Outage instance per outage
+
+        :param begin_from: if given, only outages beginning at or after this
+            date are retrieved. Defaults to None
+        :type begin_from: Optional[str]
+        :return: outage table
+        :rtype: OutageTable
+        """
+        from .outage_table import OutageTable
+
+        return self._parse(
+            "outages",
+            self._get_outages_data(begin_from),
+            OutageTable.from_dicts,
+            "outage-table"
+        )
 
     def get_site_info(self, site_id: str) -> SiteInfo:
         """
@@ -37,8 +414,26 @@ class OutageService:
         :return: site information dictionary
         :rtype: SiteInfo
         """
-        site_info = self.requester.get(f"site-info/{site_id}")
-        return SiteInfo.from_dict(site_info)
+        if self._site_info_max_age is not None:
+            cached = self._site_infos.get(site_id)
+            if (
+                cached is not None
+                and time.monotonic() - cached[0] < self._site_info_max_age
+            ):
+                return cached[1]
+
+        if self._decodes_models():
+            site_info = self.requester.get_as(
+                f"site-info/{site_id}", SiteInfo)
+        else:
+            site_info = self._parse(
+                f"site-info/{site_id}",
+                self.requester.get(f"site-info/{site_id}"),
+                SiteInfo.from_dict
+            )
+        if self._site_info_max_age is not None:
+            self._site_infos[site_id] = (time.monotonic(), site_info)
+        return site_info
 
     def post_outages_to_site(
         self,
@@ -56,3 +451,244 @@ class OutageService:
         :rtype: None
         """
         self.requester.post(f"site-outages/{site_id}", outages)
+
+    def post_site_stats(self, site_id: str, stats: Dict) -> None:
+        """
+        Posts outage statistics of the specified site to the Outage API
+
+        :param site_id: site identifier
+        :type site_id: str
+        :param stats: statistics as returned by `SiteStats.to_dict`
+        :type stats: Dict
+        :return: None
+        :rtype: None
+        """
+        self.requester.post(f"site-stats/{site_id}", stats)
+
+    def post_outages_in_chunks(
+        self,
+        site_id: str,
+        outages: List,
+        max_rows: Optional[int] = None,
+        max_bytes: Optional[int] = None,
+        max_workers: int = 4,
+        max_retries: int = 3,
+        backoff_factor: float = 0.1
+    ) -> List[ChunkResult]:
+        """
+        Posts outages of the specified site to the Outage API in chunks of at
+        most `max_rows` rows and `max_bytes` bytes of JSON. Chunks are sent
+        concurrently and each chunk is retried on its own on connection
+        errors and 5xx/429 responses, so a failure never resends the rows of
+        other chunks.
+
+        The requester should have at least `max_workers` pooled connections.
+
+        :param site_id: site identifier
+        :type site_id: str
+        :param outages: list of outages to post
+        :type outages: List
+        :param max_rows: maximum number of rows per chunk. Defaults to None,
+            which means no row limit
+        :type max_rows: Optional[int]
+        :param max_bytes: maximum size of a chunk body in bytes. A single row
+            larger than this is sent alone. Defaults to None, which means no
+            size limit
+        :type max_bytes: Optional[int]
+        :param max_workers: maximum number of chunks sent concurrently.
+            Defaults to 4
+        :type max_workers: int
+        :param max_retries: number of retries of a failing chunk. Defaults
+            to 3
+        :type max_retries: int
+        :param backoff_factor: base of the exponential backoff between
+            retries, in seconds. Defaults to 0.1
+        :type backoff_factor: float
+        :return: outcome of every chunk, in chunk order
+        :rtype: List[ChunkResult]
+        """
+        # an empty list is still posted once, as post_outages_to_site does
+        chunks = split_into_chunks(outages, max_rows, max_bytes) or [[]]
+
+        def post_chunk(index: int) -> ChunkResult:
+            attempt = 0
+            while True:
+                attempt += 1
+                try:
+                    self.post_outages_to_site(site_id, chunks[index])
+                    return ChunkResult(
+                        index,
+                        len(chunks[index]),
+                        attempt,
+                        outages=chunks[index]
+                    )
+                except requests.exceptions.RequestException as exc:
+                    if attempt > max_retries or not _is_retryable(exc):
+                        return ChunkResult(
+                            index,
+                            len(chunks[index]),
+                            attempt,
+                            str(exc),
+                            chunks[index]
+                        )
+                time.sleep(backoff_factor * (2 ** (attempt - 1)))
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(post_chunk, range(len(chunks))))
+
+    def post_outages_to_sites(
+        self,
+        site_ids: Iterable[str],
+        select_outages: Callable[[SiteInfo], List],
+        max_workers: int = 8,
+        post_outages: Optional[Callable[[str, List], Any]] = None
+    ) -> Dict[str, int]:
+        """
+        Processes many sites concurrently. For every site, its site info is
+        retrieved, `select_outages` is called with it to build the outages to
+        post, and the result is posted to the site.
+
+        Each site is handled end-to-end by a single worker and its selected
+        outages are dropped as soon as they are posted, so at most
+        `max_workers` result lists are alive at the same time.
+
+        :param site_ids: site identifiers
+        :type site_ids: Iterable[str]
+        :param select_outages: callable that returns the outages to post for
+            the given site info
+        :type select_outages: Callable[[SiteInfo], List]
+        :param max_workers: maximum number of sites processed concurrently.
+            Defaults to 8
+        :type max_workers: int
+        :param post_outages: callable that posts the selected outages of a
+            site, i.e. to post them in chunks. Defaults to
+            `post_outages_to_site`
+        :type post_outages: Optional[Callable[[str, List], Any]]
+        :return: number of posted outages per site identifier
+        :rtype: Dict[str, int]
+        :raises: the first exception raised while processing a site, after
+            the sites that are already in progress are finished
+        """
+        post_outages = post_outages or self.post_outages_to_site
+
+        def process_site(site_id: str) -> int:
+            site_info = self.get_site_info(site_id)
+            outages = select_outages(site_info)
+            post_outages(site_id, outages)
+            return len(outages)
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(process_site, site_id): site_id
+                for site_id in dict.fromkeys(site_ids)
+            }
+            try:
+                return {
+                    futures[future]: future.result()
+                    for future in as_completed(futures)
+                }
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                raise
+
+
+def split_into_chunks(
+    outages: List,
+    max_rows: Optional[int] = None,
+    max_bytes: Optional[int] = None
+) -> List[List]:
+    """
+    Splits outages into consecutive chunks of at most `max_rows` rows whose
+    JSON array encoding is at most `max_bytes` bytes
+
+    :param outages: list of outages
+    :type outages: List
+    :param max_rows: maximum number of rows per chunk
+    :type max_rows: Optional[int]
+    :param max_bytes: maximum size of a chunk body in bytes
+    :type max_bytes: Optional[int]
+    :return: list of chunks, empty if there are no outages
+    :rtype: List[List]
+    """
+    if max_bytes is None:
+        step = max_rows or max(len(outages), 1)
+        return [
+            outages[index:index + step]
+            for index in range(0, len(outages), step)
+        ]
+
+    chunks: List[List] = []
+    chunk: List = []
+    # "[" and "]" of the array, then each row and its ", " separator
+    chunk_bytes = 2
+    for outage in outages:
+        row_bytes = len(json.dumps(outage).encode()) + (2 if chunk else 0)
+        if chunk and (
+            chunk_bytes + row_bytes > max_bytes
+            or (max_rows is not None and len(chunk) >= max_rows)
+        ):
+            chunks.append(chunk)
+            chunk, chunk_bytes = [], 2
+            row_bytes -= 2
+        chunk.append(outage)
+        chunk_bytes += row_bytes
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+def _check_page(pages: Dict[int, List], page: int, page_size: int) -> None:
+    """
+    Checks the page that has just been retrieved. Equal adjacent pages can
+    hold duplicate items of an API that supports paging, so they only fail
+    for the first two pages when the first one is full; otherwise a warning
+    is logged.
+
+    :param pages: items of the pages retrieved so far by page number
+    :type pages: Dict[int, List]
+    :param page: number of the page that has just been retrieved
+    :type page: int
+    :param page_size: number of items per page
+    :type page_size: int
+    :raises: `ValueError` if the page shows that the endpoint does not
+        support paging
+    """
+    items = pages[page]
+    if len(items) > page_size:
+        raise ValueError(
+            f"Page {page} has {len(items)} items, more than the page size "
+            f"{page_size}. Does the API support paging?"
+        )
+    for previous, current in ((page - 1, page), (page, page + 1)):
+        if not pages.get(previous) or pages.get(current) != pages[previous]:
+            continue
+        if previous == 1 and len(pages[previous]) == page_size:
+            raise ValueError(
+                "Pages 1 and 2 are the same. Does the API support paging?")
+        LOG.warning("Pages %d and %d are the same", previous, current)
+
+
+def _get_outages_params(begin_from: Optional[str]) -> Dict[str, str]:
+    """
+    :return: query-string params of the outages endpoint. `begin_from` is
+        sent in the API format, truncated to milliseconds, so the API never
+        drops outages that the filters select
+    :rtype: Dict[str, str]
+    """
+    if begin_from is None:
+        return {}
+    return {"begin_from": format_datetime(parse_datetime(begin_from))}
+
+
+def _is_retryable(exc: requests.exceptions.RequestException) -> bool:
+    """
+    :return: whether the failed request may succeed when it is retried
+    :rtype: bool
+    """
+    response = exc.response
+    return (
+        response is None
+        or response.status_code == 429
+        or response.status_code >= 500
+    )
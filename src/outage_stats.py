@@ -0,0 +1,220 @@
+"""
+Downtime and availability statistics of devices and sites, computed on
+OutageTable columns with sort-based interval merging
+"""
+from typing import Optional, Tuple
+
+import numpy as np
+
+from .model import DeviceStats, SiteInfo, SiteStats
+from .outage_table import OutageTable, format_epoch_ms
+
+Intervals = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+# device codes are spread this far apart at most when merging all devices at
+# once, which keeps the shifted epoch milliseconds clear of int64 overflow
+_MAX_SHIFT = 2 ** 62
+
+
+def merge_intervals(
+    codes: np.ndarray,
+    begin: np.ndarray,
+    end: np.ndarray
+) -> Intervals:
+    """
+    Merges overlapping and touching intervals of the same code into their
+    union. Intervals are sorted by code and begin, and shifted by a per-code
+    offset so that a single running maximum of the ends finds where every
+    merged interval ends, for all codes at once.
+
+    :param codes: int array of the code (i.e. device) of every interval
+    :type codes: np.ndarray
+    :param begin: int64 array of interval begins
+    :type begin: np.ndarray
+    :param end: int64 array of interval ends. Ends before the begin are
+        taken as the begin
+    :type end: np.ndarray
+    :return: codes, begins and ends of the merged intervals, sorted by code
+        and begin
+    :rtype: Intervals
+    """
+    if len(codes) == 0:
+        return (
+            codes.astype(np.int64), begin.astype(np.int64),
+            end.astype(np.int64))
+
+    order = np.lexsort((begin, codes))
+    codes = codes[order].astype(np.int64)
+    begin = begin[order].astype(np.int64)
+    end = np.maximum(end[order].astype(np.int64), begin)
+
+    if codes[0] == codes[-1]:
+        shift = np.zeros(len(codes), dtype=np.int64)
+    else:
+        low = int(begin.min())
+        span = int(end.max()) - low + 1
+        if (int(codes[-1]) + 1) * span >= _MAX_SHIFT:
+            return _merge_intervals_by_code(codes, begin, end)
+        shift = codes * span - low
+    running_end = np.maximum.accumulate(end + shift)
+    starts = np.empty(len(codes), dtype=bool)
+    starts[0] = True
+    starts[1:] = begin[1:] + shift[1:] > running_end[:-1]
+    start_indices = np.flatnonzero(starts)
+    end_indices = np.append(start_indices[1:] - 1, len(codes) - 1)
+    return (
+        codes[start_indices],
+        begin[start_indices],
+        running_end[end_indices] - shift[end_indices]
+    )
+
+
+def _merge_intervals_by_code(
+    codes: np.ndarray,
+    begin: np.ndarray,
+    end: np.ndarray
+) -> Intervals:
+    """
+    Merges sorted intervals code by code, for ranges too wide to shift
+    """
+    boundaries = np.flatnonzero(np.diff(codes)) + 1
+    merged = [
+        merge_intervals(
+            np.zeros(len(group), dtype=np.int64), group, group_end)
+        for group, group_end in zip(
+            np.split(begin, boundaries), np.split(end, boundaries))
+    ]
+    group_codes = codes[np.append(0, boundaries)]
+    return (
+        np.concatenate([
+            np.full(len(result[0]), code, dtype=np.int64)
+            for code, result in zip(group_codes, merged)
+        ]),
+        np.concatenate([result[1] for result in merged]),
+        np.concatenate([result[2] for result in merged])
+    )
+
+
+def clip_to_window(
+    table: OutageTable,
+    start_ms: int,
+    end_ms: int
+) -> Intervals:
+    """
+    :param table: outages
+    :type table: OutageTable
+    :param start_ms: start of the window in epoch milliseconds
+    :type start_ms: int
+    :param end_ms: end of the window in epoch milliseconds
+    :type end_ms: int
+    :return: codes, begins and ends of the outages overlapping the window,
+        clipped to it
+    :rtype: Intervals
+    """
+    mask = (table.begin <= end_ms) & (table.end >= start_ms)
+    return (
+        table.codes[mask],
+        np.maximum(table.begin[mask], start_ms),
+        np.minimum(table.end[mask], end_ms)
+    )
+
+
+def _sum_by_code(
+    codes: np.ndarray,
+    values: np.ndarray,
+    n_codes: int
+) -> np.ndarray:
+    """
+    :return: int64 sums of the values of every code. They are summed as
+        float64, which is exact below 2 ** 53 milliseconds (285,000 years)
+    :rtype: np.ndarray
+    """
+    return np.rint(
+        np.bincount(codes, weights=values, minlength=n_codes)
+    ).astype(np.int64)
+
+
+def _get_availability(downtime_ms: int, window_ms: int) -> Optional[float]:
+    if window_ms <= 0:
+        return None
+    return 100.0 * (1 - downtime_ms / window_ms)
+
+
+def compute_site_stats(
+    table: OutageTable,
+    site_info: SiteInfo,
+    start_ms: int,
+    end_ms: int
+) -> SiteStats:
+    """
+    Computes statistics of the site and its devices over the window
+    [start_ms, end_ms]. Outages are clipped to the window. For every device:
+
+    * outage_count: number of outages overlapping the window
+    * total_duration_ms: sum of the outage durations, counting overlapping
+      outages twice
+    * downtime_ms: duration of the union of the outages
+    * availability: percentage of the window without downtime
+
+    The site has the same statistics, where downtime is the time at least
+    one of its devices is down.
+
+    :param table: outages of any devices
+    :type table: OutageTable
+    :param site_info: site information
+    :type site_info: SiteInfo
+    :param start_ms: start of the window in epoch milliseconds
+    :type start_ms: int
+    :param end_ms: end of the window in epoch milliseconds
+    :type end_ms: int
+    :return: site statistics with a DeviceStats per device of the site
+    :rtype: SiteStats
+    """
+    device_ids = [device.id for device in site_info.devices]
+    site_table = table.select(table.device_mask(device_ids))
+    codes, begin, end = clip_to_window(site_table, start_ms, end_ms)
+    n_codes = len(table.device_ids)
+
+    outage_counts = np.bincount(codes, minlength=n_codes)
+    total_durations = _sum_by_code(codes, end - begin, n_codes)
+    merged_codes, merged_begin, merged_end = merge_intervals(
+        codes, begin, end)
+    downtimes = _sum_by_code(
+        merged_codes, merged_end - merged_begin, n_codes)
+
+    _, site_begin, site_end = merge_intervals(
+        np.zeros(len(codes), dtype=np.int64), begin, end)
+    site_downtime = int((site_end - site_begin).sum())
+
+    code_of = {id_: code for code, id_ in enumerate(table.device_ids)}
+    window_ms = end_ms - start_ms
+    devices = []
+    for device in site_info.devices:
+        code = code_of.get(device.id)
+        if code is None:
+            count = duration = downtime = 0
+        else:
+            count = int(outage_counts[code])
+            duration = int(total_durations[code])
+            downtime = int(downtimes[code])
+        devices.append(DeviceStats(
+            id=device.id,
+            name=device.name,
+            outage_count=count,
+            total_duration_ms=duration,
+            downtime_ms=downtime,
+            availability=_get_availability(downtime, window_ms)
+        ))
+
+    window = format_epoch_ms(np.array([start_ms, end_ms], dtype=np.int64))
+    return SiteStats(
+        id=site_info.id,
+        name=site_info.name,
+        begin=window[0],
+        end=window[1],
+        outage_count=len(codes),
+        total_duration_ms=int((end - begin).sum()),
+        downtime_ms=site_downtime,
+        availability=_get_availability(site_downtime, window_ms),
+        devices=devices
+    )
@@ -0,0 +1,227 @@
+"""
+Columnar representation of outages backed by NumPy arrays
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from .model import Outage, parse_datetime, to_epoch_ms
+
+
+def parse_epoch_ms(values: Sequence[str]) -> np.ndarray:
+    """
+    Parses timestamps to milliseconds since the Unix epoch. If every value is
+    in the `YYYY-MM-DDTHH:MM:SS.sssZ` format of the API, they are parsed by
+    NumPy at once, otherwise one by one with `parse_datetime`.
+
+    :param values: timestamp strings
+    :type values: Sequence[str]
+    :return: int64 array of epoch milliseconds
+    :rtype: np.ndarray
+    """
+    strings = np.asarray(values, dtype=str)
+    if len(strings) == 0:
+        return np.empty(0, dtype=np.int64)
+
+    if (
+        (np.char.str_len(strings) == 24).all()
+        and np.char.endswith(strings, "Z").all()
+    ):
+        try:
+            return strings.astype("U23").astype("datetime64[ms]").view(
+                np.int64)
+        except ValueError:
+            pass
+
+    return np.fromiter(
+        (to_epoch_ms(parse_datetime(value)) for value in values),
+        dtype=np.int64,
+        count=len(values)
+    )
+
+
+def format_epoch_ms(values: np.ndarray) -> List[str]:
+    """
+    :param values: int64 array of epoch milliseconds
+    :type values: np.ndarray
+    :return: timestamps in the `YYYY-MM-DDTHH:MM:SS.sssZ` format of the API
+    :rtype: List[str]
+    """
+    return np.datetime_as_string(
+        values.view("datetime64[ms]"), unit="ms", timezone="UTC").tolist()
+
+
+class OutageTable:
+    """
+    Outages stored column-wise. Device ids are int-coded against
+    `device_ids` and begin/end are int64 epoch milliseconds, so filtering is
+    done with vectorized masks instead of per-outage Python objects.
+
+    Begin and end are normalized to UTC, hence `to_dicts` returns them in the
+    `YYYY-MM-DDTHH:MM:SS.sssZ` format regardless of the input format.
+    """
+
+    def __init__(
+        self,
+        device_ids: List[str],
+        codes: np.ndarray,
+        begin: np.ndarray,
+        end: np.ndarray
+    ):
+        """
+        :param device_ids: distinct device ids, indexed by `codes`
+        :type device_ids: List[str]
+        :param codes: int32 array of device id codes, one per outage
+        :type codes: np.ndarray
+        :param begin: int64 array of begin epoch milliseconds
+        :type begin: np.ndarray
+        :param end: int64 array of end epoch milliseconds
+        :type end: np.ndarray
+        """
+        self.device_ids = device_ids
+        self.codes = codes
+        self.begin = begin
+        self.end = end
+        self._device_codes = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @classmethod
+    def _from_columns(
+        cls,
+        ids: Iterable[str],
+        begins: Sequence[str],
+        ends: Sequence[str]
+    ) -> "OutageTable":
+        device_codes: Dict[str, int] = {}
+        codes = np.fromiter(
+            (device_codes.setdefault(id_, len(device_codes)) for id_ in ids),
+            dtype=np.int32,
+            count=len(begins)
+        )
+        table = cls(
+            list(device_codes),
+            codes,
+            parse_epoch_ms(begins),
+            parse_epoch_ms(ends)
+        )
+        table._device_codes = device_codes
+        return table
+
+    @classmethod
+    def from_dicts(cls, outage_dicts: List[Dict[str, str]]) -> "OutageTable":
+        """
+        Helper method to obtain OutageTable instance from the outage
+        dictionaries of the Outage API
+
+        :param outage_dicts: outage dictionaries
+        :type outage_dicts: List[Dict[str, str]]
+        :return: OutageTable instance
+        :rtype: OutageTable
+        """
+        return cls._from_columns(
+            [outage["id"] for outage in outage_dicts],
+            [outage["begin"] for outage in outage_dicts],
+            [outage["end"] for outage in outage_dicts]
+        )
+
+    @classmethod
+    def from_outages(cls, outages: List[Outage]) -> "OutageTable":
+        """
+        :param outages: list of outages
+        :type outages: List[Outage]
+        :return: OutageTable instance
+        :rtype: OutageTable
+        """
+        return cls._from_columns(
+            [outage.id for outage in outages],
+            [outage.begin for outage in outages],
+            [outage.end for outage in outages]
+        )
+
+    def device_mask(self, device_ids: Iterable[str]) -> np.ndarray:
+        """
+        :param device_ids: device ids to select
+        :type device_ids: Iterable[str]
+        :return: boolean mask of outages that belong to the given devices
+        :rtype: np.ndarray
+        """
+        if self._device_codes is None:
+            self._device_codes = {
+                id_: code for code, id_ in enumerate(self.device_ids)}
+
+        selected = np.zeros(len(self.device_ids), dtype=bool)
+        for device_id in device_ids:
+            code = self._device_codes.get(device_id)
+            if code is not None:
+                selected[code] = True
+        return selected[self.codes]
+
+    def mask(
+        self,
+        device_ids: Iterable[str],
+        start_ms: int,
+        end_ms: Optional[int] = None,
+        min_duration_ms: Optional[int] = None
+    ) -> np.ndarray:
+        """
+        :param device_ids: device ids to select
+        :type device_ids: Iterable[str]
+        :param start_ms: outages should begin at or after this epoch ms
+        :type start_ms: int
+        :param end_ms: outages should end at or before this epoch ms
+        :type end_ms: Optional[int]
+        :param min_duration_ms: minimum duration of outages in milliseconds
+        :type min_duration_ms: Optional[int]
+        :return: boolean mask of outages matching all given conditions
+        :rtype: np.ndarray
+        """
+        mask = self.device_mask(device_ids)
+        mask &= self.begin >= start_ms
+        if end_ms is not None:
+            mask &= self.end <= end_ms
+        if min_duration_ms is not None:
+            mask &= (self.end - self.begin) >= min_duration_ms
+        return mask
+
+    def select(self, mask: np.ndarray) -> "OutageTable":
+        """
+        :param mask: boolean mask or index array of outages to keep
+        :type mask: np.ndarray
+        :return: new table sharing the device ids of this table
+        :rtype: OutageTable
+        """
+        table = OutageTable(
+            self.device_ids,
+            self.codes[mask],
+            self.begin[mask],
+            self.end[mask]
+        )
+        table._device_codes = self._device_codes
+        return table
+
+    def to_dicts(self, device_names: Dict[str, str]) -> List[Dict]:
+        """
+        Serializes the table to the outage body dictionaries that are posted
+        to the Outage API
+
+        :param device_names: device name of every device id in the table
+        :type device_names: Dict[str, str]
+        :return: List of outage body dictionaries
+        :rtype: List[Dict]
+        """
+        ids = np.array(self.device_ids, dtype=object)[self.codes].tolist()
+        return [
+            {
+                "id": id_,
+                "name": device_names[id_],
+                "begin": begin,
+                "end": end
+            }
+            for id_, begin, end in zip(
+                ids,
+                format_epoch_ms(self.begin),
+                format_epoch_ms(self.end)
+            )
+        ]
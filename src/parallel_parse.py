@@ -0,0 +1,121 @@
+"""
+Parses outages with a pool of processes.
+
+Workers get the timestamps of a chunk of outages joined into a single string
+and return them as packed epoch milliseconds, so neither side pickles
+datetimes or Outage instances. Outages are then built in order in the calling
+process, which makes the result equal to `Outage.from_dict` of every outage.
+Building the instances stays serial, so the speedup is bounded by it.
+"""
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from .model import Outage, from_epoch_ms, parse_datetime
+
+# marks timestamps that are not in the format of the API, which are parsed
+# with `parse_datetime` by the calling process instead
+UNPARSED = -2 ** 63
+
+# below 2 ** 32 seconds, a float of seconds is within half a microsecond of
+# the exact value, so `datetime.fromtimestamp` rounds it to the exact
+# millisecond and is faster than adding a timedelta to the epoch
+_MAX_FLOAT_MS = 2 ** 42
+
+_NAIVE_EPOCH = datetime(1970, 1, 1)
+_MILLISECOND = timedelta(milliseconds=1)
+
+
+def parse_epoch_ms_chunk(timestamps: str) -> array:
+    """
+    Parses newline separated timestamps in the `YYYY-MM-DDTHH:MM:SS.sssZ`
+    format of the API, like the fast path of `parse_datetime`
+
+    :param timestamps: newline separated timestamps
+    :type timestamps: str
+    :return: milliseconds since the Unix epoch, or UNPARSED for timestamps in
+        any other format
+    :rtype: array
+    """
+    values = array("q")
+    append = values.append
+    fromisoformat = datetime.fromisoformat
+    for value in timestamps.split("\n"):
+        if len(value) == 24 and value[23] == "Z" and value[10] == "T":
+            try:
+                append(
+                    (fromisoformat(value[:23]) - _NAIVE_EPOCH) // _MILLISECOND)
+                continue
+            except ValueError:
+                pass
+        append(UNPARSED)
+    return values
+
+
+def _to_datetime(
+    value: str,
+    epoch_ms: int,
+    _fromtimestamp=datetime.fromtimestamp,
+    _utc=timezone.utc
+) -> datetime:
+    if 0 <= epoch_ms < _MAX_FLOAT_MS:
+        return _fromtimestamp(epoch_ms / 1000, _utc)
+    if epoch_ms == UNPARSED:
+        return parse_datetime(value)
+    return from_epoch_ms(epoch_ms)
+
+
+def parse_outages(
+    outage_dicts: List[Dict[str, str]],
+    workers: int,
+    chunk_size: int = 50000
+) -> List[Outage]:
+    """
+    Parses outages like `Outage.from_dict`, with the timestamps parsed by
+    `workers` processes. Payloads that fit into a single chunk are parsed in
+    this process, where starting the pool would cost more than it saves.
+
+    :param outage_dicts: outage dictionaries
+    :type outage_dicts: List[Dict[str, str]]
+    :param workers: number of worker processes
+    :type workers: int
+    :param chunk_size: number of outages sent to a worker at once. Defaults
+        to 50000
+    :type chunk_size: int
+    :return: outages in the order of `outage_dicts`
+    :rtype: List[Outage]
+    """
+    if workers <= 1 or len(outage_dicts) <= chunk_size:
+        return [Outage.from_dict(outage) for outage in outage_dicts]
+
+    starts = range(0, len(outage_dicts), chunk_size)
+    chunks = [
+        "\n".join([
+            value
+            for outage in outage_dicts[start:start + chunk_size]
+            for value in (outage["begin"], outage["end"])
+        ])
+        for start in starts
+    ]
+    epoch_ms = array("q")
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for start, values in zip(
+            starts, executor.map(parse_epoch_ms_chunk, chunks)
+        ):
+            expected = 2 * len(outage_dicts[start:start + chunk_size])
+            if len(values) != expected:
+                # a timestamp contained the separator, so the chunk is
+                # parsed here
+                values = array("q", [UNPARSED]) * expected
+            epoch_ms.extend(values)
+
+    values = iter(epoch_ms)
+    return [
+        Outage(
+            begin_datetime=_to_datetime(outage["begin"], next(values)),
+            end_datetime=_to_datetime(outage["end"], next(values)),
+            **outage
+        )
+        for outage in outage_dicts
+    ]
@@ -2,16 +2,42 @@
 Requester class abstracts all requests have been made and attachs anything
 required (i.e. api key) to the request
 """
-from urllib.parse import urljoin
-from typing import Any, Dict, List, Union
+import json
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import requests
 from requests.adapters import HTTPAdapter, Retry
 
+from .codec import JsonCodec, convert
+from .compression import TransferCounter, compress, get_encodings
+from .instrumentation import NO_INSTRUMENTATION, Instrumentation
+from .json_stream import iter_json_array
+from .response_cache import ResponseCache
+from .throttle import Throttle
+
 
 class Requester:
 
-    def __init__(self, base_url: str, api_key: str, max_retries: int = 5):
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        max_retries: int = 5,
+        pool_connections: int = 10,
+        pool_maxsize: int = 10,
+        cache: Optional[ResponseCache] = None,
+        throttle: Optional[Throttle] = None,
+        instrumentation: Instrumentation = NO_INSTRUMENTATION,
+        compression: Optional[str] = None,
+        compression_threshold: int = 1024,
+        accept_encoding: Optional[str] = None,
+        codec: Optional[JsonCodec] = None,
+        timeout: Optional[Union[float, Tuple[float, float]]] = None,
+        count_transfer: bool = False
+    ):
         """
         :param base_url: Base API URL. (i.e. https://localhost:5000)
         :type base_url: str
@@ -20,20 +46,125 @@ class Requester:
         :param max_retries: number of retries in case request faces with an
             unexpected response from the server. Defaults to 5
         :type max_retries: int
+        :param pool_connections: number of connection pools to cache (one per
+            host). Defaults to 10
+        :type pool_connections: int
+        :param pool_maxsize: maximum number of keep-alive connections kept in
+            each pool. Should be at least the number of threads sharing this
+            requester. Defaults to 10
+        :type pool_maxsize: int
+        :param cache: if given, responses of get requests are cached and
+            revalidated with conditional requests. Defaults to None
+        :type cache: Optional[ResponseCache]
+        :param throttle: if given, all requests are rate limited, concurrency
+            is adapted to the responses and retries on 429/5xx are done by
+            the throttle instead of the connection pool. Posts are only
+            retried on 429/503. Defaults to None
+        :type throttle: Optional[Throttle]
+        :param instrumentation: receives every API call with its duration,
+            status, sizes and retries, and the time of decoding responses.
+            Defaults to no instrumentation
+        :type instrumentation: Instrumentation
+        :param compression: if given, post bodies of at least
+            `compression_threshold` bytes are compressed with this content
+            encoding, gzip or br. Defaults to None
+        :type compression: Optional[str]
+        :param compression_threshold: minimum size of the post bodies that
+            are compressed, in bytes. Defaults to 1024
+        :type compression_threshold: int
+        :param accept_encoding: if given, sent as the `Accept-Encoding`
+            header, i.e. `compression.get_accept_encoding()`. Defaults to
+            None, which leaves the default of the session
+        :type accept_encoding: Optional[str]
+        :param codec: if given, response and post bodies are decoded and
+            encoded with this codec (see `codec.get_codec`) instead of the
+            `json` module through requests. Defaults to None
+        :type codec: Optional[JsonCodec]
+        :param timeout: seconds to wait for the connection and for every
+            read of a response, or a (connect, read) tuple of them, after
+            which the request fails with `requests.exceptions.Timeout`.
+            Defaults to None, which means waiting forever
+        :type timeout: Optional[Union[float, Tuple[float, float]]]
+        :param count_transfer: whether the bytes of request and response
+            bodies are counted in `transfer`. They are always counted with
+            a compression. Defaults to False
+        :type count_transfer: bool
+        :raises: `ValueError` if the compression is not available
         """
+        if compression is not None and compression not in get_encodings():
+            raise ValueError(
+                f"Unsupported compression {compression!r}, "
+                f"available: {', '.join(get_encodings())}"
+            )
         self._base_url = base_url
         self._api_key = api_key
         self._max_retries = max_retries
+        self._pool_connections = pool_connections
+        self._pool_maxsize = pool_maxsize
+        if throttle is None:
+            self._retries = Retry(
+                total=self._max_retries,
+                backoff_factor=0.1,
+                status_forcelist=[500]
+            )
+        else:
+            # statuses are retried by the throttle only, the pool would
+            # otherwise retry 413/429/503 with Retry-After behind its back
+            self._retries = Retry(
+                total=self._max_retries,
+                backoff_factor=0.1,
+                status_forcelist=[],
+                respect_retry_after_header=False
+            )
+        self._session = None
+        self._session_lock = threading.Lock()
+        self.cache = cache
+        self.throttle = throttle
+        self.instrumentation = instrumentation
+        self.compression = compression
+        self.compression_threshold = compression_threshold
+        self.accept_encoding = accept_encoding
+        self.codec = codec
+        self.timeout = timeout
+        self._loads = json.loads if codec is None else codec.loads
+        # bytes are counted when asked for or when compression is set up,
+        # the counts tell what it saves
+        self.transfer = TransferCounter()
+        self._count_transfer = count_transfer or compression is not None
+
+    def __enter__(self) -> "Requester":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Closes the underlying session and releases pooled connections. The
+        requester can still be used afterwards, a new session is opened on
+        the next request.
+
+        :return: None
+        :rtype: None
+        """
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
 
     def _get_headers(self) -> Dict[str, str]:
         """
-        :return: request headers. Accept and X-API-Key
+        :return: request headers. Accept, X-API-Key and Accept-Encoding if
+            it is given
         :rtype: Dict[str, str]
         """
-        return {
+        headers = {
             "Accept": "application/json",
             "X-API-Key": self._api_key
         }
+        if self.accept_encoding is not None:
+            headers["Accept-Encoding"] = self.accept_encoding
+        return headers
 
     def _handle_response(self, res: requests.Response) -> requests.Response:
         """
@@ -52,24 +183,138 @@ class Requester:
                 res.raise_for_status()
             except requests.exceptions.HTTPError as exc:
                 msg = f"{exc} {res.json()}"
-                raise requests.exceptions.HTTPError(msg) from exc
+                raise requests.exceptions.HTTPError(
+                    msg, response=res) from exc
 
         return res
 
     def _get_request_session(self) -> requests.Session:
         """
+        Returns the session of this requester, creating it on first use. The
+        session is kept open so that keep-alive connections are reused across
+        requests until `close` is called.
+
         :return: request session instance
         :rtype: requests.Session
         """
-        session = requests.Session()
-        retries = Retry(
-            total=self._max_retries,
-            backoff_factor=0.1,
-            status_forcelist=[500]
+        with self._session_lock:
+            if self._session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self._pool_connections,
+                    pool_maxsize=self._pool_maxsize,
+                    max_retries=self._retries
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+                self._session = session
+            return self._session
+
+    def _send(self, method: str, url: str, **kwargs) -> requests.Response:
+        """
+        Sends the request with the session of this requester, through the
+        throttle if there is one
+
+        :param method: name of the session method, i.e. get or post
+        :type method: str
+        :param url: request url
+        :type url: str
+        :return: response
+        :rtype: requests.Response
+        """
+        send = getattr(self._get_request_session(), method)
+        if self.timeout is not None:
+            kwargs["timeout"] = self.timeout
+        idempotent = method != "post"
+        if not self.instrumentation.enabled:
+            if self.throttle is None:
+                return send(url, **kwargs)
+            return self.throttle.call(
+                lambda: send(url, **kwargs), idempotent)
+
+        attempts = 0
+
+        def send_once() -> requests.Response:
+            nonlocal attempts
+            attempts += 1
+            return send(url, **kwargs)
+
+        endpoint = self._get_endpoint_label(url)
+        started = time.perf_counter()
+        try:
+            if self.throttle is None:
+                res = send_once()
+            else:
+                res = self.throttle.call(send_once, idempotent)
+        except requests.exceptions.RequestException:
+            self.instrumentation.record_request(
+                method,
+                endpoint,
+                0,
+                time.perf_counter() - started,
+                retries=max(0, attempts - 1)
+            )
+            raise
+
+        retry = getattr(res.raw, "retries", None)
+        pool_retries = getattr(retry, "history", ())
+        if kwargs.get("stream"):
+            # the body is not read yet, so only its announced size is known
+            bytes_received = int(res.headers.get("Content-Length") or 0)
+        else:
+            bytes_received = len(res.content or b"")
+        self.instrumentation.record_request(
+            method,
+            endpoint,
+            res.status_code,
+            time.perf_counter() - started,
+            bytes_sent=len(res.request.body or b""),
+            bytes_received=bytes_received,
+            retries=attempts - 1 + len(pool_retries)
         )
-        session.mount('http://', HTTPAdapter(max_retries=retries))
-        session.mount('https://', HTTPAdapter(max_retries=retries))
-        return session
+        return res
+
+    def _get_endpoint_label(self, url: str) -> str:
+        """
+        :param url: request url
+        :type url: str
+        :return: first path segment of the url below the base url, i.e.
+            site-info, which keeps the number of distinct labels small
+        :rtype: str
+        """
+        path = urlsplit(url).path
+        base_path = urlsplit(urljoin(self._base_url, ".")).path
+        if path.startswith(base_path):
+            path = path[len(base_path):]
+        return path.strip("/").split("/", 1)[0]
+
+    def _count_received(self, res: requests.Response, decoded: int) -> None:
+        """
+        Counts the received body, as sent by the server and as decoded. The
+        body must have been read.
+
+        :param res: response
+        :type res: requests.Response
+        :param decoded: size of the decoded body
+        :type decoded: int
+        """
+        try:
+            wire = res.raw.tell()
+        except AttributeError:
+            wire = decoded
+        self.transfer.add_received(wire, decoded)
+
+    def _decode(self, res: requests.Response) -> Union[List, Dict]:
+        """
+        :param res: response
+        :type res: requests.Response
+        :return: response serialized to python list or dict
+        :rtype: Union[List, Dict]
+        """
+        with self.instrumentation.stage("decode"):
+            if self.codec is None:
+                return res.json()
+            return self.codec.loads(res.content)
 
     def get(
         self,
@@ -89,10 +334,159 @@ class Requester:
         :rtype: Union[List, Dict]
         """
         url = urljoin(self._base_url, endpoint)
-        req_session = self._get_request_session()
-        res = req_session.get(url, headers=self._get_headers(), params=params)
+        if self.cache is not None:
+            return self._get_cached(url, params)
+
+        res = self._send(
+            "get", url, headers=self._get_headers(), params=params)
         res = self._handle_response(res)
-        return res.json()
+        if self._count_transfer:
+            self._count_received(res, len(res.content))
+        return self._decode(res)
+
+    def _get_cached(
+        self,
+        url: str,
+        params: Dict[str, Any]
+    ) -> Union[List, Dict]:
+        """
+        Serves the get request from the cache. A cached response is sent
+        with its validators and served again if the server responds with
+        304, without downloading or decoding the body. Its body is only
+        read from disk if it is not decoded in memory already.
+
+        :param url: request url
+        :type url: str
+        :param params: query-string params
+        :type params: Dict[str, Any]
+        :return: response serialized to python list or dict
+        :rtype: Union[List, Dict]
+        """
+        key = self.cache.get_key(url, params)
+        entry = self.cache.get(key)
+        if entry is not None and self.cache.is_fresh(entry):
+            try:
+                return self.cache.decode(
+                    key, entry, self._loads, url, params)
+            except OSError:
+                # the body has been evicted since the lookup
+                entry = None
+
+        headers = self._get_headers()
+        if entry is not None:
+            headers.update(entry.get_conditional_headers())
+
+        res = self._send("get", url, headers=headers, params=params)
+        if res.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            try:
+                return self.cache.decode(
+                    key, entry, self._loads, url, params)
+            except OSError:
+                res = self._send(
+                    "get", url, headers=self._get_headers(), params=params)
+
+        res = self._handle_response(res)
+        if self._count_transfer:
+            self._count_received(res, len(res.content))
+        stored = self.cache.put(
+            key,
+            res.content,
+            res.headers.get("ETag"),
+            res.headers.get("Last-Modified")
+        )
+        if stored is None:
+            return self._decode(res)
+        with self.instrumentation.stage("decode"):
+            return self.cache.decode(
+                key, stored, self._loads, url, params)
+
+    def get_as(
+        self,
+        endpoint: str,
+        type_: Any,
+        **params: Dict[str, Any]
+    ) -> Any:
+        """
+        Sends get requests to the given endpoint and decodes the response
+        into models. Codecs that support it (see `JsonCodec.decodes_models`)
+        decode the response bytes straight into the models; otherwise, and
+        for cached responses, the models are built from the decoded JSON
+        like their `from_dict`.
+
+        :param endpoint: endpoint of the API to send the get request
+        :type endpoint: str
+        :param type_: model class, or a list of them, i.e. `List[Outage]`
+        :type type_: Any
+        :param params: keyword arguments which will be used as query-string
+            params. (i.e. sort=id, order=asc)
+        :type params: Dict[str, Any]
+        :return: response decoded into models
+        :rtype: Any
+        """
+        if self.cache is not None:
+            return convert(self.get(endpoint, **params), type_)
+
+        url = urljoin(self._base_url, endpoint)
+        res = self._send(
+            "get", url, headers=self._get_headers(), params=params)
+        res = self._handle_response(res)
+        if self._count_transfer:
+            self._count_received(res, len(res.content))
+        codec = self.codec or JsonCodec()
+        with self.instrumentation.stage("decode"):
+            return codec.decode(res.content, type_)
+
+    def iter_array(
+        self,
+        endpoint: str,
+        chunk_size: int = 64 * 1024,
+        **params: Dict[str, Any]
+    ) -> Iterator[Any]:
+        """
+        Sends get requests to the given endpoint, whose response is a JSON
+        array, and yields its elements while the response body is read. Only
+        a single chunk of the body is kept in memory at a time.
+
+        :param endpoint: endpoint of the API to send the get request
+        :type endpoint: str
+        :param chunk_size: number of bytes read from the response at once.
+            Defaults to 64 KiB
+        :type chunk_size: int
+        :param params: keyword arguments which will be used as query-string
+            params. There will be no query-string param if no keyword-argument
+            is specified. (i.e. sort=id, order=asc)
+        :type params: Dict[str, Any]
+        :return: iterator of the array elements serialized to python objects
+        :rtype: Iterator[Any]
+        """
+        url = urljoin(self._base_url, endpoint)
+        res = self._send(
+            "get",
+            url,
+            headers=self._get_headers(),
+            params=params,
+            stream=True
+        )
+        with res:
+            res = self._handle_response(res)
+            if not self._count_transfer:
+                yield from iter_json_array(res.iter_content(chunk_size))
+                return
+
+            decoded = 0
+
+            def iter_counted() -> Iterator[bytes]:
+                nonlocal decoded
+                for chunk in res.iter_content(chunk_size):
+                    decoded += len(chunk)
+                    yield chunk
+
+            try:
+                yield from iter_json_array(iter_counted())
+            finally:
+                # counts what has been read, also if iteration stops early
+                self._count_received(res, decoded)
 
     def post(
         self,
@@ -102,7 +496,9 @@ class Requester:
     ) -> Union[List, Dict]:
         """
         Sends post requests to the given endpoint and with the given body,
-        if specified.
+        if specified. The body is encoded with the codec if there is one,
+        and compressed if it is at least `compression_threshold` bytes and
+        compression is set up.
 
         :param endpoint: endpoint of the API to send the get request
         :type endpoint: str
@@ -116,8 +512,58 @@ class Requester:
         :rtype: Union[List, Dict]
         """
         url = urljoin(self._base_url, endpoint)
-        req_session = self._get_request_session()
-        res = req_session.post(
-            url, headers=self._get_headers(), json=body, params=params)
+        if self.compression is not None or self.codec is not None:
+            res = self._post_encoded(url, body, params)
+        else:
+            res = self._send(
+                "post",
+                url,
+                headers=self._get_headers(),
+                json=body,
+                params=params
+            )
+            if self._count_transfer:
+                sent = len(res.request.body or b"")
+                self.transfer.add_sent(sent, sent)
         res = self._handle_response(res)
         return res.json()
+
+    def _post_encoded(
+        self,
+        url: str,
+        body: Dict[Any, Any],
+        params: Dict[str, Any]
+    ) -> requests.Response:
+        """
+        Sends the post request with the body encoded by the codec, or as
+        JSON like `json=` of requests, and compressed if compression is set
+        up and it is large enough
+
+        :param url: request url
+        :type url: str
+        :param body: POST request body
+        :type body: Dict[Any, Any]
+        :param params: query-string params
+        :type params: Dict[str, Any]
+        :return: response
+        :rtype: requests.Response
+        """
+        if self.codec is not None:
+            with self.instrumentation.stage("encode"):
+                data = self.codec.dumps(body)
+        else:
+            data = json.dumps(body, allow_nan=False).encode("utf-8")
+        size = len(data)
+        headers = self._get_headers()
+        headers["Content-Type"] = "application/json"
+        if (
+            self.compression is not None
+            and size >= self.compression_threshold
+        ):
+            with self.instrumentation.stage("compress"):
+                data = compress(data, self.compression)
+            headers["Content-Encoding"] = self.compression
+        if self._count_transfer:
+            self.transfer.add_sent(len(data), size)
+        return self._send(
+            "post", url, headers=headers, data=data, params=params)
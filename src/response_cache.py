@@ -0,0 +1,277 @@
+"""
+On-disk cache of GET response bodies, revalidated with ETag and
+Last-Modified
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+
+@dataclass
+class CacheEntry:
+
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    stored_at: float = 0.0
+    body_path: Optional[str] = None
+    _body: Optional[bytes] = field(default=None, repr=False, compare=False)
+
+    @property
+    def body(self) -> bytes:
+        """
+        :return: response body, read from `body_path` on first use only, so
+            that entries served from memory are never read from disk
+        :rtype: bytes
+        :raises: `OSError` if the body has been evicted since the lookup
+        """
+        if self._body is None:
+            with open(self.body_path, "rb") as fp:
+                self._body = fp.read()
+        return self._body
+
+    @property
+    def has_validators(self) -> bool:
+        """
+        :return: whether the entry can be revalidated with the server
+        :rtype: bool
+        """
+        return self.etag is not None or self.last_modified is not None
+
+    def get_conditional_headers(self) -> Dict[str, str]:
+        """
+        :return: If-None-Match and If-Modified-Since headers of the entry
+        :rtype: Dict[str, str]
+        """
+        headers = {}
+        if self.etag is not None:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified is not None:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+class ResponseCache:
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: Optional[float] = None
+    ):
+        """
+        :param directory: directory of the cache files, created if missing
+        :type directory: str
+        :param max_bytes: maximum total size of the cached bodies. The least
+            recently used entries are evicted beyond it. Defaults to 256 MiB
+        :type max_bytes: int
+        :param ttl: seconds during which an entry without validators is
+            served without asking the server. Defaults to None, which means
+            such entries are never served
+        :type ttl: Optional[float]
+        """
+        self._directory = directory
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # decoded bodies of the latest params of every url: the params
+        # without the page, and the bodies by key tagged with stored_at of
+        # their entry
+        self._decoded: Dict[
+            str, Tuple[str, Dict[str, Tuple[float, Any]]]] = {}
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def get_key(url: str, params: Dict[str, Any]) -> str:
+        """
+        :param url: request url
+        :type url: str
+        :param params: query-string params
+        :type params: Dict[str, Any]
+        :return: cache key of the request
+        :rtype: str
+        """
+        query = urlencode(sorted(params.items()), doseq=True)
+        return hashlib.sha256(f"{url}?{query}".encode()).hexdigest()
+
+    def _get_paths(self, key: str) -> Tuple[str, str]:
+        path = os.path.join(self._directory, key)
+        return path + ".body", path + ".meta"
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        """
+        :param key: cache key
+        :type key: str
+        :return: cached entry, None if there is none. Only its metadata is
+            read, the body is read when it is used
+        :rtype: Optional[CacheEntry]
+        """
+        body_path, meta_path = self._get_paths(key)
+        try:
+            with open(meta_path, "r") as fp:
+                meta = json.load(fp)
+        except (OSError, ValueError):
+            return None
+        return CacheEntry(body_path=body_path, **meta)
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """
+        :param entry: cached entry
+        :type entry: CacheEntry
+        :return: whether the entry can be served without asking the server,
+            which is only the case for entries without validators younger
+            than the TTL
+        :rtype: bool
+        """
+        return (
+            not entry.has_validators
+            and self._ttl is not None
+            and time.time() - entry.stored_at < self._ttl
+        )
+
+    def put(
+        self,
+        key: str,
+        body: bytes,
+        etag: Optional[str] = None,
+        last_modified: Optional[str] = None
+    ) -> Optional[CacheEntry]:
+        """
+        Stores the response body with its validators, unless it could never
+        be served from the cache, and evicts least recently used entries if
+        the cache gets too large
+
+        :param key: cache key
+        :type key: str
+        :param body: response body
+        :type body: bytes
+        :param etag: ETag header of the response
+        :type etag: Optional[str]
+        :param last_modified: Last-Modified header of the response
+        :type last_modified: Optional[str]
+        :return: stored entry, None if it has not been stored
+        :rtype: Optional[CacheEntry]
+        """
+        body_path, meta_path = self._get_paths(key)
+        entry = CacheEntry(
+            etag, last_modified, time.time(), body_path, body)
+        if (
+            (not entry.has_validators and self._ttl is None)
+            or len(body) > self._max_bytes
+        ):
+            return None
+
+        meta = {
+            "etag": etag,
+            "last_modified": last_modified,
+            "stored_at": entry.stored_at
+        }
+        with self._lock:
+            self._write(body_path, body)
+            self._write(meta_path, json.dumps(meta).encode())
+            self._evict()
+        return entry
+
+    def touch(self, key: str) -> None:
+        """
+        Marks the entry as recently used after it has been revalidated
+
+        :param key: cache key
+        :type key: str
+        :return: None
+        :rtype: None
+        """
+        body_path, _ = self._get_paths(key)
+        try:
+            os.utime(body_path)
+        except OSError:
+            pass
+
+    def decode(
+        self,
+        key: str,
+        entry: CacheEntry,
+        loads: Callable[[bytes], Any] = json.loads,
+        url: Optional[str] = None,
+        params: Optional[Dict[str, Any]] = None
+    ) -> Any:
+        """
+        Decodes the JSON body of the entry. The decoded object is kept in
+        memory, so an entry that is served again returns the very same
+        object without reading or decoding its body. Callers must not
+        modify it.
+
+        Decoded bodies are only kept for the latest params of the url. The
+        pages of the same params are kept together, but a request with
+        other params, i.e. another `begin_from`, drops the bodies of the
+        previous ones.
+
+        :param key: cache key
+        :type key: str
+        :param entry: cached entry
+        :type entry: CacheEntry
+        :param loads: JSON decoder of the body. Defaults to `json.loads`
+        :type loads: Callable[[bytes], Any]
+        :param url: request url of the entry. Defaults to None, which means
+            the body is kept until the key is decoded again
+        :type url: Optional[str]
+        :param params: query-string params of the entry. Defaults to None
+        :type params: Optional[Dict[str, Any]]
+        :return: body serialized to python objects
+        :rtype: Any
+        :raises: `OSError` if the body has to be read but has been evicted
+        """
+        group = key
+        if url is not None:
+            group = self.get_key(url, {
+                name: value for name, value in (params or {}).items()
+                if name != "page"
+            })
+        with self._lock:
+            current = self._decoded.get(url or key)
+            if current is None or current[0] != group:
+                current = self._decoded[url or key] = (group, {})
+            decoded = current[1].get(key)
+        if decoded is not None and decoded[0] == entry.stored_at:
+            return decoded[1]
+
+        data = loads(entry.body)
+        with self._lock:
+            current[1][key] = (entry.stored_at, data)
+        return data
+
+    def _write(self, path: str, data: bytes) -> None:
+        fd, tmp_path = tempfile.mkstemp(dir=self._directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(data)
+        os.replace(tmp_path, path)
+
+    def _evict(self) -> None:
+        """
+        Removes least recently used entries until the bodies fit into
+        `max_bytes`
+        """
+        bodies = []
+        for item in os.scandir(self._directory):
+            if item.name.endswith(".body"):
+                stat = item.stat()
+                bodies.append((stat.st_mtime, stat.st_size, item.path))
+
+        total = sum(size for _, size, _ in bodies)
+        for _, size, path in sorted(bodies):
+            if total <= self._max_bytes:
+                break
+            key = os.path.basename(path)[:-len(".body")]
+            for cache_path in self._get_paths(key):
+                try:
+                    os.remove(cache_path)
+                except OSError:
+                    pass
+            for _, decoded in self._decoded.values():
+                decoded.pop(key, None)
+            total -= size
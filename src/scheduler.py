@@ -0,0 +1,195 @@
+"""
+Runs a job periodically, for the watch mode of the application
+"""
+import logging
+import os
+import random
+import signal
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+LOG = logging.getLogger(__name__)
+
+
+class Scheduler:
+    """
+    Runs a job every `interval` seconds plus a random jitter, one cycle at a
+    time. A cycle that takes longer than the interval delays the next one
+    instead of overlapping it, and missed ticks are skipped rather than run
+    back to back. A failing cycle is logged and the next one runs as planned.
+
+    With a lock file, cycles also do not overlap with cycles of other
+    processes using the same file, i.e. another watcher or a cron run.
+    """
+
+    def __init__(
+        self,
+        job: Callable[[], None],
+        interval: float,
+        jitter: float = 0.0,
+        lock_path: Optional[str] = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None
+    ):
+        """
+        :param job: callable run every cycle
+        :type job: Callable[[], None]
+        :param interval: seconds between the starts of two cycles
+        :type interval: float
+        :param jitter: maximum random seconds added to every wait, which
+            spreads the cycles of many watchers. Defaults to 0
+        :type jitter: float
+        :param lock_path: if given, cycles hold an exclusive lock of this
+            file and are skipped while another process holds it. Defaults to
+            None
+        :type lock_path: Optional[str]
+        :param clock: monotonic clock in seconds
+        :type clock: Callable[[], float]
+        :param rng: random number generator of the jitter
+        :type rng: Optional[random.Random]
+        """
+        self._job = job
+        self._interval = interval
+        self._jitter = jitter
+        self._lock_path = lock_path
+        self._clock = clock
+        self._random = rng or random.Random()
+        self._stopped = threading.Event()
+        self._signal_handlers: Dict[int, Any] = {}
+        self._cycle_lock = threading.Lock()
+        self._metrics = {"cycles": 0, "failures": 0, "skipped": 0}
+
+    def get_metrics(self) -> Dict[str, int]:
+        """
+        :return: numbers of cycles run, failed and skipped
+        :rtype: Dict[str, int]
+        """
+        return dict(self._metrics)
+
+    @property
+    def stopped(self) -> bool:
+        """
+        :return: whether the scheduler has been asked to stop
+        :rtype: bool
+        """
+        return self._stopped.is_set()
+
+    def stop(self, *args) -> None:
+        """
+        Asks the scheduler to stop. A running cycle is completed first.
+        Accepts the arguments of a signal handler.
+        """
+        if not self._stopped.is_set():
+            LOG.info("Stopping after the current cycle")
+        self._stopped.set()
+
+    def install_signal_handlers(self) -> None:
+        """
+        Stops the scheduler gracefully on SIGTERM and SIGINT. The previous
+        handlers are restored by the first signal, so a second one stops the
+        process right away even if the running cycle is stuck. Must be
+        called from the main thread.
+        """
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            self._signal_handlers[signum] = signal.signal(
+                signum, self._handle_signal)
+
+    def _handle_signal(self, signum: int, frame: Any) -> None:
+        LOG.info(
+            "Received signal %s, send it again to stop immediately", signum)
+        self.stop()
+        for handled, handler in self._signal_handlers.items():
+            signal.signal(
+                handled, signal.SIG_DFL if handler is None else handler)
+
+    def run_once(self) -> bool:
+        """
+        Runs a cycle unless one is already running in this or, with a lock
+        file, another process
+
+        :return: whether the cycle ran
+        :rtype: bool
+        """
+        if not self._cycle_lock.acquire(blocking=False):
+            LOG.warning("Previous cycle is still running, skipping")
+            self._metrics["skipped"] += 1
+            return False
+        try:
+            with FileLock(self._lock_path) as locked:
+                if not locked:
+                    LOG.warning(
+                        "%s is locked by another process, skipping",
+                        self._lock_path
+                    )
+                    self._metrics["skipped"] += 1
+                    return False
+                self._metrics["cycles"] += 1
+                try:
+                    self._job()
+                except Exception:
+                    self._metrics["failures"] += 1
+                    LOG.exception("Cycle failed")
+                return True
+        finally:
+            self._cycle_lock.release()
+
+    def run(self, max_cycles: Optional[int] = None) -> None:
+        """
+        Runs cycles until `stop` is called
+
+        :param max_cycles: if given, stops after this many cycles. Defaults
+            to None
+        :type max_cycles: Optional[int]
+        """
+        cycles = 0
+        next_start = self._clock()
+        while not self._stopped.is_set():
+            self.run_once()
+            cycles += 1
+            if max_cycles is not None and cycles >= max_cycles:
+                break
+
+            next_start += self._interval
+            now = self._clock()
+            if now > next_start and self._interval > 0:
+                missed = int((now - next_start) // self._interval) + 1
+                LOG.warning(
+                    "Cycle overran the interval, skipping %s tick(s)", missed)
+                next_start += missed * self._interval
+            delay = next_start - now + self._random.uniform(0, self._jitter)
+            self._stopped.wait(max(0.0, delay))
+
+
+class FileLock:
+    """
+    Non-blocking exclusive lock of a file, held by at most one process. A
+    lock without a path is always acquired.
+    """
+
+    def __init__(self, path: Optional[str]):
+        self._path = path
+        self._fd: Optional[int] = None
+
+    def __enter__(self) -> bool:
+        if self._path is None or fcntl is None:
+            return True
+        fd = os.open(self._path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._fd = fd
+        return True
+
+    def __exit__(self, *exc_info) -> None:
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
@@ -0,0 +1,172 @@
+"""
+Binary snapshots of outage tables, loaded without copying through `mmap`.
+
+A snapshot is a little-endian file of:
+
+* a header: magic, version, number of outages and devices, and the offset
+  and size of every section
+* the string table of device ids: int64 offsets of every id followed by
+  their UTF-8 bytes
+* the int32 device code, int64 begin and int64 end epoch milliseconds of
+  every outage, one column after the other
+
+Sections start at multiples of 64 bytes, so the columns are mapped into
+aligned NumPy arrays. Loading reads the header and the device ids only; the
+columns are paged in by the operating system when they are used.
+"""
+import mmap
+import os
+import struct
+import tempfile
+from typing import List, Tuple
+
+import numpy as np
+
+from .outage_table import OutageTable
+
+MAGIC = b"OUTSNAP\x00"
+VERSION = 1
+
+# magic, version, flags, outages, devices, and the offset and size of the
+# string table and of the codes, begin and end columns
+_HEADER = struct.Struct("<8sIIQQQQQQQQQQ")
+_ALIGNMENT = 64
+
+_CODE_DTYPE = np.dtype("<i4")
+_MS_DTYPE = np.dtype("<i8")
+
+
+def _align(offset: int) -> int:
+    return -(-offset // _ALIGNMENT) * _ALIGNMENT
+
+
+def _encode_strings(values: List[str]) -> bytes:
+    """
+    :return: int64 offsets of the values followed by their UTF-8 bytes
+    :rtype: bytes
+    """
+    encoded = [value.encode("utf-8") for value in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=_MS_DTYPE)
+    np.cumsum([len(value) for value in encoded], out=offsets[1:])
+    return offsets.tobytes() + b"".join(encoded)
+
+
+def write_snapshot(path: str, table: OutageTable) -> int:
+    """
+    Writes the outage table as a snapshot. The file is replaced atomically,
+    so readers see either the previous or the new snapshot.
+
+    :param path: snapshot file
+    :type path: str
+    :param table: outages to write
+    :type table: OutageTable
+    :return: size of the snapshot in bytes
+    :rtype: int
+    """
+    strings = _encode_strings(table.device_ids)
+    columns = [
+        np.ascontiguousarray(table.codes, dtype=_CODE_DTYPE),
+        np.ascontiguousarray(table.begin, dtype=_MS_DTYPE),
+        np.ascontiguousarray(table.end, dtype=_MS_DTYPE),
+    ]
+
+    sections = []
+    offset = _align(_HEADER.size)
+    for size in [len(strings)] + [column.nbytes for column in columns]:
+        sections.append((offset, size))
+        offset = _align(offset + size)
+    header = _HEADER.pack(
+        MAGIC,
+        VERSION,
+        0,
+        len(table),
+        len(table.device_ids),
+        *[value for section in sections for value in section]
+    )
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as fp:
+            fp.write(header)
+            for (section_offset, _), data in zip(
+                sections, [strings] + columns
+            ):
+                fp.write(b"\x00" * (section_offset - fp.tell()))
+                fp.write(memoryview(data).cast("B"))
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return sections[-1][0] + sections[-1][1]
+
+
+def _read_header(
+    buffer: mmap.mmap
+) -> Tuple[int, int, List[Tuple[int, int]]]:
+    """
+    :return: number of outages, number of devices and the offset and size
+        of every section
+    :rtype: Tuple[int, int, List[Tuple[int, int]]]
+    :raises: `ValueError` if the buffer is not a valid snapshot
+    """
+    if len(buffer) < _HEADER.size:
+        raise ValueError("Snapshot is truncated")
+    magic, version, _, n_outages, n_devices, *values = _HEADER.unpack_from(
+        buffer)
+    if magic != MAGIC:
+        raise ValueError("Not an outage snapshot")
+    if version != VERSION:
+        raise ValueError(f"Unsupported snapshot version {version}")
+
+    sections = list(zip(values[::2], values[1::2]))
+    expected = [
+        8 * (n_devices + 1),
+        _CODE_DTYPE.itemsize * n_outages,
+        _MS_DTYPE.itemsize * n_outages,
+        _MS_DTYPE.itemsize * n_outages,
+    ]
+    for (offset, size), minimum in zip(sections, expected):
+        if size < minimum or offset + size > len(buffer):
+            raise ValueError("Snapshot is truncated")
+    return n_outages, n_devices, sections
+
+
+def load_snapshot(path: str) -> OutageTable:
+    """
+    Maps the snapshot into memory and returns its outages. The columns of
+    the table are read-only views of the mapped file, which stays mapped
+    while they are referenced.
+
+    :param path: snapshot file
+    :type path: str
+    :return: outage table
+    :rtype: OutageTable
+    :raises: `ValueError` if the file is not a valid snapshot
+    """
+    with open(path, "rb") as fp:
+        buffer = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+    n_outages, n_devices, sections = _read_header(buffer)
+    (strings_offset, strings_size), codes, begin, end = sections
+
+    offsets = np.frombuffer(
+        buffer, dtype=_MS_DTYPE, count=n_devices + 1, offset=strings_offset
+    ).tolist()
+    blob_offset = strings_offset + 8 * (n_devices + 1)
+    if blob_offset + offsets[-1] > strings_offset + strings_size:
+        raise ValueError("Snapshot is truncated")
+    blob = buffer[blob_offset:blob_offset + offsets[-1]]
+    device_ids = [
+        blob[start:stop].decode("utf-8")
+        for start, stop in zip(offsets, offsets[1:])
+    ]
+
+    return OutageTable(
+        device_ids,
+        np.frombuffer(
+            buffer, dtype=_CODE_DTYPE, count=n_outages, offset=codes[0]),
+        np.frombuffer(
+            buffer, dtype=_MS_DTYPE, count=n_outages, offset=begin[0]),
+        np.frombuffer(buffer, dtype=_MS_DTYPE, count=n_outages, offset=end[0])
+    )
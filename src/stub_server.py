@@ -0,0 +1,624 @@
+"""
+Local stub of the Outage API for load testing and end-to-end benchmarks.
+
+Serves `GET /outages`, `GET /site-info/{id}`, `POST /site-outages/{id}` and
+`POST /site-stats/{id}` with `X-API-Key` checking, from synthetic data
+generated from a seed. Latency and errors (500 by default, random or in
+bursts, optionally with `Retry-After`) can be injected. Compressed post
+bodies are accepted, and responses can be gzipped. Outages can be asked for
+in pages (`page` from 1 and `page_size`) and from a date on (`begin_from`).
+
+Usage:
+    python -m src.stub_server --port 5000 --outages 100000 --sites 10
+"""
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .compression import GZIP, compress, decompress
+from .model import format_datetime, parse_datetime
+
+_START = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+@dataclass
+class StubData:
+    outages: List[Dict[str, str]]
+    sites: Dict[str, Dict[str, Any]]
+
+    @classmethod
+    def generate(
+        cls,
+        n_devices: int = 100,
+        n_sites: int = 1,
+        n_outages: int = 1000,
+        devices_per_site: int = 10,
+        seed: int = 0
+    ) -> "StubData":
+        """
+        Generates outages and site infos in the format of the Outage API.
+        The same arguments always generate the same data.
+
+        :param n_devices: number of devices. Defaults to 100
+        :type n_devices: int
+        :param n_sites: number of sites, named `site-0000`, `site-0001` and
+            so on. Defaults to 1
+        :type n_sites: int
+        :param n_outages: number of outages. Defaults to 1000
+        :type n_outages: int
+        :param devices_per_site: number of devices of each site, at most
+            `n_devices`. Defaults to 10
+        :type devices_per_site: int
+        :param seed: random seed. Defaults to 0
+        :type seed: int
+        :return: generated data
+        :rtype: StubData
+        """
+        rnd = random.Random(seed)
+        device_ids = [
+            "%08x-%04x-%04x-%04x-%012x" % (
+                rnd.getrandbits(32), rnd.getrandbits(16),
+                rnd.getrandbits(16), rnd.getrandbits(16),
+                rnd.getrandbits(48))
+            for _ in range(n_devices)
+        ]
+
+        sites = {}
+        for index in range(n_sites):
+            site_id = "site-%04d" % index
+            site_devices = rnd.sample(
+                device_ids, min(devices_per_site, n_devices))
+            sites[site_id] = {
+                "id": site_id,
+                "name": "Site %d" % index,
+                "devices": [
+                    {"id": device_id, "name": "Device %s" % device_id[:8]}
+                    for device_id in site_devices
+                ],
+            }
+
+        outages = []
+        for _ in range(n_outages):
+            begin = _START + timedelta(milliseconds=rnd.randrange(10 ** 11))
+            end = begin + timedelta(milliseconds=rnd.randrange(10 ** 9))
+            outages.append({
+                "id": rnd.choice(device_ids),
+                "begin": format_datetime(begin),
+                "end": format_datetime(end),
+            })
+
+        return cls(outages, sites)
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "StubServer"
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.record_connection()
+
+    def do_GET(self) -> None:
+        if not self._before_request():
+            return
+
+        url = urlsplit(self.path)
+        path = url.path.rstrip("/")
+        if path == "/outages":
+            query = {
+                name: values[-1]
+                for name, values in parse_qs(url.query).items()
+            }
+            try:
+                body, etag = self.server.get_outages_body(**query)
+            except (TypeError, ValueError):
+                self._send_message(400, "Invalid query")
+                return
+        elif path.startswith("/site-info/"):
+            site_id = path[len("/site-info/"):]
+            site = self.server.data.sites.get(site_id)
+            if site is None:
+                self._send_message(404, "Site not found")
+                return
+            body = json.dumps(site).encode()
+            etag = _get_etag(body)
+        else:
+            self._send_message(404, "Not found")
+            return
+
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        headers = {"ETag": etag}
+        if self.server.compress_responses and GZIP in (
+            self.headers.get("Accept-Encoding") or ""
+        ):
+            body = self.server.get_gzip_body(body, etag)
+            headers["Content-Encoding"] = GZIP
+            headers["Vary"] = "Accept-Encoding"
+        self._send_body(200, body, headers)
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        payload = self.rfile.read(length)
+        if not self._before_request():
+            return
+
+        path = self.path.split("?", 1)[0].rstrip("/")
+        endpoint, _, site_id = path.lstrip("/").partition("/")
+        if endpoint not in ("site-outages", "site-stats"):
+            self._send_message(404, "Not found")
+            return
+        if site_id not in self.server.data.sites:
+            self._send_message(404, "Site not found")
+            return
+
+        try:
+            payload = decompress(
+                payload, self.headers.get("Content-Encoding") or "")
+        except ValueError as exc:
+            self._send_message(400, str(exc))
+            return
+        self.server.record_bytes(length, len(payload))
+        try:
+            body = json.loads(payload)
+        except ValueError:
+            self._send_message(400, "Invalid JSON")
+            return
+        if endpoint == "site-stats":
+            if not isinstance(body, dict):
+                self._send_message(400, "Invalid stats")
+                return
+            self.server.record_stats(site_id, body)
+            self._send_body(200, b"{}")
+            return
+
+        outages = body
+        if not isinstance(outages, list) or not all(
+            isinstance(outage, dict)
+            and {"id", "name", "begin", "end"} <= outage.keys()
+            for outage in outages
+        ):
+            self._send_message(400, "Invalid outages")
+            return
+
+        self.server.record_posted(site_id, outages)
+        self._send_body(200, b"{}")
+
+    def _before_request(self) -> bool:
+        """
+        Counts the request, injects latency and errors and checks the api key
+
+        :return: whether the request should be served
+        :rtype: bool
+        """
+        status = self.server.next_status()
+        self.server.wait()
+        if self.headers.get("X-API-Key") != self.server.api_key:
+            self._send_message(403, "You do not have the required permissions")
+            return False
+        if status != 200:
+            headers = None
+            if self.server.retry_after is not None:
+                headers = {"Retry-After": self.server.retry_after}
+            self._send_message(
+                status, "An unexpected error occurred", headers)
+            return False
+        return True
+
+    def _send_message(
+        self,
+        status: int,
+        message: str,
+        headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self._send_body(
+            status, json.dumps({"message": message}).encode(), headers)
+
+    def _send_body(
+        self,
+        status: int,
+        body: bytes,
+        headers: Optional[Dict[str, str]] = None
+    ) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+def _get_etag(body: bytes) -> str:
+    return '"%s"' % hashlib.sha1(body).hexdigest()
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    Threaded stub of the Outage API. Use it as a context manager, or call
+    `start` and `stop`:
+
+        with StubServer(StubData.generate(n_outages=10000)) as server:
+            requester = Requester(server.url, server.api_key)
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        data: StubData,
+        api_key: str = "stub-api-key",
+        address: Tuple[str, int] = ("127.0.0.1", 0),
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        error_burst_every: int = 0,
+        error_burst_length: int = 0,
+        seed: int = 0,
+        compress_responses: bool = False,
+        error_status: int = 500,
+        retry_after: Optional[str] = None
+    ):
+        """
+        :param data: outages and site infos to serve
+        :type data: StubData
+        :param api_key: expected `X-API-Key`. Defaults to "stub-api-key"
+        :type api_key: str
+        :param address: host and port to listen on. Defaults to a free port
+            of 127.0.0.1
+        :type address: Tuple[str, int]
+        :param latency: seconds added to every request. Defaults to 0
+        :type latency: float
+        :param jitter: maximum random seconds added on top of the latency.
+            Defaults to 0
+        :type jitter: float
+        :param error_rate: probability of answering a request with
+            `error_status`. Defaults to 0
+        :type error_rate: float
+        :param error_burst_every: period of error bursts, in requests.
+            Defaults to 0, which means no bursts
+        :type error_burst_every: int
+        :param error_burst_length: number of requests answered with
+            `error_status` at the end of every period. Defaults to 0
+        :type error_burst_length: int
+        :param seed: random seed of jitter and errors. Defaults to 0
+        :type seed: int
+        :param compress_responses: whether get responses are gzipped for
+            clients accepting it. Defaults to False
+        :type compress_responses: bool
+        :param error_status: status of injected errors, i.e. 429 or 503.
+            Defaults to 500
+        :type error_status: int
+        :param retry_after: if given, sent as the `Retry-After` header of
+            injected errors. Defaults to None
+        :type retry_after: Optional[str]
+        """
+        super().__init__(address, _StubHandler)
+        self.data = data
+        self.api_key = api_key
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_burst_every = error_burst_every
+        self.error_burst_length = error_burst_length
+        self.error_status = error_status
+        self.retry_after = retry_after
+        self.requests = 0
+        self.errors = 0
+        # accepted connections, fewer than requests with keep-alive
+        self.connections = 0
+        self.posted: Dict[str, List[Dict[str, str]]] = {}
+        self.posted_stats: Dict[str, Dict[str, Any]] = {}
+        # begin_from and page of outage requests with query-string params
+        self.outage_queries: List[Tuple[Optional[str], Optional[str]]] = []
+        self.compress_responses = compress_responses
+        # post bodies as received and decompressed
+        self.bytes_received = 0
+        self.bytes_received_decoded = 0
+        self._gzip_bodies: Dict[str, bytes] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._outages_body: Optional[Tuple[bytes, str]] = None
+        self._outages_from: Dict[str, List[Dict[str, str]]] = {}
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """
+        :return: base url of the server
+        :rtype: str
+        """
+        return "http://%s:%s/" % self.server_address[:2]
+
+    def get_outages_body(
+        self,
+        begin_from: Optional[str] = None,
+        page: Optional[str] = None,
+        page_size: Optional[str] = None
+    ) -> Tuple[bytes, str]:
+        """
+        :param begin_from: if given, only outages beginning at or after this
+            date are served
+        :type begin_from: Optional[str]
+        :param page: number of the page of outages to serve, from 1. Pages
+            after the last outage are empty
+        :type page: Optional[str]
+        :param page_size: number of outages per page, required with page
+        :type page_size: Optional[str]
+        :return: encoded outages and their etag. All outages are encoded
+            once and reused
+        :rtype: Tuple[bytes, str]
+        :raises: `ValueError` if a param is invalid
+        """
+        if begin_from is None and page is None:
+            with self._lock:
+                if self._outages_body is None:
+                    body = json.dumps(self.data.outages).encode()
+                    self._outages_body = (body, _get_etag(body))
+                return self._outages_body
+
+        outages = self.get_outages(begin_from)
+        if page is not None:
+            page_number, size = int(page), int(page_size)
+            if page_number < 1 or size < 1:
+                raise ValueError("page and page_size should be at least 1")
+            outages = outages[(page_number - 1) * size:page_number * size]
+        self.record_query(begin_from, page)
+        body = json.dumps(outages).encode()
+        return body, _get_etag(body)
+
+    def get_outages(
+        self,
+        begin_from: Optional[str] = None
+    ) -> List[Dict[str, str]]:
+        """
+        :param begin_from: if given, only outages beginning at or after this
+            date are returned
+        :type begin_from: Optional[str]
+        :return: outages, selected once per date and reused
+        :rtype: List[Dict[str, str]]
+        """
+        if begin_from is None:
+            return self.data.outages
+        # all timestamps are in the same format, so they compare as strings
+        begin_from = format_datetime(parse_datetime(begin_from))
+        with self._lock:
+            outages = self._outages_from.get(begin_from)
+            if outages is None:
+                outages = self._outages_from[begin_from] = [
+                    outage for outage in self.data.outages
+                    if outage["begin"] >= begin_from
+                ]
+            return outages
+
+    def record_query(
+        self,
+        begin_from: Optional[str],
+        page: Optional[str]
+    ) -> None:
+        """
+        :param begin_from: begin_from param of an outages request
+        :type begin_from: Optional[str]
+        :param page: page param of an outages request
+        :type page: Optional[str]
+        """
+        with self._lock:
+            self.outage_queries.append((begin_from, page))
+
+    def get_gzip_body(self, body: bytes, etag: str) -> bytes:
+        """
+        :return: gzipped body, compressed once per etag and reused
+        :rtype: bytes
+        """
+        with self._lock:
+            gzip_body = self._gzip_bodies.get(etag)
+            if gzip_body is None:
+                gzip_body = self._gzip_bodies[etag] = compress(body, GZIP)
+            return gzip_body
+
+    def record_bytes(self, received: int, decoded: int) -> None:
+        """
+        :param received: size of a post body as received
+        :type received: int
+        :param decoded: size of the post body after decompression
+        :type decoded: int
+        """
+        with self._lock:
+            self.bytes_received += received
+            self.bytes_received_decoded += decoded
+
+    def record_connection(self) -> None:
+        """
+        Counts an accepted connection
+        """
+        with self._lock:
+            self.connections += 1
+
+    def next_status(self) -> int:
+        """
+        Counts a request and decides whether it fails
+
+        :return: `error_status` if an error is injected for this request,
+            otherwise 200
+        :rtype: int
+        """
+        with self._lock:
+            index = self.requests
+            self.requests += 1
+            failed = (
+                self.error_burst_every > 0
+                and index % self.error_burst_every
+                >= self.error_burst_every - self.error_burst_length
+            ) or (
+                self.error_rate > 0
+                and self._random.random() < self.error_rate
+            )
+            if failed:
+                self.errors += 1
+            return self.error_status if failed else 200
+
+    def wait(self) -> None:
+        """
+        Sleeps for the configured latency and jitter
+        """
+        delay = self.latency
+        if self.jitter > 0:
+            with self._lock:
+                delay += self._random.uniform(0, self.jitter)
+        if delay > 0:
+            time.sleep(delay)
+
+    def record_posted(
+        self,
+        site_id: str,
+        outages: List[Dict[str, str]]
+    ) -> None:
+        """
+        :param site_id: site id
+        :type site_id: str
+        :param outages: posted outages
+        :type outages: List[Dict[str, str]]
+        """
+        with self._lock:
+            self.posted.setdefault(site_id, []).extend(outages)
+
+    def record_stats(self, site_id: str, stats: Dict[str, Any]) -> None:
+        """
+        :param site_id: site id
+        :type site_id: str
+        :param stats: posted statistics, which replace the previous ones
+        :type stats: Dict[str, Any]
+        """
+        with self._lock:
+            self.posted_stats[site_id] = stats
+
+    def start(self) -> "StubServer":
+        """
+        Serves requests in a background thread
+
+        :return: self
+        :rtype: StubServer
+        """
+        self._thread = threading.Thread(
+            target=self.serve_forever,
+            kwargs={"poll_interval": 0.01},
+            daemon=True
+        )
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """
+        Stops serving and closes the socket
+        """
+        if self._thread is not None:
+            self.shutdown()
+            self._thread.join()
+            self._thread = None
+        self.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Local stub of the Outage API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--api-key", default="stub-api-key")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--devices", type=int, default=100)
+    parser.add_argument("--sites", type=int, default=1)
+    parser.add_argument("--outages", type=int, default=1000)
+    parser.add_argument("--devices-per-site", type=int, default=10)
+    parser.add_argument(
+        "--latency", type=float, default=0.0,
+        help="seconds added to every request")
+    parser.add_argument(
+        "--jitter", type=float, default=0.0,
+        help="maximum random seconds added on top of --latency")
+    parser.add_argument(
+        "--error-rate", type=float, default=0.0,
+        help="probability of answering a request with --error-status")
+    parser.add_argument(
+        "--error-burst-every", type=int, default=0,
+        help="period of error bursts, in requests")
+    parser.add_argument(
+        "--error-burst-length", type=int, default=0,
+        help="number of requests answered with --error-status in every "
+             "period")
+    parser.add_argument(
+        "--error-status", type=int, default=500,
+        help="status of injected errors, i.e. 429 or 503")
+    parser.add_argument(
+        "--retry-after",
+        help="Retry-After header sent with injected errors")
+    parser.add_argument(
+        "--gzip", action="store_true",
+        help="gzip get responses for clients accepting it")
+    parser.add_argument(
+        "--write-credentials",
+        help="write a credential file pointing at this server to this path")
+    args = parser.parse_args()
+
+    data = StubData.generate(
+        n_devices=args.devices,
+        n_sites=args.sites,
+        n_outages=args.outages,
+        devices_per_site=args.devices_per_site,
+        seed=args.seed
+    )
+    server = StubServer(
+        data,
+        api_key=args.api_key,
+        address=(args.host, args.port),
+        latency=args.latency,
+        jitter=args.jitter,
+        error_rate=args.error_rate,
+        error_burst_every=args.error_burst_every,
+        error_burst_length=args.error_burst_length,
+        seed=args.seed,
+        compress_responses=args.gzip,
+        error_status=args.error_status,
+        retry_after=args.retry_after
+    )
+    if args.write_credentials:
+        with open(args.write_credentials, "w") as fp:
+            json.dump({"api_url": server.url, "api_key": args.api_key}, fp)
+
+    print(
+        "Serving %d outages of %d sites on %s" % (
+            len(data.outages), len(data.sites), server.url),
+        flush=True
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Persisted state of incremental runs: a watermark and a ledger of posted
+outages per site, stored in SQLite
+"""
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+from .model import (
+    format_datetime, from_epoch_ms, parse_datetime, to_epoch_ms)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS watermark (
+    site_id TEXT PRIMARY KEY,
+    begin_ms INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS posted (
+    site_id TEXT NOT NULL,
+    device_id TEXT NOT NULL,
+    begin TEXT NOT NULL,
+    end TEXT NOT NULL,
+    begin_ms INTEGER NOT NULL,
+    PRIMARY KEY (site_id, device_id, begin, end)
+) WITHOUT ROWID;
+"""
+
+
+class SyncState:
+
+    def __init__(self, path: str, lookback: timedelta = timedelta(days=1)):
+        """
+        :param path: path of the SQLite database file, created if missing
+        :type path: str
+        :param lookback: outages beginning up to this long before the
+            watermark are checked again, so outages whose end changed after
+            they were posted are posted again. Defaults to 1 day
+        :type lookback: timedelta
+        """
+        self._lookback = lookback
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._connection:
+            self._connection.executescript(_SCHEMA)
+
+    def __enter__(self) -> "SyncState":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        :return: None
+        :rtype: None
+        """
+        self._connection.close()
+
+    def get_watermark(self, site_id: str) -> Optional[datetime]:
+        """
+        :param site_id: site identifier
+        :type site_id: str
+        :return: latest begin of the posted outages of the site, None if
+            nothing has been posted yet
+        :rtype: Optional[datetime]
+        """
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT begin_ms FROM watermark WHERE site_id = ?",
+                (site_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return from_epoch_ms(row[0])
+
+    def get_start_date(self, site_id: str, start_date: str) -> str:
+        """
+        :param site_id: site identifier
+        :type site_id: str
+        :param start_date: start date of a full run
+        :type start_date: str
+        :return: start date of the incremental run of the site, which is the
+            watermark minus the lookback, but not before `start_date`
+        :rtype: str
+        """
+        watermark = self.get_watermark(site_id)
+        if watermark is None:
+            return start_date
+
+        incremental_start = watermark - self._lookback
+        if to_epoch_ms(incremental_start) <= to_epoch_ms(
+                parse_datetime(start_date)):
+            return start_date
+        return format_datetime(incremental_start)
+
+    def select_unposted(self, site_id: str, outages: List[Dict]) -> List[Dict]:
+        """
+        :param site_id: site identifier
+        :type site_id: str
+        :param outages: outage body dictionaries with id, begin and end
+        :type outages: List[Dict]
+        :return: outages that have not been posted to the site yet. An
+            outage whose end changed counts as not posted
+        :rtype: List[Dict]
+        """
+        if not outages:
+            return []
+
+        min_begin_ms = min(
+            to_epoch_ms(parse_datetime(outage["begin"])) for outage in outages)
+        with self._lock:
+            posted = set(self._connection.execute(
+                "SELECT device_id, begin, end FROM posted "
+                "WHERE site_id = ? AND begin_ms >= ?",
+                (site_id, min_begin_ms)
+            ))
+        return [
+            outage for outage in outages
+            if (outage["id"], outage["begin"], outage["end"]) not in posted
+        ]
+
+    def record_posted(
+        self,
+        site_id: str,
+        outages: List[Dict],
+        advance_watermark: bool = True
+    ) -> None:
+        """
+        Adds the posted outages to the ledger, advances the watermark of the
+        site and drops ledger entries that are older than the lookback
+        window, which will never be checked again
+
+        :param site_id: site identifier
+        :type site_id: str
+        :param outages: posted outage body dictionaries
+        :type outages: List[Dict]
+        :param advance_watermark: whether the watermark is advanced. It
+            should not be if other outages of the run could not be posted,
+            so that the next run still looks at them. Defaults to True
+        :type advance_watermark: bool
+        :return: None
+        :rtype: None
+        """
+        if not outages:
+            return
+
+        rows = [
+            (
+                site_id,
+                outage["id"],
+                outage["begin"],
+                outage["end"],
+                to_epoch_ms(parse_datetime(outage["begin"]))
+            )
+            for outage in outages
+        ]
+        watermark_ms = max(row[4] for row in rows)
+        lookback_ms = self._lookback // timedelta(milliseconds=1)
+
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT OR IGNORE INTO posted VALUES (?, ?, ?, ?, ?)", rows)
+            if advance_watermark:
+                self._connection.execute(
+                    "INSERT INTO watermark VALUES (?, ?) "
+                    "ON CONFLICT (site_id) DO UPDATE "
+                    "SET begin_ms = max(begin_ms, excluded.begin_ms)",
+                    (site_id, watermark_ms)
+                )
+            self._connection.execute(
+                "DELETE FROM posted WHERE site_id = ? AND begin_ms < "
+                "(SELECT begin_ms FROM watermark WHERE site_id = ?) - ?",
+                (site_id, site_id, lookback_ms)
+            )
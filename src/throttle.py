@@ -0,0 +1,312 @@
+"""
+Client-side rate limiting, adaptive concurrency and retries of API calls
+"""
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Iterable, Optional
+
+import requests
+
+
+class TokenBucket:
+
+    def __init__(
+        self,
+        rate: float,
+        burst: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        :param rate: number of tokens added per second
+        :type rate: float
+        :param burst: maximum number of tokens, i.e. requests that can be
+            sent at once after an idle period. Defaults to 1
+        :type burst: int
+        :param clock: monotonic clock in seconds
+        :type clock: Callable[[], float]
+        :param sleep: function to wait for the given number of seconds
+        :type sleep: Callable[[float], None]
+        """
+        self._rate = rate
+        self._burst = burst
+        self._clock = clock
+        self._sleep = sleep
+        self._tokens = float(burst)
+        self._updated_at = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        Takes a token, waiting until one is available
+
+        :return: seconds waited
+        :rtype: float
+        """
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(
+                self._burst,
+                self._tokens + (now - self._updated_at) * self._rate
+            )
+            self._updated_at = now
+            self._tokens -= 1
+            wait = -self._tokens / self._rate if self._tokens < 0 else 0.0
+
+        # the token is reserved already, so waiting happens outside the lock
+        if wait > 0:
+            self._sleep(wait)
+        return wait
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of calls in flight with additive-increase /
+    multiplicative-decrease (AIMD): the limit grows by about one after a full
+    window of successful calls and is cut by `decrease_factor` whenever the
+    server signals overload.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 64,
+        decrease_factor: float = 0.5
+    ):
+        """
+        :param initial_limit: initial number of calls in flight
+        :type initial_limit: int
+        :param min_limit: lower bound of the limit
+        :type min_limit: int
+        :param max_limit: upper bound of the limit
+        :type max_limit: int
+        :param decrease_factor: factor applied to the limit on overload
+        :type decrease_factor: float
+        """
+        self._limit = float(initial_limit)
+        self._min_limit = min_limit
+        self._max_limit = max_limit
+        self._decrease_factor = decrease_factor
+        self._in_flight = 0
+        self._condition = threading.Condition()
+
+    @property
+    def limit(self) -> int:
+        """
+        :return: current number of calls allowed in flight
+        :rtype: int
+        """
+        return int(self._limit)
+
+    def acquire(self) -> None:
+        """
+        Waits until the call fits into the current limit
+        """
+        with self._condition:
+            while self._in_flight >= int(self._limit):
+                self._condition.wait()
+            self._in_flight += 1
+
+    def release(self, overloaded: bool = False) -> None:
+        """
+        :param overloaded: whether the server signalled overload
+        :type overloaded: bool
+        """
+        with self._condition:
+            self._in_flight -= 1
+            if overloaded:
+                self._limit = max(
+                    self._min_limit, self._limit * self._decrease_factor)
+            else:
+                self._limit = min(
+                    self._max_limit, self._limit + 1 / self._limit)
+            self._condition.notify_all()
+
+
+# statuses telling that the server refused to process the request, so that
+# it can be retried even if it is not idempotent
+REFUSED_STATUSES = frozenset((429, 503))
+
+
+class Throttle:
+    """
+    Shared by all calls of a Requester. Every attempt takes a token of the
+    rate limiter and a slot of the adaptive concurrency limiter. Responses
+    with a retryable status are retried with jittered exponential backoff,
+    or after `Retry-After` if the server sends it. Calls that are not
+    idempotent are only retried on `REFUSED_STATUSES`.
+    """
+
+    def __init__(
+        self,
+        rate: Optional[float] = None,
+        burst: int = 1,
+        adaptive: bool = True,
+        initial_concurrency: int = 4,
+        max_concurrency: int = 64,
+        max_retries: int = 5,
+        backoff_factor: float = 0.1,
+        max_backoff: float = 30.0,
+        retry_statuses: Iterable[int] = (429, 500, 502, 503, 504),
+        sleep: Callable[[float], None] = time.sleep
+    ):
+        """
+        :param rate: maximum number of requests per second. Defaults to None,
+            which means no rate limit
+        :type rate: Optional[float]
+        :param burst: number of requests that can exceed the rate after an
+            idle period. Defaults to 1
+        :type burst: int
+        :param adaptive: whether to limit concurrency adaptively. Defaults to
+            True
+        :type adaptive: bool
+        :param initial_concurrency: initial concurrency limit. Defaults to 4
+        :type initial_concurrency: int
+        :param max_concurrency: maximum concurrency limit, which should not
+            exceed the connection pool size. Defaults to 64
+        :type max_concurrency: int
+        :param max_retries: number of retries of a call. Defaults to 5
+        :type max_retries: int
+        :param backoff_factor: base of the exponential backoff, in seconds.
+            Defaults to 0.1
+        :type backoff_factor: float
+        :param max_backoff: upper bound of a single backoff, in seconds.
+            Defaults to 30
+        :type max_backoff: float
+        :param retry_statuses: status codes that are retried and reduce the
+            concurrency limit. Defaults to 429, 500, 502, 503 and 504
+        :type retry_statuses: Iterable[int]
+        :param sleep: function to wait for the given number of seconds
+        :type sleep: Callable[[float], None]
+        """
+        self._bucket = (
+            TokenBucket(rate, burst, sleep=sleep) if rate is not None
+            else None
+        )
+        self._limiter = (
+            AdaptiveConcurrencyLimiter(
+                initial_concurrency, max_limit=max_concurrency)
+            if adaptive else None
+        )
+        self._max_retries = max_retries
+        self._backoff_factor = backoff_factor
+        self._max_backoff = max_backoff
+        self._retry_statuses = frozenset(retry_statuses)
+        self._sleep = sleep
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            "calls": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "throttled": 0,
+            "rate_limit_wait_seconds": 0.0,
+            "backoff_seconds": 0.0,
+        }
+
+    def get_metrics(self) -> Dict[str, float]:
+        """
+        :return: counters of calls, attempts, retries, failures (calls that
+            ended with a retryable status or an exception), throttled (429)
+            responses, seconds waited and the current concurrency limit
+        :rtype: Dict[str, float]
+        """
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        if self._limiter is not None:
+            metrics["concurrency_limit"] = self._limiter.limit
+        return metrics
+
+    def _count(self, name: str, value: float = 1) -> None:
+        with self._metrics_lock:
+            self._metrics[name] += value
+
+    def _get_delay(self, res: requests.Response, attempt: int) -> float:
+        """
+        :return: seconds to wait before the next attempt
+        :rtype: float
+        """
+        retry_after = res.headers.get("Retry-After")
+        if retry_after:
+            try:
+                return min(self._max_backoff, max(0.0, float(retry_after)))
+            except ValueError:
+                pass
+            try:
+                retry_at = parsedate_to_datetime(retry_after)
+                return min(
+                    self._max_backoff,
+                    max(0.0, retry_at.timestamp() - time.time())
+                )
+            except (TypeError, ValueError):
+                pass
+
+        # "full jitter" spreads retries of concurrent calls over the window
+        window = min(
+            self._max_backoff, self._backoff_factor * (2 ** attempt))
+        return random.uniform(0, window)
+
+    def call(
+        self,
+        send: Callable[[], requests.Response],
+        idempotent: bool = True
+    ) -> requests.Response:
+        """
+        Sends the request, retrying it while the response status is
+        retryable and retries are left
+
+        :param send: callable that sends the request once
+        :type send: Callable[[], requests.Response]
+        :param idempotent: whether the request can be sent again after the
+            server may have processed it, i.e. false for posts. Otherwise it
+            is only retried on `REFUSED_STATUSES`. Defaults to True
+        :type idempotent: bool
+        :return: the last response
+        :rtype: requests.Response
+        """
+        retry_statuses = (
+            self._retry_statuses if idempotent
+            else self._retry_statuses & REFUSED_STATUSES
+        )
+        self._count("calls")
+        attempt = 0
+        while True:
+            if self._bucket is not None:
+                self._count(
+                    "rate_limit_wait_seconds", self._bucket.acquire())
+            if self._limiter is not None:
+                self._limiter.acquire()
+
+            self._count("attempts")
+            overloaded = False
+            try:
+                res = send()
+                overloaded = res.status_code in self._retry_statuses
+            except requests.exceptions.RequestException:
+                overloaded = True
+                self._count("failures")
+                raise
+            finally:
+                if self._limiter is not None:
+                    self._limiter.release(overloaded)
+
+            if res.status_code == 429:
+                self._count("throttled")
+            if not overloaded:
+                return res
+            if (
+                res.status_code not in retry_statuses
+                or attempt >= self._max_retries
+            ):
+                self._count("failures")
+                return res
+
+            delay = self._get_delay(res, attempt)
+            res.close()
+            attempt += 1
+            self._count("retries")
+            self._count("backoff_seconds", delay)
+            self._sleep(delay)
@@ -0,0 +1,108 @@
+"""
+Unit tests for async outage service
+"""
+
+import asyncio
+import unittest
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.async_outage_service import AsyncOutageService
+from src.async_requester import AsyncRequester
+from tests.test_outage_service import (
+    EXPECTED_OUTAGES, EXPECTED_SITE_INFO, MOCK_OUTAGES, MOCK_SITE_INFO)
+
+
+class TestAsyncOutageService(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.posted = {}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+        async def respond(data) -> web.Response:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            try:
+                await asyncio.sleep(0.01)
+                return web.json_response(data)
+            finally:
+                self.in_flight -= 1
+
+        async def get_outages(request: web.Request) -> web.Response:
+            return await respond(MOCK_OUTAGES)
+
+        async def get_site_info(request: web.Request) -> web.Response:
+            return await respond(
+                dict(MOCK_SITE_INFO, id=request.match_info["id"]))
+
+        async def post_outages(request: web.Request) -> web.Response:
+            self.posted[request.match_info["id"]] = await request.json()
+            return await respond({})
+
+        app = web.Application()
+        app.router.add_get("/outages", get_outages)
+        app.router.add_get("/site-info/{id}", get_site_info)
+        app.router.add_post("/site-outages/{id}", post_outages)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.requester = AsyncRequester(
+            str(self.server.make_url("/")), "some_api_key")
+
+    async def asyncTearDown(self):
+        await self.requester.close()
+        await self.server.close()
+
+    async def test_get_outages_and_site_info(self):
+        """
+        test get_outages and get_site_info gathered concurrently
+        """
+        outage_service = AsyncOutageService(self.requester)
+        outages, site_info = await asyncio.gather(
+            outage_service.get_outages(),
+            outage_service.get_site_info("site_1")
+        )
+
+        self.assertListEqual(outages, EXPECTED_OUTAGES)
+        self.assertEqual(site_info, EXPECTED_SITE_INFO)
+
+    async def test_post_outages_to_site(self):
+        """
+        test post_outages_to_site method
+        """
+        outage_service = AsyncOutageService(self.requester)
+        await outage_service.post_outages_to_site("my_site", MOCK_OUTAGES)
+
+        self.assertDictEqual(self.posted, {"my_site": MOCK_OUTAGES})
+
+    async def test_concurrency_limit(self):
+        """
+        test that gathered calls never exceed max_concurrency
+        """
+        outage_service = AsyncOutageService(self.requester, max_concurrency=3)
+        await asyncio.gather(*(
+            outage_service.post_outages_to_site(f"site_{i}", MOCK_OUTAGES)
+            for i in range(12)
+        ))
+
+        self.assertEqual(len(self.posted), 12)
+        self.assertLessEqual(self.max_in_flight, 3)
+        self.assertGreater(self.max_in_flight, 1)
+
+    async def test_post_outages_to_sites(self):
+        """
+        test post_outages_to_sites method posts the selected outages of every
+        site
+        """
+        outage_service = AsyncOutageService(self.requester, max_concurrency=2)
+        posted = await outage_service.post_outages_to_sites(
+            ["a", "b", "a"],
+            lambda site_info: [{"id": d.id} for d in site_info.devices]
+        )
+
+        self.assertDictEqual(posted, {"a": 1, "b": 1})
+        self.assertDictEqual(
+            self.posted,
+            {"a": [{"id": "002b28fc"}], "b": [{"id": "002b28fc"}]}
+        )
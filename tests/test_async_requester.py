@@ -0,0 +1,136 @@
+"""
+Unit tests for async requester
+"""
+
+import unittest
+
+import requests
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from src.async_requester import AsyncRequester
+
+MOCK_DATA = [
+    {"id": 1, "foo": "bar"},
+    {"id": 2, "foo": "baz"},
+]
+
+
+class TestAsyncRequester(unittest.IsolatedAsyncioTestCase):
+
+    async def asyncSetUp(self):
+        self.calls = []
+        self.failures = 0
+
+        async def handler(request: web.Request) -> web.Response:
+            body = await request.json() if request.can_read_body else None
+            self.calls.append(
+                (request.method, request.path, dict(request.query), body))
+            if request.headers.get("X-API-Key") != "some_api_key":
+                return web.json_response({"error": "forbidden"}, status=403)
+            if request.path == "/flaky" and self.failures > 0:
+                self.failures -= 1
+                return web.json_response({"error": "boom"}, status=500)
+            if request.method == "POST":
+                return web.json_response({})
+            return web.json_response(MOCK_DATA)
+
+        app = web.Application()
+        app.router.add_route("*", "/{tail:.*}", handler)
+        self.server = TestServer(app)
+        await self.server.start_server()
+        self.base_url = str(self.server.make_url("/"))
+
+    async def asyncTearDown(self):
+        await self.server.close()
+
+    async def test_get(self):
+        """
+        test get method of AsyncRequester with path and query params
+        """
+        async with AsyncRequester(self.base_url, "some_api_key") as requester:
+            response_data = await requester.get("foo/2", order="asc")
+
+        self.assertListEqual(response_data, MOCK_DATA)
+        self.assertListEqual(
+            self.calls, [("GET", "/foo/2", {"order": "asc"}, None)])
+
+    async def test_post(self):
+        """
+        test post method of AsyncRequester
+        """
+        async with AsyncRequester(self.base_url, "some_api_key") as requester:
+            response_data = await requester.post(
+                "bar", [{"id": 1, "key": "3"}], sort="id")
+
+        self.assertDictEqual(response_data, {})
+        self.assertListEqual(
+            self.calls,
+            [("POST", "/bar", {"sort": "id"}, [{"id": 1, "key": "3"}])]
+        )
+
+    async def test_get_failure(self):
+        """
+        test get method of AsyncRequester having a failure
+        """
+        async with AsyncRequester(self.base_url, "wrong_key") as requester:
+            with self.assertRaises(requests.exceptions.HTTPError) as exc:
+                await requester.get("foo")
+
+        self.assertIn("403 Client Error", str(exc.exception))
+        self.assertIn("forbidden", str(exc.exception))
+        self.assertEqual(exc.exception.response.status_code, 403)
+        self.assertDictEqual(
+            exc.exception.response.json(), {"error": "forbidden"})
+
+    async def test_retry_on_server_error(self):
+        """
+        test that requests are retried while the server responds with 500
+        """
+        self.failures = 2
+        async with AsyncRequester(
+                self.base_url, "some_api_key", backoff_factor=0) as requester:
+            response_data = await requester.get("flaky")
+
+        self.assertListEqual(response_data, MOCK_DATA)
+        self.assertEqual(len(self.calls), 3)
+
+    async def test_retries_exhausted(self):
+        """
+        test that the error is raised once the retries are exhausted
+        """
+        self.failures = 5
+        async with AsyncRequester(
+                self.base_url, "some_api_key",
+                max_retries=2, backoff_factor=0) as requester:
+            with self.assertRaises(requests.exceptions.HTTPError) as exc:
+                await requester.get("flaky")
+
+        self.assertIn("500 Server Error", str(exc.exception))
+        self.assertEqual(len(self.calls), 3)
+
+    async def test_post_not_retried(self):
+        """
+        test that post requests are not retried on 500, like with Requester
+        """
+        self.failures = 1
+        async with AsyncRequester(
+                self.base_url, "some_api_key", backoff_factor=0) as requester:
+            with self.assertRaises(requests.exceptions.HTTPError) as exc:
+                await requester.post("flaky", [])
+
+        self.assertEqual(exc.exception.response.status_code, 500)
+        self.assertEqual(len(self.calls), 1)
+
+    async def test_connection_error(self):
+        """
+        test that connection errors are retried for get requests and raised
+        as requests.exceptions.ConnectionError
+        """
+        base_url = self.base_url
+        await self.server.close()
+        async with AsyncRequester(
+                base_url, "some_api_key",
+                max_retries=1, backoff_factor=0) as requester:
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                await requester.get("foo")
@@ -0,0 +1,88 @@
+"""
+Unit tests for codec
+"""
+
+import json
+import unittest
+from typing import List
+
+from src.codec import JsonCodec, convert, get_available_codecs, get_codec
+from src.model import Outage, SiteInfo
+
+OUTAGES = [
+    {
+        "id": "002b28fc",
+        "begin": "2021-07-26T17:09:31.036Z",
+        "end": "2021-08-29T00:37:42.253Z"
+    },
+    {
+        "id": "0e4d59ba",
+        "begin": "2022-01-01T00:00:00.000Z",
+        "end": "2022-01-02T00:00:00.000Z"
+    }
+]
+
+SITE_INFO = {
+    "id": "site_1",
+    "name": "Site 1",
+    "devices": [{"id": "002b28fc", "name": "Battery 1"}]
+}
+
+
+class TestCodec(unittest.TestCase):
+
+    def test_round_trip(self):
+        """
+        test that every available codec decodes what it encodes, like the
+        json module
+        """
+        for name in get_available_codecs():
+            codec = get_codec(name)
+            data = codec.dumps(OUTAGES)
+            self.assertIsInstance(data, bytes)
+            self.assertEqual(json.loads(data), OUTAGES)
+            self.assertEqual(
+                codec.loads(json.dumps(OUTAGES).encode()), OUTAGES)
+
+    def test_decode_models(self):
+        """
+        test that every available codec decodes models equal to their
+        from_dict
+        """
+        payload = json.dumps(OUTAGES).encode()
+        expected = [Outage.from_dict(outage) for outage in OUTAGES]
+        for name in get_available_codecs():
+            codec = get_codec(name)
+            self.assertEqual(codec.decode(payload, List[Outage]), expected)
+            self.assertEqual(
+                codec.decode(json.dumps(SITE_INFO).encode(), SiteInfo),
+                SiteInfo.from_dict(SITE_INFO)
+            )
+
+    def test_convert(self):
+        """
+        test that decoded JSON is converted into models and lists of them
+        """
+        self.assertEqual(
+            convert(SITE_INFO, SiteInfo), SiteInfo.from_dict(SITE_INFO))
+        self.assertEqual(
+            convert(OUTAGES, List[Outage]),
+            [Outage.from_dict(outage) for outage in OUTAGES]
+        )
+
+    def test_get_codec(self):
+        """
+        test that the fastest available codec is the default and the json
+        module is always available
+        """
+        self.assertEqual(get_codec().name, get_available_codecs()[0])
+        self.assertEqual(get_codec("auto").name, get_available_codecs()[0])
+        self.assertIsInstance(get_codec("json"), JsonCodec)
+        self.assertEqual(get_available_codecs()[-1], "json")
+
+    def test_unsupported_codec(self):
+        """
+        test that unknown codecs are rejected with ValueError
+        """
+        with self.assertRaises(ValueError):
+            get_codec("yaml")
@@ -0,0 +1,117 @@
+"""
+Unit tests for compact model
+"""
+
+import unittest
+
+from src.compact_model import CompactDevice, CompactOutage, CompactSiteInfo
+from src.model import Device, Outage
+from src.outage_filter import OutageFilter
+
+MOCK_OUTAGE = {
+    "id": "002b28fc",
+    "begin": "2021-07-26T17:09:31.036Z",
+    "end": "2021-08-29T00:37:42.253Z"
+}
+
+MOCK_SITE_INFO = {
+    "id": "site_1",
+    "name": "Site 1",
+    "devices": [
+        {
+            "id": "002b28fc",
+            "name": "Battery 1"
+        }
+    ]
+}
+
+
+class TestCompactOutage(unittest.TestCase):
+
+    def test_from_dict(self):
+        """
+        test that from_dict keeps the values of Outage.from_dict
+        """
+        compact = CompactOutage.from_dict(MOCK_OUTAGE)
+        outage = Outage.from_dict(MOCK_OUTAGE)
+
+        self.assertEqual(compact.begin_ms, 1627319371036)
+        for name in ("id", "begin", "end", "begin_datetime", "end_datetime"):
+            self.assertEqual(getattr(compact, name), getattr(outage, name))
+
+    def test_no_instance_dict(self):
+        """
+        test that compact outages have no per-instance __dict__
+        """
+        compact = CompactOutage.from_dict(MOCK_OUTAGE)
+
+        self.assertFalse(hasattr(compact, "__dict__"))
+        with self.assertRaises(AttributeError):
+            compact.foo = "bar"
+
+    def test_equality(self):
+        """
+        test value equality like the dataclass models
+        """
+        compact = CompactOutage.from_dict(MOCK_OUTAGE)
+
+        self.assertEqual(compact, CompactOutage.from_dict(dict(MOCK_OUTAGE)))
+        self.assertNotEqual(
+            compact,
+            CompactOutage.from_dict(
+                dict(MOCK_OUTAGE, end="2021-08-29T00:37:42.254Z"))
+        )
+        self.assertNotEqual(
+            compact, (compact.id, compact.begin_ms, compact.end_ms))
+        self.assertEqual(
+            repr(compact),
+            "CompactOutage(id='002b28fc', begin_ms=1627319371036, "
+            "end_ms=1630197462253)"
+        )
+
+    def test_intern_ids(self):
+        """
+        test that device ids are interned unless disabled
+        """
+        first = CompactOutage.from_dict(
+            {**MOCK_OUTAGE, "id": "".join(["dev", "ice"])})
+        second = CompactOutage.from_dict(
+            {**MOCK_OUTAGE, "id": "".join(["devi", "ce"])})
+        third = CompactOutage.from_dict(
+            {**MOCK_OUTAGE, "id": "".join(["devi", "ce"])}, intern_ids=False)
+
+        self.assertIs(first.id, second.id)
+        self.assertIsNot(first.id, third.id)
+
+    def test_filter(self):
+        """
+        test that compact outages can be filtered like outages
+        """
+        outage_filter = OutageFilter(
+            [Device(id="002b28fc", name="Battery 1")],
+            "2021-01-01T00:00:00.000Z"
+        )
+
+        self.assertListEqual(
+            outage_filter.apply([CompactOutage.from_dict(MOCK_OUTAGE)]),
+            outage_filter.apply([Outage.from_dict(MOCK_OUTAGE)])
+        )
+
+
+class TestCompactSiteInfo(unittest.TestCase):
+
+    def test_from_dict(self):
+        """
+        test from_dict of compact site info and devices
+        """
+        site_info = CompactSiteInfo.from_dict(MOCK_SITE_INFO)
+
+        self.assertEqual(
+            site_info,
+            CompactSiteInfo(
+                id="site_1",
+                name="Site 1",
+                devices=[CompactDevice(id="002b28fc", name="Battery 1")]
+            )
+        )
+        self.assertFalse(hasattr(site_info.devices[0], "__dict__"))
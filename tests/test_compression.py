@@ -0,0 +1,92 @@
+"""
+Unit tests for compression
+"""
+
+import gzip
+import unittest
+
+from src.compression import (
+    GZIP, TransferCounter, compress, decompress, get_accept_encoding,
+    get_encodings)
+
+BODY = b'[{"id": "002b28fc", "begin": "2021-07-26T17:09:31.036Z"}]' * 100
+
+
+class TestCompression(unittest.TestCase):
+
+    def test_gzip_round_trip(self):
+        """
+        test that gzipped bodies are smaller and decompressed back
+        """
+        compressed = compress(BODY, GZIP)
+
+        self.assertLess(len(compressed), len(BODY))
+        self.assertEqual(gzip.decompress(compressed), BODY)
+        self.assertEqual(decompress(compressed, GZIP), BODY)
+        self.assertEqual(compress(BODY, GZIP), compressed)
+
+    def test_all_encodings_round_trip(self):
+        """
+        test that every available encoding is decompressed back
+        """
+        for encoding in get_encodings():
+            self.assertEqual(
+                decompress(compress(BODY, encoding), encoding), BODY)
+
+    def test_identity(self):
+        """
+        test that bodies without an encoding are returned as they are
+        """
+        self.assertEqual(decompress(BODY, ""), BODY)
+        self.assertEqual(decompress(BODY, "identity"), BODY)
+
+    def test_unsupported_encoding(self):
+        """
+        test that unknown encodings are rejected with ValueError
+        """
+        with self.assertRaises(ValueError):
+            compress(BODY, "xz")
+        with self.assertRaises(ValueError):
+            decompress(BODY, "xz")
+
+    def test_invalid_body(self):
+        """
+        test that bodies that are not valid for their encoding are rejected
+        with ValueError
+        """
+        with self.assertRaises(ValueError):
+            decompress(BODY, GZIP)
+
+    def test_accept_encoding(self):
+        """
+        test that gzip responses are accepted by default, and that only the
+        given encodings are accepted otherwise
+        """
+        self.assertIn("gzip", get_accept_encoding().split(","))
+        self.assertEqual(get_accept_encoding(["identity"]), "identity")
+        self.assertEqual(
+            get_accept_encoding(["gzip", "deflate"]), "gzip,deflate")
+        for encodings in ([], ["compress"], ["gzip", "zip"]):
+            with self.assertRaises(ValueError):
+                get_accept_encoding(encodings)
+
+
+class TestTransferCounter(unittest.TestCase):
+
+    def test_get_metrics(self):
+        """
+        test that bytes and the bytes saved are counted in both directions
+        """
+        counter = TransferCounter()
+        counter.add_sent(10, 100)
+        counter.add_sent(5, 5)
+        counter.add_received(20, 80)
+
+        self.assertEqual(counter.get_metrics(), {
+            "bytes_sent": 15,
+            "bytes_sent_uncompressed": 105,
+            "bytes_received": 20,
+            "bytes_received_decoded": 80,
+            "bytes_saved_sent": 90,
+            "bytes_saved_received": 60,
+        })
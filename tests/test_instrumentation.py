@@ -0,0 +1,171 @@
+"""
+Unit tests for instrumentation
+"""
+
+import json
+import os
+import tempfile
+import unittest
+
+import requests
+
+from src.instrumentation import (
+    NO_INSTRUMENTATION, Instrumentation, MetricsRecorder)
+from src.outage_service import OutageService
+from src.requester import Requester
+from src.stub_server import StubData, StubServer
+
+
+class FakeClock:
+
+    def __init__(self, step):
+        self.now = 0.0
+        self.step = step
+
+    def __call__(self):
+        self.now += self.step
+        return self.now
+
+
+class TestMetricsRecorder(unittest.TestCase):
+
+    def setUp(self):
+        self.recorder = MetricsRecorder(clock=FakeClock(0.5))
+        with self.recorder.stage("parse"):
+            pass
+        with self.recorder.stage("parse"):
+            pass
+        self.recorder.record_request(
+            "get", "outages", 200, 0.25, bytes_received=100, retries=1)
+        self.recorder.record_request(
+            "get", "outages", 200, 0.75, bytes_received=50)
+        self.recorder.record_request("post", "site-outages", 500, 1.0)
+        self.recorder.count("outages_posted", 3)
+        self.recorder.count("outages_posted")
+
+    def test_get_metrics(self):
+        """
+        test that stages, requests and counters are aggregated
+        """
+        metrics = self.recorder.get_metrics()
+
+        self.assertDictEqual(
+            metrics["stages"], {"parse": {"count": 2, "seconds": 1.0}})
+        self.assertListEqual(metrics["requests"], [
+            {
+                "method": "get",
+                "endpoint": "outages",
+                "status": 200,
+                "count": 2,
+                "seconds": 1.0,
+                "bytes_sent": 0,
+                "bytes_received": 150,
+                "retries": 1,
+            },
+            {
+                "method": "post",
+                "endpoint": "site-outages",
+                "status": 500,
+                "count": 1,
+                "seconds": 1.0,
+                "bytes_sent": 0,
+                "bytes_received": 0,
+                "retries": 0,
+            },
+        ])
+        self.assertDictEqual(metrics["counters"], {"outages_posted": 4})
+
+    def test_stage_records_failed_stages(self):
+        """
+        test that a stage is timed even if it raises
+        """
+        with self.assertRaises(ValueError):
+            with self.recorder.stage("post"):
+                raise ValueError
+
+        self.assertEqual(
+            self.recorder.get_metrics()["stages"]["post"]["count"], 1)
+
+    def test_to_prometheus(self):
+        """
+        test Prometheus text format
+        """
+        lines = self.recorder.to_prometheus().splitlines()
+
+        self.assertIn(
+            "# TYPE outage_calculator_stage_seconds_total counter", lines)
+        self.assertIn(
+            'outage_calculator_stage_seconds_total{stage="parse"} 1.0', lines)
+        self.assertIn(
+            'outage_calculator_requests_total{method="get",'
+            'endpoint="outages",status="200"} 2',
+            lines
+        )
+        self.assertIn(
+            'outage_calculator_request_received_bytes_total{method="get",'
+            'endpoint="outages",status="200"} 150',
+            lines
+        )
+        self.assertIn("outage_calculator_outages_posted_total 4", lines)
+
+    def test_write(self):
+        """
+        test writing metrics in both formats and rejecting unknown formats
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "metrics")
+
+            self.recorder.write(path, "json")
+            with open(path) as fp:
+                self.assertEqual(json.load(fp), self.recorder.get_metrics())
+
+            self.recorder.write(path)
+            with open(path) as fp:
+                self.assertEqual(fp.read(), self.recorder.to_prometheus())
+
+            with self.assertRaises(ValueError):
+                self.recorder.write(path, "xml")
+
+    def test_no_instrumentation(self):
+        """
+        test that the default instrumentation is disabled and does nothing
+        """
+        self.assertIsInstance(NO_INSTRUMENTATION, Instrumentation)
+        self.assertFalse(NO_INSTRUMENTATION.enabled)
+        with NO_INSTRUMENTATION.stage("parse"):
+            NO_INSTRUMENTATION.count("outages_posted")
+            NO_INSTRUMENTATION.record_request("get", "outages", 200, 0.1)
+
+
+class TestRequesterInstrumentation(unittest.TestCase):
+
+    def test_requests_are_recorded(self):
+        """
+        test that calls are recorded with status, sizes and retries
+        """
+        data = StubData.generate(n_outages=10)
+        recorder = MetricsRecorder()
+        with StubServer(
+            data, error_burst_every=3, error_burst_length=1
+        ) as server:
+            requester = Requester(
+                server.url, server.api_key, instrumentation=recorder)
+            outage_service = OutageService(requester)
+            with outage_service:
+                with self.assertRaises(requests.exceptions.HTTPError):
+                    outage_service.get_site_info("unknown")
+                outage_service.post_outages_to_site("site-0000", [])
+                # the third request fails and is retried by the pool
+                outage_service.get_outages()
+
+        metrics = recorder.get_metrics()
+        requests_by_endpoint = {
+            record["endpoint"]: record for record in metrics["requests"]}
+        outages = requests_by_endpoint["outages"]
+        self.assertEqual(outages["status"], 200)
+        self.assertEqual(outages["retries"], 1)
+        self.assertEqual(
+            outages["bytes_received"], len(json.dumps(data.outages)))
+        self.assertEqual(requests_by_endpoint["site-outages"]["bytes_sent"], 2)
+        self.assertEqual(requests_by_endpoint["site-info"]["status"], 404)
+        self.assertEqual(set(metrics["stages"]), {"decode", "parse"})
@@ -0,0 +1,91 @@
+"""
+Unit tests for json_stream
+"""
+
+import json
+import tracemalloc
+import unittest
+from typing import Iterator
+
+from src.json_stream import iter_json_array
+
+OUTAGE = {
+    "id": "002b28fc",
+    "begin": "2021-07-26T17:09:31.036Z",
+    "end": "2021-08-29T00:37:42.253Z"
+}
+
+
+def split(data: bytes, chunk_size: int) -> Iterator[bytes]:
+    for index in range(0, len(data), chunk_size):
+        yield data[index:index + chunk_size]
+
+
+def generate_payload(n_outages: int, chunk_size: int) -> Iterator[bytes]:
+    """
+    Generates a JSON array of outages chunk by chunk without ever holding
+    the whole payload in memory
+    """
+    element = json.dumps(OUTAGE).encode()
+    buf = b"["
+    for index in range(n_outages):
+        buf += (b"," if index else b"") + element
+        if len(buf) >= chunk_size:
+            yield buf[:chunk_size]
+            buf = buf[chunk_size:]
+    yield buf + b"]"
+
+
+class TestIterJsonArray(unittest.TestCase):
+
+    def test_chunk_boundaries(self):
+        """
+        test that elements split at any position across chunks are decoded
+        """
+        documents = [
+            [],
+            [OUTAGE, OUTAGE],
+            [{"name": "Batterie Süd"}, [1, [2]], "x,]", None, True],
+            [12345, 1.5e3, -2.5e-7, 0],
+        ]
+        for document in documents:
+            data = json.dumps(document).encode()
+            for chunk_size in (1, 2, 3, 7, len(data)):
+                self.assertListEqual(
+                    list(iter_json_array(split(data, chunk_size))), document)
+
+    def test_whitespace(self):
+        """
+        test that whitespace between tokens is skipped
+        """
+        data = b' \n[ 1 ,\n\t{"a" : 2} ] \n'
+        self.assertListEqual(
+            list(iter_json_array(split(data, 2))), [1, {"a": 2}])
+
+    def test_invalid(self):
+        """
+        test that invalid or truncated documents raise JSONDecodeError
+        """
+        for data in (b"", b"{}", b"[1,", b"[1 2]", b"[1,]", b'[{"a": 1}'):
+            with self.assertRaises(json.JSONDecodeError):
+                list(iter_json_array(split(data, 2)))
+
+    def test_memory_is_flat(self):
+        """
+        test that peak memory while decoding does not grow with the payload.
+        The larger payload is ~10 MiB and the decoded elements are dropped
+        right away, so the peak is bounded by a few chunks.
+        """
+        peaks = []
+        for n_outages in (10000, 100000):
+            tracemalloc.start()
+            count = sum(
+                1 for _ in iter_json_array(generate_payload(n_outages, 65536)))
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            self.assertEqual(count, n_outages)
+            peaks.append(peak)
+
+        self.assertLess(peaks[1], 1024 * 1024)
+        self.assertLess(peaks[1], peaks[0] * 2)
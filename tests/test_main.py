@@ -0,0 +1,239 @@
+"""
+Unit tests for the startup of the main process
+"""
+
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from typing import Dict, List
+from unittest import mock
+
+import requests
+
+import main
+from src.outage_service import OutageService
+from src.requester import Requester
+from src.stub_server import StubData, StubServer
+from src.sync_state import SyncState
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# modules that only the code paths needing them import
+HEAVY_MODULES = ["aiohttp", "dateutil", "numpy", "requests", "urllib3"]
+
+# microseconds `import main` may take. It takes about 25 ms, and took about
+# 150 ms when everything was imported at load time
+IMPORT_TIME_BUDGET_US = 100000
+
+
+def get_import_times(*args: str) -> Dict[str, int]:
+    """
+    :return: cumulative import time in microseconds of every module imported
+        by python with the given arguments, run with `-X importtime`
+    :rtype: Dict[str, int]
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        cwd=ROOT,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+        check=True
+    )
+    import_times = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        import_times[name.strip()] = int(cumulative)
+    return import_times
+
+
+class TestStartup(unittest.TestCase):
+
+    def test_help_does_not_import_heavy_modules(self):
+        """
+        test that --help does not import requests, NumPy or dateutil
+        """
+        import_times = get_import_times("main.py", "--help")
+        for module in HEAVY_MODULES:
+            self.assertNotIn(module, import_times)
+
+    def test_import_time_budget(self):
+        """
+        test that importing main stays within the import time budget
+        """
+        # the fastest of a few runs, the others may be slowed by the machine
+        import_time = min(
+            get_import_times("-c", "import main")["main"] for _ in range(3))
+        self.assertLess(import_time, IMPORT_TIME_BUDGET_US)
+
+
+SITE_INFO = {
+    "id": "site_1",
+    "name": "Site 1",
+    "devices": [{"id": "002b28fc", "name": "Battery 1"}],
+}
+
+
+def make_outage(begin: str, end: str) -> Dict[str, str]:
+    return {
+        "id": "002b28fc",
+        "begin": "2022-01-%sT00:00:00.000Z" % begin,
+        "end": "2022-01-%sT00:00:00.000Z" % end,
+    }
+
+
+def parse_args(*args: str):
+    with mock.patch.object(sys, "argv", ["main.py", *args]):
+        return main.parse_args()
+
+
+class TestIncrementalRun(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.sync_state = SyncState(os.path.join(tmp_dir.name, "state.db"))
+        self.addCleanup(self.sync_state.close)
+
+        self.outages: List[Dict[str, str]] = []
+        self.posted: List[Dict[str, str]] = []
+        self.failing_begins: List[str] = []
+        self.requester = mock.MagicMock()
+        self.requester.cache = None
+        self.requester.get.side_effect = self._get
+        self.requester.post.side_effect = self._post
+        self.outage_service = OutageService(self.requester)
+
+    def _get(self, endpoint, **params):
+        if endpoint == "outages":
+            return list(self.outages)
+        return SITE_INFO
+
+    def _post(self, endpoint, body, **params):
+        if any(row["begin"] in self.failing_begins for row in body):
+            response = requests.Response()
+            response.status_code = 400
+            raise requests.exceptions.HTTPError(response=response)
+        self.posted.extend(body)
+
+    def _run(self, *args: str) -> List[str]:
+        """
+        :return: begins of the outages posted by an incremental run
+        :rtype: List[str]
+        """
+        self.posted.clear()
+        main.run_site(
+            self.outage_service,
+            "site_1",
+            parse_args("--incremental", *args),
+            self.sync_state
+        )
+        return [row["begin"][8:10] for row in self.posted]
+
+    def test_new_outages_are_posted_once(self):
+        """
+        test that incremental runs only post outages that are new or whose
+        end changed
+        """
+        self.outages = [make_outage("02", "03"), make_outage("04", "05")]
+        self.assertListEqual(self._run(), ["02", "04"])
+        self.assertListEqual(self._run(), [])
+
+        self.outages.append(make_outage("06", "07"))
+        self.outages[1] = make_outage("04", "06")
+        self.assertListEqual(self._run(), ["04", "06"])
+        self.assertEqual(self.posted[0]["name"], "Battery 1")
+
+    def test_failed_chunk_is_posted_again_alone(self):
+        """
+        test that the chunks posted before a chunk failed are recorded, so
+        the next run posts only the outages of the failed chunk
+        """
+        self.outages = [
+            make_outage("02", "03"),
+            make_outage("04", "05"),
+            make_outage("06", "07"),
+        ]
+        self.failing_begins = [self.outages[1]["begin"]]
+        with self.assertRaises(RuntimeError):
+            self._run("--chunk-rows", "1")
+        self.assertIsNone(self.sync_state.get_watermark("site_1"))
+
+        self.failing_begins = []
+        self.assertListEqual(self._run("--chunk-rows", "1"), ["04"])
+        self.assertListEqual(self._run("--chunk-rows", "1"), [])
+
+
+class TestBatchRun(unittest.TestCase):
+
+    def setUp(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        self.sites_file = os.path.join(tmp_dir.name, "sites.txt")
+        with open(self.sites_file, "w") as fp:
+            fp.write("# sites of the batch\n\nsite-0001\n  site-0002  \n")
+            fp.write("  # site-0003\nsite-0000\n")
+
+    def test_read_site_ids(self):
+        """
+        test that site ids of --site-ids come first, followed by the site
+        ids of --sites-file without comments and blank lines
+        """
+        args = parse_args(
+            "--site-ids", "site-0000", "site-0001",
+            "--sites-file", self.sites_file
+        )
+
+        self.assertListEqual(
+            main.read_site_ids(args),
+            ["site-0000", "site-0001", "site-0001", "site-0002", "site-0000"]
+        )
+        self.assertListEqual(main.read_site_ids(parse_args()), [])
+
+    def test_run_batch(self):
+        """
+        test that a batch run retrieves outages once and posts to every
+        site its own outages once, even if the site is given twice
+        """
+        start_date = "2021-06-01T00:00:00.000Z"
+        data = StubData.generate(n_devices=20, n_sites=4, n_outages=500)
+        with StubServer(data) as server:
+            service = OutageService(Requester(server.url, server.api_key))
+            self.addCleanup(service.close)
+            argv = [
+                "main.py",
+                "--site-ids", "site-0000", "site-0001",
+                "--sites-file", self.sites_file,
+                "--start-date", start_date,
+                "--max-workers", "2",
+            ]
+            with mock.patch.object(sys, "argv", argv), mock.patch.object(
+                main, "get_outage_service", return_value=service
+            ), mock.patch.object(
+                service.requester, "get", wraps=service.requester.get
+            ) as mock_get:
+                main.run()
+
+        outage_calls = [
+            call for call in mock_get.call_args_list
+            if call.args[0] == "outages"
+        ]
+        self.assertEqual(len(outage_calls), 1)
+        self.assertEqual(
+            sorted(server.posted), ["site-0000", "site-0001", "site-0002"])
+        for site_id, posted in server.posted.items():
+            devices = {
+                device["id"]: device["name"]
+                for device in data.sites[site_id]["devices"]
+            }
+            expected = [
+                dict(outage, name=devices[outage["id"]])
+                for outage in data.outages
+                if outage["id"] in devices and outage["begin"] >= start_date
+            ]
+            self.assertTrue(expected)
+            self.assertCountEqual(posted, expected)
@@ -0,0 +1,89 @@
+"""
+Unit tests for model
+"""
+
+import unittest
+from datetime import datetime, timedelta, timezone
+
+import dateutil.parser as dt_parser
+
+from src.model import Outage, parse_datetime
+
+MOCK_OUTAGE = {
+    "id": "002b28fc",
+    "begin": "2021-07-26T17:09:31.036Z",
+    "end": "2021-08-29T00:37:42.253Z"
+}
+
+
+class TestParseDatetime(unittest.TestCase):
+
+    def test_api_format(self):
+        """
+        test that the API timestamp format is parsed to an aware UTC datetime
+        """
+        parsed = parse_datetime("2021-07-26T17:09:31.036Z")
+
+        self.assertEqual(
+            parsed,
+            datetime(2021, 7, 26, 17, 9, 31, 36000, tzinfo=timezone.utc)
+        )
+        self.assertEqual(parsed.utcoffset(), timedelta(0))
+
+    def test_same_result_as_dateutil(self):
+        """
+        test that the fast path and the fallback agree with dateutil
+        """
+        values = [
+            "2021-07-26T17:09:31.036Z",
+            "2022-01-01T00:00:00.000Z",
+            "2021-07-26T17:09:31Z",
+            "2021-07-26T17:09:31.036+02:00",
+            "2021-07-26 17:09:31",
+            "2021-13-26T17:09:31.036Z",
+        ]
+        for value in values[:-1]:
+            self.assertEqual(parse_datetime(value), dt_parser.parse(value))
+
+        with self.assertRaises(ValueError):
+            parse_datetime(values[-1])
+
+
+class TestOutage(unittest.TestCase):
+
+    def test_from_dict(self):
+        """
+        test that from_dict parses begin and end eagerly
+        """
+        outage = Outage.from_dict(MOCK_OUTAGE)
+
+        self.assertIsNotNone(outage.__dict__["_begin_datetime"])
+        self.assertEqual(
+            outage.begin_datetime, dt_parser.parse(MOCK_OUTAGE["begin"]))
+        self.assertEqual(
+            outage.end_datetime, dt_parser.parse(MOCK_OUTAGE["end"]))
+
+    def test_from_dict_lazy(self):
+        """
+        test that lazy outages parse their dates on first access only and
+        are equal to eagerly parsed ones
+        """
+        outage = Outage.from_dict(MOCK_OUTAGE, lazy=True)
+        self.assertIsNone(outage.__dict__["_begin_datetime"])
+        self.assertIsNone(outage.__dict__["_end_datetime"])
+
+        begin = outage.begin_datetime
+        self.assertIs(begin, outage.begin_datetime)
+        self.assertIsNone(outage.__dict__["_end_datetime"])
+        self.assertEqual(outage, Outage.from_dict(MOCK_OUTAGE))
+
+    def test_explicit_datetimes(self):
+        """
+        test that explicitly given datetimes are kept as they are
+        """
+        begin_datetime = datetime(2000, 1, 1)
+        outage = Outage(begin_datetime=begin_datetime, **MOCK_OUTAGE)
+
+        self.assertIs(outage.begin_datetime, begin_datetime)
+        self.assertEqual(
+            outage.end_datetime, dt_parser.parse(MOCK_OUTAGE["end"]))
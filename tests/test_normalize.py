@@ -0,0 +1,100 @@
+"""
+Unit tests for normalization of outage rows
+"""
+
+import unittest
+
+from src.normalize import coalesce, dedupe, normalize
+
+
+def make_row(device_id: str, begin: str, end: str) -> dict:
+    return {
+        "id": device_id,
+        "name": "Device %s" % device_id,
+        "begin": "2022-01-01T%s:00.000Z" % begin,
+        "end": "2022-01-01T%s:00.000Z" % end,
+    }
+
+
+class TestNormalize(unittest.TestCase):
+
+    def test_dedupe(self):
+        """
+        test that exact duplicates are dropped and the order is kept
+        """
+        rows = [
+            make_row("a", "00:00", "01:00"),
+            make_row("b", "00:00", "01:00"),
+            make_row("a", "00:00", "01:00"),
+            make_row("a", "00:00", "02:00"),
+            make_row("b", "00:00", "01:00"),
+        ]
+
+        self.assertListEqual(dedupe(rows), [rows[0], rows[1], rows[3]])
+        self.assertListEqual(dedupe([]), [])
+
+    def test_coalesce(self):
+        """
+        test that overlapping, contained and adjacent outages of a device
+        are merged and outages of other devices are not
+        """
+        rows = [
+            make_row("a", "02:00", "03:00"),
+            make_row("b", "00:30", "01:30"),
+            make_row("a", "00:00", "01:00"),
+            make_row("a", "00:30", "02:00"),
+            make_row("a", "00:45", "01:15"),
+            make_row("a", "04:00", "05:00"),
+        ]
+
+        self.assertListEqual(coalesce(rows), [
+            make_row("a", "00:00", "03:00"),
+            make_row("a", "04:00", "05:00"),
+            make_row("b", "00:30", "01:30"),
+        ])
+        self.assertListEqual(coalesce([]), [])
+
+    def test_coalesce_keeps_date_format(self):
+        """
+        test that dates are compared as instants and kept as they are
+        """
+        rows = [
+            {
+                "id": "a",
+                "name": "Device a",
+                "begin": "2022-01-01T01:30:00+01:00",
+                "end": "2022-01-01T02:00:00+01:00",
+            },
+            make_row("a", "00:00", "00:45"),
+        ]
+
+        self.assertListEqual(coalesce(rows), [{
+            "id": "a",
+            "name": "Device a",
+            "begin": "2022-01-01T00:00:00.000Z",
+            "end": "2022-01-01T02:00:00+01:00",
+        }])
+
+    def test_normalize(self):
+        """
+        test that rows removed by each step are counted
+        """
+        rows = [
+            make_row("a", "00:00", "01:00"),
+            make_row("a", "00:00", "01:00"),
+            make_row("a", "01:00", "02:00"),
+            make_row("b", "00:00", "01:00"),
+        ]
+
+        result = normalize(rows)
+        self.assertEqual(
+            (len(result.rows), result.duplicates, result.coalesced), (3, 1, 0))
+
+        result = normalize(rows, coalesce_overlaps=True)
+        self.assertEqual(
+            (len(result.rows), result.duplicates, result.coalesced), (2, 1, 1))
+        self.assertEqual(result.removed, 2)
+
+        result = normalize(rows, remove_duplicates=False)
+        self.assertIs(result.rows, rows)
+        self.assertEqual(result.removed, 0)
@@ -0,0 +1,122 @@
+"""
+Unit tests for outage filter
+"""
+
+import unittest
+from datetime import timedelta
+from unittest import mock
+
+from src.model import Device, Outage, parse_datetime
+from src.outage_filter import OutageFilter
+
+DEVICES = [
+    Device(id="002b28fc", name="Battery 1"),
+    Device(id="086b0d53", name="Battery 2"),
+]
+
+OUTAGES = [
+    Outage(
+        id="002b28fc",
+        begin="2021-07-26T17:09:31.036Z",
+        end="2021-08-29T00:37:42.253Z"
+    ),
+    Outage(
+        id="002b28fc",
+        begin="2022-01-01T00:00:00.000Z",
+        end="2022-01-01T00:10:00.000Z"
+    ),
+    Outage(
+        id="086b0d53",
+        begin="2022-02-15T11:28:26.965Z",
+        end="2022-03-18T09:28:39.865Z"
+    ),
+    Outage(
+        id="0e4d59ba",
+        begin="2022-02-15T11:28:26.965Z",
+        end="2022-03-18T09:28:39.865Z"
+    ),
+]
+
+
+class TestOutageFilter(unittest.TestCase):
+
+    def test_apply(self):
+        """
+        test that outages of other devices and outages beginning before the
+        start date are dropped and device names are attached
+        """
+        outage_filter = OutageFilter(DEVICES, "2022-01-01T00:00:00.000Z")
+
+        self.assertListEqual(
+            outage_filter.apply(OUTAGES),
+            [
+                {
+                    "id": "002b28fc",
+                    "name": "Battery 1",
+                    "begin": "2022-01-01T00:00:00.000Z",
+                    "end": "2022-01-01T00:10:00.000Z"
+                },
+                {
+                    "id": "086b0d53",
+                    "name": "Battery 2",
+                    "begin": "2022-02-15T11:28:26.965Z",
+                    "end": "2022-03-18T09:28:39.865Z"
+                },
+            ]
+        )
+
+    def test_end_date(self):
+        """
+        test that outages ending after the end date are dropped
+        """
+        outage_filter = OutageFilter(
+            DEVICES,
+            "2022-01-01T00:00:00.000Z",
+            end_date="2022-03-01T00:00:00.000Z"
+        )
+
+        rows = outage_filter.apply(OUTAGES)
+        self.assertListEqual(
+            [row["begin"] for row in rows], ["2022-01-01T00:00:00.000Z"])
+
+    def test_min_duration(self):
+        """
+        test that outages shorter than the minimum duration are dropped
+        """
+        outage_filter = OutageFilter(
+            DEVICES,
+            "2021-01-01T00:00:00.000Z",
+            min_duration=timedelta(hours=1)
+        )
+
+        rows = outage_filter.apply(OUTAGES)
+        self.assertListEqual(
+            [row["begin"] for row in rows],
+            ["2021-07-26T17:09:31.036Z", "2022-02-15T11:28:26.965Z"]
+        )
+
+    def test_reuse_across_batches(self):
+        """
+        test that the filter can be applied to many batches and generators
+        and parses the start date only once
+        """
+        with mock.patch(
+                "src.outage_filter.parse_datetime",
+                wraps=parse_datetime) as mock_parse:
+            outage_filter = OutageFilter(DEVICES, "2022-01-01T00:00:00.000Z")
+            first = outage_filter.apply(iter(OUTAGES[:2]))
+            second = outage_filter.apply(outage for outage in OUTAGES[2:])
+
+        mock_parse.assert_called_once_with("2022-01-01T00:00:00.000Z")
+        self.assertEqual(len(first), 1)
+        self.assertEqual(len(second), 1)
+
+    def test_device_checked_before_date(self):
+        """
+        test that dates of outages of other devices are never parsed
+        """
+        outage = Outage(id="unknown", begin="not a date", end="not a date")
+        outage_filter = OutageFilter(DEVICES, "2022-01-01T00:00:00.000Z")
+
+        self.assertFalse(outage_filter.matches(outage))
+        self.assertListEqual(outage_filter.apply([outage]), [])
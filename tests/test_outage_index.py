@@ -0,0 +1,132 @@
+"""
+Unit tests for outage index
+"""
+
+import random
+import unittest
+from datetime import datetime, timezone
+
+from src.compact_model import CompactOutage
+from src.model import Outage, format_datetime, from_epoch_ms
+from src.outage_index import OutageIndex
+
+
+def make_outages(n_outages, seed=0):
+    rnd = random.Random(seed)
+    outages = []
+    for _ in range(n_outages):
+        begin = rnd.randrange(10 ** 6)
+        end = begin + rnd.randrange(10 ** 5)
+        outages.append(CompactOutage(rnd.choice("abc"), begin, end))
+    return outages
+
+
+class TestOutageIndex(unittest.TestCase):
+
+    def assert_queries(self, index, outages, seed=1):
+        """
+        asserts that queries return the outages a linear scan selects
+        """
+        rnd = random.Random(seed)
+        for _ in range(200):
+            start = rnd.randrange(-10 ** 4, 12 * 10 ** 5)
+            end = start + rnd.randrange(10 ** 5)
+            device_id = rnd.choice(["a", "b", "c", "d", None])
+
+            def scan(predicate):
+                return sorted(
+                    (
+                        outage for outage in outages
+                        if device_id in (None, outage.id)
+                        and predicate(outage)
+                    ),
+                    key=lambda outage: (outage.id, outage.begin_ms)
+                )
+
+            def query(result):
+                return sorted(
+                    result,
+                    key=lambda outage: (outage.id, outage.begin_ms)
+                )
+
+            self.assertListEqual(
+                query(index.begin_range(start, end, device_id)),
+                scan(lambda outage: start <= outage.begin_ms <= end))
+            self.assertListEqual(
+                query(index.overlapping(start, end, device_id)),
+                scan(lambda outage: (
+                    outage.begin_ms <= end and outage.end_ms >= start)))
+            self.assertListEqual(
+                query(index.active_at(start, device_id)),
+                scan(lambda outage: (
+                    outage.begin_ms <= start <= outage.end_ms)))
+
+    def test_queries(self):
+        """
+        test begin range, overlap and point queries against linear scans
+        """
+        outages = make_outages(1000)
+
+        self.assert_queries(OutageIndex(outages), outages)
+
+    def test_incremental_inserts(self):
+        """
+        test that queries see buffered and rebuilt outages after inserts
+        """
+        outages = make_outages(600)
+        index = OutageIndex(outages[:100], rebuild_threshold=50)
+
+        for outage in outages[100:]:
+            index.add(outage)
+        self.assertEqual(len(index), 600)
+        self.assert_queries(index, outages)
+
+        index.extend(outages[:10])
+        self.assert_queries(index, outages + outages[:10], seed=2)
+
+    def test_results_are_ordered_by_begin(self):
+        """
+        test that outages of a device are returned by begin, buffered
+        outages included
+        """
+        outages = make_outages(300)
+        index = OutageIndex(outages[:200], rebuild_threshold=1000)
+        index.extend(outages[200:])
+
+        result = index.overlapping(0, 10 ** 7, "a")
+
+        self.assertListEqual(
+            [outage.begin_ms for outage in result],
+            sorted(outage.begin_ms for outage in outages if outage.id == "a")
+        )
+
+    def test_outages_and_time_types(self):
+        """
+        test indexing Outage instances and querying with datetimes and
+        timestamp strings
+        """
+        outages = [
+            Outage.from_dict({
+                "id": outage.id,
+                "begin": format_datetime(from_epoch_ms(outage.begin_ms)),
+                "end": format_datetime(from_epoch_ms(outage.end_ms)),
+            })
+            for outage in make_outages(100)
+        ]
+        index = OutageIndex(outages)
+        start = datetime(1970, 1, 1, 0, 5, tzinfo=timezone.utc)
+        end = "1970-01-01T00:10:00.000Z"
+
+        self.assertListEqual(
+            sorted(index.overlapping(start, end), key=id),
+            sorted(
+                (
+                    outage for outage in outages
+                    if outage.begin_datetime <= from_epoch_ms(600000)
+                    and outage.end_datetime >= start
+                ),
+                key=id
+            )
+        )
+        self.assertListEqual(index.active_at(start, "unknown"), [])
+        self.assertListEqual(sorted(index.device_ids), ["a", "b", "c"])
@@ -2,15 +2,22 @@
 Unit tests for outage service
 """
 
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
 from unittest import mock
 
 import dateutil.parser as dt_parser
 import requests
 
-from src.model import Device, Outage, SiteInfo
-from src.outage_service import OutageService
+from src.model import ChunkResult, Device, Outage, SiteInfo
+from src.outage_service import OutageService, split_into_chunks
+from src.parallel_parse import parse_outages
 from src.requester import Requester
+from src.stub_server import StubData, StubServer
 
 MOCK_OUTAGES = [
     {
@@ -67,6 +74,22 @@ class TestOutageService(unittest.TestCase):
         mock_get.assert_called_once_with("outages")
         self.assertListEqual(outages, EXPECTED_OUTAGES)
 
+    @mock.patch("src.outage_service.Requester")
+    def test_get_outages_with_workers(self, mock_requester: Requester):
+        """
+        test that get_outages parses the same outages with worker processes
+        """
+        mock_requester.get = mock.MagicMock(return_value=MOCK_OUTAGES * 3)
+
+        outage_service = OutageService(mock_requester)
+        with mock.patch(
+            "src.outage_service.parse_outages", wraps=parse_outages
+        ) as mock_parse:
+            outages = outage_service.get_outages(workers=2)
+
+        mock_parse.assert_called_once_with(MOCK_OUTAGES * 3, 2)
+        self.assertListEqual(outages, EXPECTED_OUTAGES * 3)
+
     @mock.patch("src.outage_service.Requester")
     def test_get_outages_failure(self, mock_requester: Requester):
         """
@@ -96,6 +119,32 @@ class TestOutageService(unittest.TestCase):
         mock_get.assert_called_once_with("site-info/my_site")
         self.assertEqual(site_info, EXPECTED_SITE_INFO)
 
+    @mock.patch("src.outage_service.time.monotonic")
+    @mock.patch("src.outage_service.Requester")
+    def test_get_site_info_max_age(
+        self,
+        mock_requester: Requester,
+        mock_monotonic: mock.MagicMock
+    ):
+        """
+        test that get_site_info reuses site infos younger than the max age
+        """
+        mock_get = mock.MagicMock()
+        mock_get.return_value = MOCK_SITE_INFO
+        mock_requester.get = mock_get
+        mock_monotonic.return_value = 100.0
+
+        outage_service = OutageService(mock_requester, site_info_max_age=60)
+        outage_service.get_site_info("my_site")
+        mock_monotonic.return_value = 150.0
+        site_info = outage_service.get_site_info("my_site")
+        self.assertEqual(site_info, EXPECTED_SITE_INFO)
+        self.assertEqual(mock_get.call_count, 1)
+
+        mock_monotonic.return_value = 170.0
+        outage_service.get_site_info("my_site")
+        self.assertEqual(mock_get.call_count, 2)
+
     @mock.patch("src.outage_service.Requester")
     def test_get_site_info_failure(self, mock_requester: Requester):
         """
@@ -123,6 +172,20 @@ class TestOutageService(unittest.TestCase):
 
         mock_post.assert_called_once_with("site-outages/my_site", MOCK_OUTAGES)
 
+    @mock.patch("src.outage_service.Requester")
+    def test_post_site_stats(self, mock_requester: Requester):
+        """
+        test post_site_stats method
+        """
+        mock_post = mock.MagicMock()
+        mock_requester.post = mock_post
+        stats = {"id": "my_site", "downtime_ms": 0, "devices": []}
+
+        outage_service = OutageService(mock_requester)
+        outage_service.post_site_stats("my_site", stats)
+
+        mock_post.assert_called_once_with("site-stats/my_site", stats)
+
     @mock.patch("src.outage_service.Requester")
     def test_post_outages_to_site_failure(self, mock_requester: Requester):
         """
@@ -137,3 +200,379 @@ class TestOutageService(unittest.TestCase):
             outage_service.post_outages_to_site("my_site", MOCK_OUTAGES)
             mock_post.assert_called_once_with(
                 "site-outages/my_site", MOCK_OUTAGES)
+
+    @mock.patch("src.outage_service.Requester")
+    def test_close(self, mock_requester: Requester):
+        """
+        test that closing the service closes its requester
+        """
+        with OutageService(mock_requester):
+            pass
+
+        mock_requester.close.assert_called_once_with()
+
+    @mock.patch("src.outage_service.Requester")
+    def test_post_outages_to_sites(self, mock_requester: Requester):
+        """
+        test post_outages_to_sites method fetches, selects and posts every
+        site once
+        """
+        def get(endpoint):
+            site_id = endpoint.split("/")[-1]
+            return dict(MOCK_SITE_INFO, id=site_id)
+
+        mock_requester.get = mock.MagicMock(side_effect=get)
+        mock_post = mock.MagicMock()
+        mock_requester.post = mock_post
+
+        def select_outages(site_info):
+            return [{"site": site_info.id}] * len(site_info.id)
+
+        outage_service = OutageService(mock_requester)
+        posted = outage_service.post_outages_to_sites(
+            ["a", "bb", "ccc", "a"], select_outages, max_workers=2)
+
+        self.assertDictEqual(posted, {"a": 1, "bb": 2, "ccc": 3})
+        self.assertEqual(mock_requester.get.call_count, 3)
+        mock_post.assert_has_calls(
+            [
+                mock.call("site-outages/a", [{"site": "a"}]),
+                mock.call("site-outages/bb", [{"site": "bb"}] * 2),
+                mock.call("site-outages/ccc", [{"site": "ccc"}] * 3),
+            ],
+            any_order=True
+        )
+
+    @mock.patch("src.outage_service.Requester")
+    def test_post_outages_to_sites_failure(self, mock_requester: Requester):
+        """
+        test post_outages_to_sites method in case one site fails
+        """
+        mock_requester.get = mock.MagicMock(return_value=MOCK_SITE_INFO)
+        mock_requester.post = mock.MagicMock(
+            side_effect=requests.exceptions.HTTPError())
+
+        outage_service = OutageService(mock_requester)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            outage_service.post_outages_to_sites(
+                ["a", "b"], lambda site_info: [], max_workers=1)
+
+    @mock.patch("src.outage_service.Requester")
+    def test_iter_outages(self, mock_requester: Requester):
+        """
+        test iter_outages method yields outages one by one or in batches
+        """
+        mock_iter_array = mock.MagicMock()
+        mock_iter_array.side_effect = lambda endpoint: iter(MOCK_OUTAGES * 5)
+        mock_requester.iter_array = mock_iter_array
+
+        outage_service = OutageService(mock_requester)
+        outages = list(outage_service.iter_outages())
+        batches = list(outage_service.iter_outages(batch_size=2))
+
+        mock_iter_array.assert_called_with("outages")
+        self.assertListEqual(outages, EXPECTED_OUTAGES * 5)
+        self.assertListEqual(
+            [len(batch) for batch in batches], [2, 2, 1])
+        self.assertListEqual(
+            [outage for batch in batches for outage in batch], outages)
+
+    @mock.patch("src.outage_service.Requester")
+    def test_get_outages_begin_from(self, mock_requester: Requester):
+        """
+        test that the start date is sent in the API format with the request
+        """
+        mock_get = mock.MagicMock(return_value=MOCK_OUTAGES)
+        mock_requester.get = mock_get
+
+        outage_service = OutageService(mock_requester)
+        outages = outage_service.get_outages(
+            begin_from="2021-07-26T18:09:31.036+01:00")
+
+        mock_get.assert_called_once_with(
+            "outages", begin_from="2021-07-26T17:09:31.036Z")
+        self.assertListEqual(outages, EXPECTED_OUTAGES)
+
+    @mock.patch("src.outage_service.Requester")
+    def test_get_outages_in_pages(self, mock_requester: Requester):
+        """
+        test that pages are reassembled in page order even if later pages
+        arrive first, and that a failing page is retried on its own
+        """
+        data = [dict(MOCK_OUTAGES[0], id=str(index)) for index in range(10)]
+        calls = []
+        lock = threading.Lock()
+
+        def get(endpoint, page, page_size, **params):
+            with lock:
+                calls.append(page)
+                if calls.count(page) == 1 and page == 2:
+                    raise requests.exceptions.ConnectionError()
+            # earlier pages are slower
+            time.sleep(0.01 * max(4 - page, 0))
+            return data[(page - 1) * page_size:page * page_size]
+
+        mock_requester.get = mock.MagicMock(side_effect=get)
+
+        outage_service = OutageService(
+            mock_requester, page_size=3, page_workers=3)
+        outage_service.page_backoff_factor = 0
+        outages = outage_service.get_outages()
+
+        self.assertListEqual(
+            [outage.id for outage in outages], [str(i) for i in range(10)])
+        self.assertEqual(calls.count(2), 2)
+        self.assertEqual(calls.count(1), 1)
+        self.assertTrue({1, 2, 3, 4}.issubset(calls))
+        mock_requester.get.assert_any_call("outages", page=4, page_size=3)
+
+    @mock.patch("src.outage_service.Requester")
+    def test_get_outages_in_pages_failure(self, mock_requester: Requester):
+        """
+        test that a page failing with a client error is not retried and
+        fails the retrieval
+        """
+        response = requests.Response()
+        response.status_code = 400
+
+        def get(endpoint, page, page_size):
+            if page == 2:
+                raise requests.exceptions.HTTPError(response=response)
+            return MOCK_OUTAGES * page_size
+
+        mock_requester.get = mock.MagicMock(side_effect=get)
+
+        outage_service = OutageService(
+            mock_requester, page_size=2, page_workers=2)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            outage_service.get_outages()
+        pages = [
+            call.kwargs["page"] for call in mock_requester.get.mock_calls]
+        self.assertEqual(pages.count(2), 1)
+
+    @mock.patch("src.outage_service.Requester")
+    def test_get_outages_pages_ignored(self, mock_requester: Requester):
+        """
+        test that retrieving pages fails if the API ignores the paging
+        params, instead of paging forever
+        """
+        outages = [
+            dict(MOCK_OUTAGES[0], id=str(index)) for index in range(10)]
+        for page_size in (5, 10):
+            with self.subTest(page_size=page_size):
+                mock_requester.get = mock.MagicMock(return_value=outages)
+
+                outage_service = OutageService(
+                    mock_requester, page_size=page_size, page_workers=3)
+                with self.assertRaises(ValueError):
+                    outage_service.get_outages()
+                self.assertLessEqual(mock_requester.get.call_count, 6)
+
+    @mock.patch("src.outage_service.Requester")
+    def test_get_outages_same_pages(self, mock_requester: Requester):
+        """
+        test that equal pages of an API that supports paging, i.e. of
+        duplicate outages, are retrieved with a warning
+        """
+        outage = MOCK_OUTAGES[0]
+        outages = [outage, dict(outage, id="1")] + [outage] * 4 + [
+            dict(outage, id="2")]
+
+        def get(endpoint, page, page_size, **params):
+            return outages[(page - 1) * page_size:page * page_size]
+
+        mock_requester.get = mock.MagicMock(side_effect=get)
+        outage_service = OutageService(
+            mock_requester, page_size=2, page_workers=1)
+
+        with self.assertLogs("src.outage_service", "WARNING"):
+            self.assertEqual(
+                len(outage_service.get_outages()), len(outages))
+
+    def test_parsed_models_of_latest_response(self):
+        """
+        test that only the models of the latest response of an endpoint are
+        kept, and reused while the requester serves the same object
+        """
+        requester = mock.MagicMock()
+        responses = {}
+
+        def get(endpoint, **params):
+            key = params.get("begin_from")
+            return responses.setdefault(key, [dict(MOCK_OUTAGES[0])])
+
+        requester.get = mock.MagicMock(side_effect=get)
+        outage_service = OutageService(requester)
+
+        outages = outage_service.get_outages()
+        self.assertIs(outage_service.get_outages()[0], outages[0])
+        for day in range(1, 8):
+            outage_service.get_outages(begin_from=f"2021-07-{day:02d}")
+
+        self.assertListEqual(list(outage_service._parsed), ["outages"])
+        self.assertIsNot(outage_service.get_outages()[0], outages[0])
+
+    def test_invalid_page_size(self):
+        """
+        test that page sizes below 1 are rejected
+        """
+        with self.assertRaises(ValueError):
+            OutageService(mock.MagicMock(), page_size=0)
+
+    @mock.patch("src.outage_service.Requester")
+    def test_snapshot(self, mock_requester: Requester):
+        """
+        test that outages saved to a snapshot are loaded without calling the
+        Outage API
+        """
+        mock_get = mock.MagicMock(return_value=MOCK_OUTAGES * 2)
+        mock_requester.get = mock_get
+
+        outage_service = OutageService(mock_requester)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, "outages.snap")
+            saved = outage_service.save_snapshot(path)
+            loaded = outage_service.load_snapshot(path)
+
+            mock_get.assert_called_once_with("outages")
+            self.assertEqual(len(loaded), 2)
+            self.assertListEqual(loaded.device_ids, saved.device_ids)
+            self.assertListEqual(loaded.begin.tolist(), saved.begin.tolist())
+            self.assertListEqual(loaded.end.tolist(), saved.end.tolist())
+            # unmaps the file before the directory is removed
+            del loaded
+
+
+class TestSplitIntoChunks(unittest.TestCase):
+
+    def test_max_rows(self):
+        """
+        test splitting by row count
+        """
+        rows = list(range(7))
+
+        self.assertListEqual(
+            split_into_chunks(rows, max_rows=3), [[0, 1, 2], [3, 4, 5], [6]])
+        self.assertListEqual(split_into_chunks(rows), [rows])
+        self.assertListEqual(split_into_chunks([], max_rows=3), [])
+
+    def test_max_bytes(self):
+        """
+        test that encoded chunks never exceed the byte limit unless a single
+        row is larger than it
+        """
+        rows = [{"id": "x" * size} for size in (1, 5, 30, 2, 2, 2, 2)]
+        chunks = split_into_chunks(rows, max_bytes=40)
+
+        self.assertListEqual(
+            [row for chunk in chunks for row in chunk], rows)
+        for chunk in chunks:
+            if len(chunk) > 1:
+                self.assertLessEqual(len(json.dumps(chunk)), 40)
+        self.assertListEqual([len(chunk) for chunk in chunks], [2, 1, 2, 2])
+
+    def test_max_rows_and_bytes(self):
+        """
+        test that both limits are applied together
+        """
+        rows = [{"id": "x"}] * 5
+        chunks = split_into_chunks(rows, max_rows=2, max_bytes=1000)
+
+        self.assertListEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+
+
+class TestPostOutagesInChunks(unittest.TestCase):
+
+    def setUp(self):
+        # every third request is answered with 500
+        self.server = StubServer(
+            StubData.generate(n_outages=0),
+            error_burst_every=3,
+            error_burst_length=1
+        ).start()
+        self.requester = Requester(
+            self.server.url, self.server.api_key, pool_maxsize=4)
+
+    def tearDown(self):
+        self.requester.close()
+        self.server.stop()
+
+    def _get_rows(self, count):
+        return [
+            dict(MOCK_OUTAGES[0], id=f"device-{n:03d}", name=f"Device {n}")
+            for n in range(count)
+        ]
+
+    def test_all_rows_arrive_exactly_once(self):
+        """
+        test that every row is posted exactly once although some chunks fail
+        on their first attempt
+        """
+        rows = self._get_rows(100)
+
+        outage_service = OutageService(self.requester)
+        results = outage_service.post_outages_in_chunks(
+            "site-0000", rows, max_rows=7, max_bytes=500,
+            max_workers=4, max_retries=10, backoff_factor=0)
+
+        self.assertTrue(all(result.ok for result in results))
+        self.assertListEqual(
+            [result.index for result in results], list(range(len(results))))
+        self.assertEqual(sum(result.rows for result in results), 100)
+        self.assertTrue(any(result.attempts > 1 for result in results))
+        self.assertListEqual(
+            sorted(self.server.posted["site-0000"], key=lambda row: row["id"]),
+            rows
+        )
+
+    def test_failed_chunk_is_reported(self):
+        """
+        test that a chunk failing more often than max_retries is reported
+        without affecting the other chunks
+        """
+        rows = self._get_rows(6)
+
+        outage_service = OutageService(self.requester)
+        results = outage_service.post_outages_in_chunks(
+            "site-0000", rows, max_rows=2, max_workers=1, max_retries=0,
+            backoff_factor=0)
+
+        self.assertListEqual(
+            results,
+            [
+                ChunkResult(0, 2, 1),
+                ChunkResult(1, 2, 1),
+                ChunkResult(2, 2, 1, results[2].error),
+            ]
+        )
+        self.assertIn("500 Server Error", results[2].error)
+        self.assertListEqual(self.server.posted["site-0000"], rows[:4])
+
+    @mock.patch("src.outage_service.Requester")
+    def test_client_errors_are_not_retried(self, mock_requester: Requester):
+        """
+        test that 4xx responses other than 429 fail the chunk right away
+        """
+        response = mock.MagicMock(status_code=400)
+        mock_requester.post = mock.MagicMock(
+            side_effect=requests.exceptions.HTTPError(response=response))
+
+        outage_service = OutageService(mock_requester)
+        results = outage_service.post_outages_in_chunks(
+            "my_site", [{"n": 1}], backoff_factor=0)
+
+        self.assertEqual(mock_requester.post.call_count, 1)
+        self.assertFalse(results[0].ok)
+
+    @mock.patch("src.outage_service.Requester")
+    def test_empty_outages(self, mock_requester: Requester):
+        """
+        test that an empty list is posted once like post_outages_to_site
+        """
+        mock_requester.post = mock.MagicMock()
+
+        outage_service = OutageService(mock_requester)
+        results = outage_service.post_outages_in_chunks("my_site", [])
+
+        mock_requester.post.assert_called_once_with("site-outages/my_site", [])
+        self.assertListEqual(results, [ChunkResult(0, 0, 1)])
@@ -0,0 +1,152 @@
+"""
+Unit tests for outage stats
+"""
+
+import unittest
+
+import numpy as np
+
+from src.model import Device, SiteInfo
+from src.outage_stats import compute_site_stats, merge_intervals
+from src.outage_table import OutageTable
+
+HOUR = 60 * 60 * 1000
+
+
+def merge_by_scan(codes, begin, end):
+    """
+    merges intervals one by one, for comparison
+    """
+    merged = []
+    rows = sorted(zip(codes.tolist(), begin.tolist(), end.tolist()))
+    for code, row_begin, row_end in rows:
+        row_end = max(row_end, row_begin)
+        if merged and merged[-1][0] == code and row_begin <= merged[-1][2]:
+            merged[-1][2] = max(merged[-1][2], row_end)
+        else:
+            merged.append([code, row_begin, row_end])
+    return [tuple(row) for row in merged]
+
+
+class TestMergeIntervals(unittest.TestCase):
+
+    def assert_merged(self, codes, begin, end):
+        result = merge_intervals(codes, begin, end)
+        self.assertListEqual(
+            list(zip(*(column.tolist() for column in result))),
+            merge_by_scan(codes, begin, end)
+        )
+
+    def test_merge_intervals(self):
+        """
+        test that overlapping, nested and touching intervals of a code are
+        merged and intervals of different codes are not
+        """
+        self.assert_merged(
+            np.array([0, 0, 0, 0, 1, 1], dtype=np.int32),
+            np.array([0, 5, 2, 20, 5, 0], dtype=np.int64),
+            np.array([4, 10, 3, 30, 6, 5], dtype=np.int64)
+        )
+
+    def test_random_intervals(self):
+        """
+        test random intervals, including ends before begins, against a scan
+        """
+        rng = np.random.default_rng(0)
+        codes = rng.integers(0, 20, 2000).astype(np.int32)
+        begin = rng.integers(-10 ** 6, 10 ** 6, 2000)
+        end = begin + rng.integers(-10, 10 ** 4, 2000)
+
+        self.assert_merged(codes, begin, end)
+
+    def test_wide_ranges(self):
+        """
+        test intervals too wide to be shifted by code at once
+        """
+        rng = np.random.default_rng(1)
+        codes = rng.integers(0, 5, 200).astype(np.int32)
+        begin = rng.integers(-2 ** 61, 2 ** 61, 200)
+        end = begin + rng.integers(0, 2 ** 59, 200)
+
+        self.assert_merged(codes, begin, end)
+
+    def test_empty(self):
+        """
+        test merging no intervals
+        """
+        result = merge_intervals(
+            np.array([], dtype=np.int32),
+            np.array([], dtype=np.int64),
+            np.array([], dtype=np.int64)
+        )
+
+        self.assertTrue(all(len(column) == 0 for column in result))
+
+
+class TestComputeSiteStats(unittest.TestCase):
+
+    def setUp(self):
+        self.table = OutageTable(
+            ["d1", "d2", "other"],
+            np.array([0, 0, 0, 1, 2], dtype=np.int32),
+            np.array([-HOUR, 2 * HOUR, 3 * HOUR, 3 * HOUR, 0],
+                     dtype=np.int64),
+            np.array([HOUR, 4 * HOUR, 5 * HOUR, 6 * HOUR, 10 * HOUR],
+                     dtype=np.int64)
+        )
+        self.site_info = SiteInfo(
+            id="site",
+            name="Site",
+            devices=[
+                Device(id="d1", name="Device 1"),
+                Device(id="d2", name="Device 2"),
+                Device(id="d3", name="Device 3"),
+            ]
+        )
+
+    def test_compute_site_stats(self):
+        """
+        test downtime, total duration and availability of devices and the
+        site over a window
+        """
+        stats = compute_site_stats(self.table, self.site_info, 0, 8 * HOUR)
+
+        self.assertEqual(stats.begin, "1970-01-01T00:00:00.000Z")
+        self.assertEqual(stats.end, "1970-01-01T08:00:00.000Z")
+        self.assertEqual(stats.outage_count, 4)
+        self.assertEqual(stats.total_duration_ms, 8 * HOUR)
+        # d1 is down 0-1 and 2-5, d2 3-6
+        self.assertEqual(stats.downtime_ms, 5 * HOUR)
+        self.assertAlmostEqual(stats.availability, 37.5)
+
+        d1, d2, d3 = stats.devices
+        self.assertEqual(
+            (d1.outage_count, d1.total_duration_ms, d1.downtime_ms),
+            (3, 5 * HOUR, 4 * HOUR)
+        )
+        self.assertAlmostEqual(d1.availability, 50.0)
+        self.assertEqual(d2.downtime_ms, 3 * HOUR)
+        self.assertEqual(
+            (d3.outage_count, d3.downtime_ms, d3.availability), (0, 0, 100.0))
+
+    def test_top_devices(self):
+        """
+        test that the devices with the most downtime come first
+        """
+        stats = compute_site_stats(self.table, self.site_info, 0, 8 * HOUR)
+
+        self.assertListEqual(
+            [device.id for device in stats.get_top_devices(2)], ["d1", "d2"])
+        payload = stats.to_dict(top=1)
+        self.assertListEqual(
+            [device["id"] for device in payload["devices"]], ["d1"])
+        self.assertEqual(payload["downtime_ms"], 5 * HOUR)
+
+    def test_empty_window(self):
+        """
+        test that availability is undefined for an empty window
+        """
+        stats = compute_site_stats(self.table, self.site_info, HOUR, HOUR)
+
+        self.assertIsNone(stats.availability)
+        self.assertEqual(stats.outage_count, 1)
@@ -0,0 +1,146 @@
+"""
+Unit tests for outage table
+"""
+
+import unittest
+from datetime import timedelta
+
+import numpy as np
+
+from src.model import Device, Outage
+from src.outage_filter import OutageFilter
+from src.outage_table import OutageTable, format_epoch_ms, parse_epoch_ms
+
+MOCK_OUTAGES = [
+    {
+        "id": "002b28fc",
+        "begin": "2021-07-26T17:09:31.036Z",
+        "end": "2021-08-29T00:37:42.253Z"
+    },
+    {
+        "id": "086b0d53",
+        "begin": "2022-02-15T11:28:26.965Z",
+        "end": "2022-03-18T09:28:39.865Z"
+    },
+    {
+        "id": "002b28fc",
+        "begin": "2022-01-01T00:00:00.000Z",
+        "end": "2022-01-01T00:10:00.000Z"
+    },
+    {
+        "id": "0e4d59ba",
+        "begin": "2022-02-15T11:28:26.965Z",
+        "end": "2022-03-18T09:28:39.865Z"
+    },
+]
+
+DEVICES = [
+    Device(id="002b28fc", name="Battery 1"),
+    Device(id="086b0d53", name="Battery 2"),
+]
+
+
+class TestEpochMs(unittest.TestCase):
+
+    def test_round_trip(self):
+        """
+        test that API timestamps survive parsing and formatting
+        """
+        values = [outage["begin"] for outage in MOCK_OUTAGES]
+        parsed = parse_epoch_ms(values)
+
+        self.assertEqual(parsed.dtype, np.int64)
+        self.assertEqual(parsed[0], 1627319371036)
+        self.assertListEqual(format_epoch_ms(parsed), values)
+
+    def test_other_formats(self):
+        """
+        test that other formats are parsed one by one and normalized to UTC
+        """
+        parsed = parse_epoch_ms(
+            ["2021-07-26T19:09:31.036+02:00", "2021-07-26T17:09:31Z"])
+
+        self.assertListEqual(
+            format_epoch_ms(parsed),
+            ["2021-07-26T17:09:31.036Z", "2021-07-26T17:09:31.000Z"]
+        )
+
+    def test_empty(self):
+        """
+        test parsing no timestamps
+        """
+        self.assertEqual(len(parse_epoch_ms([])), 0)
+
+
+class TestOutageTable(unittest.TestCase):
+
+    def test_from_dicts(self):
+        """
+        test that device ids are int-coded in order of appearance
+        """
+        table = OutageTable.from_dicts(MOCK_OUTAGES)
+
+        self.assertEqual(len(table), 4)
+        self.assertListEqual(
+            table.device_ids, ["002b28fc", "086b0d53", "0e4d59ba"])
+        self.assertListEqual(table.codes.tolist(), [0, 1, 0, 2])
+
+    def test_from_outages(self):
+        """
+        test that a table built from outages equals one built from dicts
+        """
+        outages = [Outage.from_dict(outage) for outage in MOCK_OUTAGES]
+        table = OutageTable.from_outages(outages)
+        expected = OutageTable.from_dicts(MOCK_OUTAGES)
+
+        self.assertListEqual(table.device_ids, expected.device_ids)
+        np.testing.assert_array_equal(table.begin, expected.begin)
+        np.testing.assert_array_equal(table.end, expected.end)
+
+    def test_mask(self):
+        """
+        test device, date and duration masks
+        """
+        table = OutageTable.from_dicts(MOCK_OUTAGES)
+        start_ms = parse_epoch_ms(["2022-01-01T00:00:00.000Z"])[0]
+
+        self.assertListEqual(
+            table.device_mask(["002b28fc", "unknown"]).tolist(),
+            [True, False, True, False]
+        )
+        self.assertListEqual(
+            table.mask(["002b28fc", "086b0d53"], start_ms).tolist(),
+            [False, True, True, False]
+        )
+        self.assertListEqual(
+            table.mask(
+                ["002b28fc", "086b0d53"],
+                start_ms,
+                min_duration_ms=3600 * 1000
+            ).tolist(),
+            [False, True, False, False]
+        )
+
+    def test_apply_table_matches_apply(self):
+        """
+        test that filtering a table gives the same rows as filtering outages
+        """
+        outages = [Outage.from_dict(outage) for outage in MOCK_OUTAGES]
+        table = OutageTable.from_dicts(MOCK_OUTAGES)
+        filters = [
+            OutageFilter(DEVICES, "2022-01-01T00:00:00.000Z"),
+            OutageFilter(DEVICES, "2021-01-01T00:00:00.000Z"),
+            OutageFilter(
+                DEVICES,
+                "2021-01-01T00:00:00.000Z",
+                end_date="2022-03-01T00:00:00.000Z"
+            ),
+            OutageFilter(
+                DEVICES,
+                "2021-01-01T00:00:00.000Z",
+                min_duration=timedelta(hours=1)
+            ),
+        ]
+        for outage_filter in filters:
+            self.assertListEqual(
+                outage_filter.apply_table(table), outage_filter.apply(outages))
@@ -0,0 +1,81 @@
+"""
+Unit tests for parallel parse
+"""
+
+import unittest
+
+from src.model import Outage
+from src.parallel_parse import (
+    UNPARSED, parse_epoch_ms_chunk, parse_outages)
+
+OUTAGES = [
+    {
+        "id": "002b28fc",
+        "begin": "2021-07-26T17:09:31.036Z",
+        "end": "2021-08-29T00:37:42.253Z"
+    },
+    {
+        "id": "0e4d59ba",
+        "begin": "1969-12-31T23:59:59.999Z",
+        "end": "2022-01-01T01:00:00+01:00"
+    },
+    {
+        "id": "111183e7",
+        "begin": "2022-02-15T11:28:26.965Z",
+        "end": "2022-02-15T11:28:26.965Z\n"
+    },
+    {
+        "id": "20f6e664",
+        "begin": "2262-04-11T23:47:16.854Z",
+        "end": "9999-12-31T23:59:59.999Z"
+    },
+    {
+        "id": "2e7c96d1",
+        "begin": "2022-01-01T00:00:00.000Z",
+        "end": "2022-01-01T00:00:00"
+    },
+]
+
+
+class TestParallelParse(unittest.TestCase):
+
+    def test_parse_epoch_ms_chunk(self):
+        """
+        test that timestamps of the API format are parsed to epoch
+        milliseconds and others are marked as unparsed
+        """
+        values = parse_epoch_ms_chunk("\n".join([
+            "1970-01-01T00:00:00.001Z",
+            "1969-12-31T23:59:59.999Z",
+            "2022-01-01T01:00:00+01:00",
+            "2022-13-01T00:00:00.000Z",
+        ]))
+
+        self.assertListEqual(list(values), [1, -1, UNPARSED, UNPARSED])
+
+    def test_parse_outages(self):
+        """
+        test that outages parsed by worker processes are exactly the outages
+        parsed by Outage.from_dict, in the same order
+        """
+        expected = [Outage.from_dict(outage) for outage in OUTAGES]
+
+        outages = parse_outages(OUTAGES * 3, workers=2, chunk_size=2)
+
+        self.assertListEqual(outages, expected * 3)
+        for outage, expected_outage in zip(outages, expected * 3):
+            self.assertEqual(
+                outage.begin_datetime.tzinfo,
+                expected_outage.begin_datetime.tzinfo)
+            self.assertEqual(
+                outage.end_datetime.utcoffset(),
+                expected_outage.end_datetime.utcoffset())
+
+    def test_parse_outages_serially(self):
+        """
+        test that payloads of a single chunk are parsed without workers
+        """
+        outages = parse_outages(OUTAGES, workers=4)
+
+        self.assertListEqual(
+            outages, [Outage.from_dict(outage) for outage in OUTAGES])
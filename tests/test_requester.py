@@ -2,11 +2,16 @@
 Unit tests for requester
 """
 
+import gzip
+import json
 import unittest
+from typing import List
 from unittest import mock
 
 import requests
 
+from src.codec import get_codec
+from src.model import Outage
 from src.requester import Requester
 
 MOCK_DATA = [
@@ -38,6 +43,24 @@ class TestRequester(unittest.TestCase):
         )
         self.assertListEqual(response_data, MOCK_DATA)
 
+    @mock.patch("src.requester.requests.Session.post")
+    @mock.patch("src.requester.requests.Session.get")
+    def test_timeout(self, mock_get, mock_post):
+        """
+        test that the timeout is passed to every request
+        """
+        for mock_send in (mock_get, mock_post):
+            mock_send.return_value.status_code = 200
+            mock_send.return_value.json.return_value = MOCK_DATA
+
+        requester = Requester(
+            "https://fooapi:3333", "some_api_key", timeout=(3.05, 30))
+        requester.get("foo")
+        requester.post("foo", MOCK_DATA)
+
+        for mock_send in (mock_get, mock_post):
+            self.assertEqual(mock_send.call_args.kwargs["timeout"], (3.05, 30))
+
     @mock.patch("src.requester.requests.Session.get")
     def test_get_with_query_params(self, mock_get):
         """
@@ -128,6 +151,117 @@ class TestRequester(unittest.TestCase):
         )
         self.assertDictEqual(response_data, {})
 
+    @mock.patch("src.requester.requests.Session.post")
+    def test_post_compressed(self, mock_post):
+        """
+        test that post bodies above the threshold are gzipped
+        """
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {}
+        body = [{"id": i, "key": "3"} for i in range(100)]
+
+        requester = Requester(
+            "https://fooapi:3333",
+            "some_api_key",
+            compression="gzip",
+            compression_threshold=100,
+            accept_encoding="gzip"
+        )
+        requester.post("bar", body)
+
+        kwargs = mock_post.call_args.kwargs
+        self.assertEqual(kwargs["headers"], {
+            'Accept': 'application/json',
+            'X-API-Key': 'some_api_key',
+            'Accept-Encoding': 'gzip',
+            'Content-Type': 'application/json',
+            'Content-Encoding': 'gzip'
+        })
+        data = gzip.decompress(kwargs["data"])
+        self.assertEqual(json.loads(data), body)
+        metrics = requester.transfer.get_metrics()
+        self.assertEqual(metrics["bytes_sent"], len(kwargs["data"]))
+        self.assertEqual(metrics["bytes_sent_uncompressed"], len(data))
+
+    @mock.patch("src.requester.requests.Session.post")
+    def test_post_below_compression_threshold(self, mock_post):
+        """
+        test that post bodies below the threshold are sent uncompressed
+        """
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {}
+
+        requester = Requester(
+            "https://fooapi:3333", "some_api_key", compression="gzip")
+        requester.post("bar", [{"id": 1, "key": "3"}])
+
+        kwargs = mock_post.call_args.kwargs
+        self.assertNotIn("Content-Encoding", kwargs["headers"])
+        self.assertEqual(
+            json.loads(kwargs["data"]), [{"id": 1, "key": "3"}])
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_get_with_codec(self, mock_get):
+        """
+        test that responses are decoded with the codec of the requester
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(MOCK_DATA).encode()
+
+        requester = Requester(
+            "https://fooapi:3333", "some_api_key", codec=get_codec())
+        response_data = requester.get("foo")
+
+        self.assertListEqual(response_data, MOCK_DATA)
+        mock_get.return_value.json.assert_not_called()
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_get_as(self, mock_get):
+        """
+        test that get_as decodes responses into models with every codec
+        """
+        outages = [{
+            "id": "002b28fc",
+            "begin": "2021-07-26T17:09:31.036Z",
+            "end": "2021-08-29T00:37:42.253Z"
+        }]
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.content = json.dumps(outages).encode()
+
+        for codec in [None] + [get_codec(name) for name in ("json", None)]:
+            requester = Requester(
+                "https://fooapi:3333", "some_api_key", codec=codec)
+            self.assertEqual(
+                requester.get_as("outages", List[Outage]),
+                [Outage.from_dict(outages[0])]
+            )
+
+    @mock.patch("src.requester.requests.Session.post")
+    def test_post_with_codec(self, mock_post):
+        """
+        test that post bodies are encoded with the codec of the requester
+        """
+        mock_post.return_value.status_code = 200
+        mock_post.return_value.json.return_value = {}
+
+        requester = Requester(
+            "https://fooapi:3333", "some_api_key", codec=get_codec())
+        requester.post("bar", [{"id": 1, "key": "3"}])
+
+        kwargs = mock_post.call_args.kwargs
+        self.assertEqual(
+            kwargs["headers"]["Content-Type"], "application/json")
+        self.assertNotIn("Content-Encoding", kwargs["headers"])
+        self.assertEqual(
+            json.loads(kwargs["data"]), [{"id": 1, "key": "3"}])
+
+    def test_unsupported_compression(self):
+        """
+        test that an unavailable compression is rejected
+        """
+        with self.assertRaises(ValueError):
+            Requester("https://fooapi:3333", "some_api_key", compression="xz")
+
     @mock.patch("src.requester.requests.Session.post")
     def test_post_with_empty_body(self, mock_post):
         """
@@ -221,3 +355,105 @@ class TestRequester(unittest.TestCase):
                 params={},
                 json=[{"id": 1, "key": "3"}]
             )
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_session_is_reused(self, mock_get):
+        """
+        test that consecutive requests share the same session
+        """
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.json.return_value = MOCK_DATA
+
+        requester = Requester("https://fooapi:3333", "some_api_key")
+        session = requester._get_request_session()
+        requester.get("foo")
+        requester.get("bar")
+
+        self.assertIs(session, requester._get_request_session())
+        self.assertEqual(mock_get.call_count, 2)
+
+    def test_session_pool_size(self):
+        """
+        test that the mounted adapters use the configured pool size and the
+        shared retry policy
+        """
+        requester = Requester(
+            "https://fooapi:3333", "some_api_key",
+            max_retries=3, pool_connections=2, pool_maxsize=20)
+        session = requester._get_request_session()
+
+        for prefix in ("http://", "https://"):
+            adapter = session.get_adapter(prefix + "fooapi")
+            self.assertEqual(adapter._pool_connections, 2)
+            self.assertEqual(adapter._pool_maxsize, 20)
+            self.assertIs(adapter.max_retries, requester._retries)
+            self.assertEqual(adapter.max_retries.total, 3)
+
+    @mock.patch("src.requester.requests.Session.close")
+    def test_close(self, mock_close):
+        """
+        test that close releases the session and a new one is created on the
+        next use
+        """
+        requester = Requester("https://fooapi:3333", "some_api_key")
+        session = requester._get_request_session()
+        requester.close()
+
+        mock_close.assert_called_once_with()
+        self.assertIsNot(session, requester._get_request_session())
+
+        requester.close()
+        requester.close()
+        self.assertEqual(mock_close.call_count, 2)
+
+    @mock.patch("src.requester.requests.Session.close")
+    def test_context_manager(self, mock_close):
+        """
+        test that requester closes its session when used as a context manager
+        """
+        with Requester("https://fooapi:3333", "some_api_key") as requester:
+            requester._get_request_session()
+
+        mock_close.assert_called_once_with()
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_iter_array(self, mock_get):
+        """
+        test iter_array method of Requester streams the response
+        """
+        data = b'[{"id": 1, "foo": "bar"}, {"id": 2, "foo": "baz"}]'
+        mock_get.return_value.status_code = 200
+        mock_get.return_value.iter_content.return_value = iter(
+            [data[:10], data[10:33], data[33:]])
+
+        requester = Requester("https://fooapi:3333", "some_api_key")
+        elements = requester.iter_array("foo", chunk_size=10, order="asc")
+
+        mock_get.assert_not_called()
+        self.assertListEqual(list(elements), MOCK_DATA)
+        mock_get.assert_called_once_with(
+            "https://fooapi:3333/foo",
+            headers={
+                'Accept': 'application/json',
+                'X-API-Key': 'some_api_key'
+            },
+            params={"order": "asc"},
+            stream=True
+        )
+        mock_get.return_value.iter_content.assert_called_once_with(10)
+        mock_get.return_value.__exit__.assert_called_once()
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_iter_array_failure(self, mock_get):
+        """
+        test iter_array method of Requester having a failure
+        """
+        mock_get.return_value.status_code = 400
+        mock_get.return_value.json.return_value = None
+        mock_get.return_value.raise_for_status.side_effect = (
+            requests.exceptions.HTTPError())
+
+        requester = Requester("https://fooapi:3333", "some_api_key")
+
+        with self.assertRaises(requests.exceptions.HTTPError):
+            list(requester.iter_array("foo"))
@@ -0,0 +1,236 @@
+"""
+Unit tests for response cache
+"""
+
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from src.outage_service import OutageService
+from src.requester import Requester
+from src.response_cache import ResponseCache
+
+MOCK_DATA = [
+    {"id": 1, "foo": "bar"},
+    {"id": 2, "foo": "baz"},
+]
+
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_put_and_get(self):
+        """
+        test that entries with validators are stored and read back
+        """
+        cache = ResponseCache(self.directory.name)
+        key = cache.get_key("https://fooapi:3333/foo", {"b": 2, "a": 1})
+
+        self.assertEqual(
+            key, cache.get_key("https://fooapi:3333/foo", {"a": 1, "b": 2}))
+        self.assertIsNone(cache.get(key))
+
+        cache.put(key, b"[1]", etag='"v1"')
+        entry = cache.get(key)
+        self.assertIsNone(entry._body)
+        self.assertEqual(entry.body, b"[1]")
+        self.assertDictEqual(
+            entry.get_conditional_headers(), {"If-None-Match": '"v1"'})
+        self.assertFalse(cache.is_fresh(entry))
+
+    def test_ttl(self):
+        """
+        test that entries without validators are kept only with a TTL and
+        are fresh until it expires
+        """
+        cache = ResponseCache(self.directory.name)
+        self.assertIsNone(cache.put("key", b"[1]"))
+
+        cache = ResponseCache(self.directory.name, ttl=60)
+        entry = cache.put("key", b"[1]")
+        self.assertTrue(cache.is_fresh(entry))
+
+        with mock.patch("src.response_cache.time.time") as mock_time:
+            mock_time.return_value = entry.stored_at + 61
+            self.assertFalse(cache.is_fresh(entry))
+
+    def test_decode_is_memoized(self):
+        """
+        test that decoding the same entry returns the same object
+        """
+        cache = ResponseCache(self.directory.name)
+        entry = cache.put("key", b"[1, 2]", etag='"v1"')
+
+        decoded = cache.decode("key", entry)
+        self.assertListEqual(decoded, [1, 2])
+        self.assertIs(cache.decode("key", cache.get("key")), decoded)
+
+        entry = cache.put("key", b"[3]", etag='"v2"')
+        self.assertListEqual(cache.decode("key", entry), [3])
+
+    def test_decode_keeps_latest_params(self):
+        """
+        test that decoded bodies of other params of the same url are
+        dropped, while the pages of the same params are kept together
+        """
+        cache = ResponseCache(self.directory.name)
+        url = "https://fooapi:3333/outages"
+        decoded = {}
+        for params in (
+            {"begin_from": "1", "page": 1},
+            {"begin_from": "1", "page": 2},
+            {"begin_from": "2"},
+            {"begin_from": "3"},
+        ):
+            key = cache.get_key(url, params)
+            entry = cache.put(key, b"[1]", etag='"v1"')
+            decoded[key] = cache.decode(key, entry, url=url, params=params)
+
+        self.assertEqual(len(cache._decoded), 1)
+        ((_, bodies),) = cache._decoded.values()
+        self.assertListEqual(
+            list(bodies), [cache.get_key(url, {"begin_from": "3"})])
+
+        pages = [
+            cache.get_key(url, {"begin_from": "4", "page": page})
+            for page in (1, 2)
+        ]
+        for page, key in enumerate(pages, 1):
+            params = {"begin_from": "4", "page": page}
+            entry = cache.put(key, b"[1]", etag='"v1"')
+            cache.decode(key, entry, url=url, params=params)
+        self.assertListEqual(list(cache._decoded[url][1]), pages)
+
+    def test_eviction(self):
+        """
+        test that least recently used entries are evicted beyond max_bytes
+        """
+        cache = ResponseCache(self.directory.name, max_bytes=35)
+        for index, key in enumerate(("a", "b", "c")):
+            cache.put(key, b"x" * 10, etag='"v"')
+            os.utime(
+                os.path.join(self.directory.name, key + ".body"),
+                (index, index)
+            )
+        cache.touch("a")
+        cache.put("d", b"x" * 10, etag='"v"')
+
+        self.assertIsNotNone(cache.get("a"))
+        self.assertIsNone(cache.get("b"))
+        self.assertIsNotNone(cache.get("c"))
+        self.assertIsNotNone(cache.get("d"))
+
+
+class TestRequesterCache(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.directory.name)
+        self.requester = Requester(
+            "https://fooapi:3333", "some_api_key", cache=self.cache)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def _get_body_path(self, endpoint, **params):
+        key = self.cache.get_key("https://fooapi:3333/" + endpoint, params)
+        return os.path.join(self.directory.name, key + ".body")
+
+    def _response(self, status_code, body=b"", headers=None):
+        res = mock.MagicMock(status_code=status_code, content=body)
+        res.headers = headers or {}
+        res.json.side_effect = lambda: json.loads(body)
+        return res
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_revalidation(self, mock_get):
+        """
+        test that cached responses are revalidated and served on 304
+        """
+        mock_get.side_effect = [
+            self._response(
+                200, json.dumps(MOCK_DATA).encode(), {"ETag": '"v1"'}),
+            self._response(304),
+        ]
+
+        first = self.requester.get("foo", order="asc")
+        second = self.requester.get("foo", order="asc")
+
+        self.assertListEqual(first, MOCK_DATA)
+        self.assertIs(second, first)
+        # the decoded body is served without reading it from disk
+        os.remove(self._get_body_path("foo", order="asc"))
+        mock_get.side_effect = [self._response(304)]
+        self.assertIs(self.requester.get("foo", order="asc"), first)
+        mock_get.assert_called_with(
+            "https://fooapi:3333/foo",
+            headers={
+                'Accept': 'application/json',
+                'X-API-Key': 'some_api_key',
+                'If-None-Match': '"v1"'
+            },
+            params={"order": "asc"}
+        )
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_evicted_body(self, mock_get):
+        """
+        test that a body evicted after its lookup is downloaded again
+        """
+        mock_get.side_effect = [
+            self._response(200, b"[1]", {"ETag": '"v1"'}),
+            self._response(304),
+            self._response(200, b"[1]", {"ETag": '"v1"'}),
+        ]
+        self.requester.get("foo")
+        os.remove(self._get_body_path("foo"))
+        self.requester.cache = ResponseCache(self.directory.name)
+
+        self.assertListEqual(self.requester.get("foo"), [1])
+        self.assertEqual(mock_get.call_count, 3)
+        self.assertNotIn(
+            "If-None-Match", mock_get.call_args.kwargs["headers"])
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_changed_response(self, mock_get):
+        """
+        test that a changed response replaces the cached one
+        """
+        mock_get.side_effect = [
+            self._response(
+                200, b"[1]", {"Last-Modified": "Mon, 01 Aug 2022 00:00:00"}),
+            self._response(200, b"[2]", {"ETag": '"v2"'}),
+        ]
+
+        self.assertListEqual(self.requester.get("foo"), [1])
+        self.assertListEqual(self.requester.get("foo"), [2])
+        self.assertEqual(
+            mock_get.call_args.kwargs["headers"]["If-Modified-Since"],
+            "Mon, 01 Aug 2022 00:00:00"
+        )
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_parsed_models_are_reused(self, mock_get):
+        """
+        test that OutageService reuses parsed models on 304
+        """
+        site_info = {"id": "site_1", "name": "Site 1", "devices": []}
+        mock_get.side_effect = [
+            self._response(
+                200, json.dumps(site_info).encode(), {"ETag": '"v1"'}),
+            self._response(304),
+        ]
+
+        outage_service = OutageService(self.requester)
+        first = outage_service.get_site_info("site_1")
+        second = outage_service.get_site_info("site_1")
+
+        self.assertIs(second, first)
+        self.assertEqual(mock_get.call_count, 2)
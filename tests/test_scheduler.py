@@ -0,0 +1,205 @@
+"""
+Unit tests for scheduler
+"""
+
+import os
+import random
+import signal
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from src.scheduler import FileLock, Scheduler
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def wait(self, seconds):
+        self.now += seconds
+
+
+class TestScheduler(unittest.TestCase):
+
+    def test_run_waits_for_the_next_tick(self):
+        """
+        test that run waits from the end of a cycle until the next tick
+        """
+        clock = FakeClock()
+
+        def job():
+            clock.now += 3
+
+        scheduler = Scheduler(job, 10, clock=clock)
+        with mock.patch.object(
+                scheduler._stopped, "wait", side_effect=clock.wait
+        ) as mock_wait:
+            scheduler.run(max_cycles=3)
+
+        self.assertEqual(
+            [call.args[0] for call in mock_wait.call_args_list], [7, 7])
+        self.assertEqual(scheduler.get_metrics()["cycles"], 3)
+
+    def test_overrun_skips_missed_ticks(self):
+        """
+        test that a cycle longer than the interval skips the missed ticks
+        instead of running them back to back
+        """
+        clock = FakeClock()
+
+        def job():
+            clock.now += 25
+
+        scheduler = Scheduler(job, 10, clock=clock)
+        with mock.patch.object(
+                scheduler._stopped, "wait", side_effect=clock.wait
+        ) as mock_wait:
+            scheduler.run(max_cycles=2)
+
+        mock_wait.assert_called_once_with(5)
+
+    def test_jitter_does_not_accumulate(self):
+        """
+        test that every cycle starts at most the jitter after its tick
+        """
+        clock = FakeClock()
+        starts = []
+        scheduler = Scheduler(
+            lambda: starts.append(clock.now), 10, jitter=2, clock=clock,
+            rng=random.Random(1)
+        )
+        with mock.patch.object(
+                scheduler._stopped, "wait", side_effect=clock.wait):
+            scheduler.run(max_cycles=20)
+
+        self.assertEqual(len(starts), 20)
+        for cycle, start in enumerate(starts):
+            self.assertGreaterEqual(start, 10 * cycle)
+            self.assertLessEqual(start, 10 * cycle + 2)
+
+    def test_failures_do_not_stop_the_scheduler(self):
+        """
+        test that a failing cycle is counted and the next one still runs
+        """
+        job = mock.Mock(side_effect=[RuntimeError("boom"), None, None])
+        scheduler = Scheduler(job, 0)
+        scheduler.run(max_cycles=3)
+
+        self.assertEqual(job.call_count, 3)
+        self.assertEqual(
+            scheduler.get_metrics(),
+            {"cycles": 3, "failures": 1, "skipped": 0}
+        )
+
+    def test_stop_ends_run_after_the_current_cycle(self):
+        """
+        test that stop, e.g. from a signal handler, ends run once the running
+        cycle is completed
+        """
+        calls = []
+
+        def job():
+            calls.append(1)
+            if len(calls) == 2:
+                scheduler.stop()
+
+        scheduler = Scheduler(job, 0.01)
+        scheduler.run()
+
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(scheduler.stopped)
+
+    def test_second_signal_restores_handlers(self):
+        """
+        test that the first signal stops the scheduler gracefully and
+        restores the previous handlers, so a second signal is not ignored
+        while a cycle is stuck
+        """
+        previous = {
+            signum: signal.getsignal(signum)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        for signum, handler in previous.items():
+            self.addCleanup(signal.signal, signum, handler)
+
+        scheduler = Scheduler(lambda: None, 1)
+        scheduler.install_signal_handlers()
+        for signum in previous:
+            self.assertEqual(
+                signal.getsignal(signum), scheduler._handle_signal)
+
+        scheduler._handle_signal(signal.SIGTERM, None)
+
+        self.assertTrue(scheduler.stopped)
+        for signum, handler in previous.items():
+            self.assertEqual(signal.getsignal(signum), handler)
+
+    def test_overlapping_cycle_is_skipped(self):
+        """
+        test that run_once skips while a cycle is running
+        """
+        started = threading.Event()
+        release = threading.Event()
+
+        def job():
+            started.set()
+            release.wait(5)
+
+        scheduler = Scheduler(job, 10)
+        thread = threading.Thread(target=scheduler.run_once)
+        thread.start()
+        started.wait(5)
+        self.assertFalse(scheduler.run_once())
+        release.set()
+        thread.join()
+
+        self.assertEqual(
+            scheduler.get_metrics(),
+            {"cycles": 1, "failures": 0, "skipped": 1}
+        )
+
+    def test_cycle_is_skipped_while_lock_file_is_held(self):
+        """
+        test that run_once skips while another holder locks the lock file
+        """
+        job = mock.Mock()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lock")
+            scheduler = Scheduler(job, 10, lock_path=path)
+            with FileLock(path) as locked:
+                self.assertTrue(locked)
+                self.assertFalse(scheduler.run_once())
+            self.assertTrue(scheduler.run_once())
+
+        job.assert_called_once_with()
+        self.assertEqual(scheduler.get_metrics()["skipped"], 1)
+
+
+class TestFileLock(unittest.TestCase):
+
+    def test_lock_is_exclusive(self):
+        """
+        test that a locked file cannot be locked again until it is released
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "lock")
+            with FileLock(path) as first:
+                with FileLock(path) as second:
+                    self.assertTrue(first)
+                    self.assertFalse(second)
+            with FileLock(path) as third:
+                self.assertTrue(third)
+
+    def test_no_path_is_always_locked(self):
+        """
+        test that a lock without a path is always acquired
+        """
+        with FileLock(None) as first, FileLock(None) as second:
+            self.assertTrue(first)
+            self.assertTrue(second)
@@ -0,0 +1,152 @@
+"""
+Unit tests for outage table snapshots
+"""
+
+import os
+import struct
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from src.model import Device
+from src.outage_filter import OutageFilter
+from src.outage_table import OutageTable
+from src.snapshot import load_snapshot, write_snapshot
+
+MOCK_OUTAGES = [
+    {
+        "id": "002b28fc",
+        "begin": "2021-07-26T17:09:31.036Z",
+        "end": "2021-08-29T00:37:42.253Z"
+    },
+    {
+        "id": "086b0d53",
+        "begin": "2022-02-15T11:28:26.965Z",
+        "end": "2022-03-18T09:28:39.865Z"
+    },
+    {
+        "id": "002b28fc",
+        "begin": "2022-01-01T00:00:00.000Z",
+        "end": "2022-01-01T00:10:00.000Z"
+    },
+    {
+        "id": "bätterie-ü",
+        "begin": "2022-02-15T11:28:26.965Z",
+        "end": "2022-03-18T09:28:39.865Z"
+    },
+]
+
+DEVICES = [
+    Device(id="002b28fc", name="Battery 1"),
+    Device(id="bätterie-ü", name="Battery 2"),
+]
+
+
+class TestSnapshot(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "outages.snap")
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def assertTableEqual(self, table: OutageTable, expected: OutageTable):
+        self.assertListEqual(table.device_ids, expected.device_ids)
+        np.testing.assert_array_equal(table.codes, expected.codes)
+        np.testing.assert_array_equal(table.begin, expected.begin)
+        np.testing.assert_array_equal(table.end, expected.end)
+
+    def test_round_trip(self):
+        """
+        test that a loaded snapshot equals the table it was written from
+        """
+        table = OutageTable.from_dicts(MOCK_OUTAGES)
+        size = write_snapshot(self.path, table)
+
+        self.assertEqual(size, os.path.getsize(self.path))
+        loaded = load_snapshot(self.path)
+        self.assertTableEqual(loaded, table)
+        names = {device.id: device.name for device in DEVICES}
+        names["086b0d53"] = "Battery 3"
+        self.assertListEqual(loaded.to_dicts(names), table.to_dicts(names))
+
+    def test_empty(self):
+        """
+        test that an empty table survives a snapshot
+        """
+        table = OutageTable.from_dicts([])
+        write_snapshot(self.path, table)
+
+        loaded = load_snapshot(self.path)
+        self.assertEqual(len(loaded), 0)
+        self.assertListEqual(loaded.device_ids, [])
+
+    def test_columns_are_mapped(self):
+        """
+        test that the columns of a loaded snapshot are aligned, read-only
+        views of the file
+        """
+        write_snapshot(self.path, OutageTable.from_dicts(MOCK_OUTAGES))
+
+        loaded = load_snapshot(self.path)
+        for column in (loaded.codes, loaded.begin, loaded.end):
+            self.assertFalse(column.flags.writeable)
+            self.assertFalse(column.flags.owndata)
+            self.assertEqual(column.ctypes.data % column.itemsize, 0)
+
+    def test_apply_table(self):
+        """
+        test that filtering a loaded snapshot gives the same rows as
+        filtering the table it was written from
+        """
+        table = OutageTable.from_dicts(MOCK_OUTAGES)
+        write_snapshot(self.path, table)
+
+        loaded = load_snapshot(self.path)
+        outage_filter = OutageFilter(DEVICES, "2022-01-01T00:00:00.000Z")
+        self.assertListEqual(
+            outage_filter.apply_table(loaded),
+            outage_filter.apply_table(table)
+        )
+        self.assertEqual(len(outage_filter.apply_table(loaded)), 2)
+
+    def test_invalid(self):
+        """
+        test that files which are not valid snapshots raise ValueError
+        """
+        write_snapshot(self.path, OutageTable.from_dicts(MOCK_OUTAGES))
+        with open(self.path, "rb") as fp:
+            data = fp.read()
+
+        invalid = {
+            "empty": b"",
+            "magic": b"NOTSNAP\x00" + data[8:],
+            "version": data[:8] + struct.pack("<I", 99) + data[12:],
+            "truncated": data[:-8],
+        }
+        for name, content in invalid.items():
+            with self.subTest(name):
+                with open(self.path, "wb") as fp:
+                    fp.write(content)
+                with self.assertRaises(ValueError):
+                    load_snapshot(self.path)
+
+    def test_write_failure_keeps_snapshot(self):
+        """
+        test that a failing write leaves the previous snapshot in place and
+        no temporary files behind
+        """
+        table = OutageTable.from_dicts(MOCK_OUTAGES)
+        write_snapshot(self.path, table)
+
+        with mock.patch(
+            "src.snapshot.os.replace", side_effect=OSError("disk full")
+        ):
+            with self.assertRaises(OSError):
+                write_snapshot(self.path, OutageTable.from_dicts([]))
+
+        self.assertListEqual(os.listdir(self.tmp_dir.name), ["outages.snap"])
+        self.assertTableEqual(load_snapshot(self.path), table)
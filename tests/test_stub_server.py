@@ -0,0 +1,338 @@
+"""
+Unit tests for stub server
+"""
+
+import time
+import unittest
+
+import requests
+
+from src.codec import get_available_codecs, get_codec
+from src.model import Outage, SiteInfo
+from src.outage_service import OutageService
+from src.requester import Requester
+from src.stub_server import StubData, StubServer
+
+
+class TestStubData(unittest.TestCase):
+
+    def test_generate(self):
+        """
+        test that data generation is deterministic and consistent
+        """
+        data = StubData.generate(
+            n_devices=20, n_sites=3, n_outages=50, devices_per_site=5, seed=1)
+
+        self.assertEqual(
+            data, StubData.generate(
+                n_devices=20, n_sites=3, n_outages=50, devices_per_site=5,
+                seed=1))
+        self.assertListEqual(
+            list(data.sites), ["site-0000", "site-0001", "site-0002"])
+        self.assertEqual(len(data.outages), 50)
+        self.assertTrue(all(
+            len(site["devices"]) == 5 for site in data.sites.values()))
+        for outage in data.outages:
+            parsed = Outage.from_dict(outage)
+            self.assertLessEqual(parsed.begin_datetime, parsed.end_datetime)
+
+
+class TestStubServer(unittest.TestCase):
+
+    def setUp(self):
+        self.data = StubData.generate(
+            n_devices=10, n_sites=2, n_outages=100, devices_per_site=3)
+
+    def _get_service(self, server, api_key=None, **kwargs):
+        requester = Requester(
+            server.url, api_key or server.api_key, **kwargs)
+        self.addCleanup(requester.close)
+        return OutageService(requester)
+
+    def test_end_to_end(self):
+        """
+        test that outages and site info are served and posts are recorded
+        """
+        with StubServer(self.data) as server:
+            service = self._get_service(server)
+
+            outages = service.get_outages()
+            site_info = service.get_site_info("site-0001")
+            service.post_outages_to_site("site-0001", [{
+                "id": "d1",
+                "name": "Device 1",
+                "begin": "2022-01-01T00:00:00.000Z",
+                "end": "2022-01-02T00:00:00.000Z",
+            }])
+
+        self.assertEqual(len(outages), 100)
+        self.assertEqual(outages[0], Outage.from_dict(self.data.outages[0]))
+        self.assertEqual(site_info.id, "site-0001")
+        self.assertEqual(len(site_info.devices), 3)
+        self.assertEqual(len(server.posted["site-0001"]), 1)
+        self.assertEqual(server.requests, 3)
+        # the requests share a keep-alive connection
+        self.assertEqual(server.connections, 1)
+
+    def test_pages(self):
+        """
+        test that outages retrieved in pages and from a date on are the
+        outages of a single request, in the same order
+        """
+        begin_from = "2021-06-01T00:00:00.000Z"
+        expected = [Outage.from_dict(outage) for outage in self.data.outages]
+        with StubServer(self.data) as server:
+            requester = Requester(server.url, server.api_key)
+            self.addCleanup(requester.close)
+            for page_size in (7, 10, 1000):
+                with self.subTest(page_size=page_size):
+                    service = OutageService(
+                        requester, page_size=page_size, page_workers=3)
+                    self.assertEqual(service.get_outages(), expected)
+                    self.assertEqual(
+                        service.get_outages(begin_from=begin_from),
+                        [
+                            outage for outage in expected
+                            if outage.begin >= begin_from
+                        ]
+                    )
+
+            self.assertEqual(
+                len(OutageService(requester).get_outages(
+                    begin_from=begin_from)),
+                len(server.get_outages(begin_from))
+            )
+
+            server.outage_queries.clear()
+            OutageService(
+                requester, page_size=7, page_workers=3).get_outages()
+
+        # 100 outages take 15 pages of 7, and the other workers ask for at
+        # most 2 pages after the last one
+        pages = [int(page) for _, page in server.outage_queries]
+        self.assertTrue(set(range(1, 16)).issubset(pages))
+        self.assertLessEqual(len(pages), 17)
+
+    def test_invalid_query(self):
+        """
+        test that outage requests with invalid params are answered with 400
+        """
+        invalid = [
+            {"page": "x", "page_size": "10"},
+            {"page": "1"},
+            {"page": "0", "page_size": "10"},
+            {"begin_from": "not a date"},
+            {"unknown": "1"},
+        ]
+        with StubServer(self.data) as server:
+            requester = Requester(server.url, server.api_key)
+            self.addCleanup(requester.close)
+            for params in invalid:
+                with self.subTest(params=params):
+                    with self.assertRaises(
+                        requests.exceptions.HTTPError
+                    ) as ctx:
+                        requester.get("outages", **params)
+                    self.assertEqual(
+                        ctx.exception.response.status_code, 400)
+
+    def test_api_key(self):
+        """
+        test that requests with a wrong api key are rejected with 403
+        """
+        with StubServer(self.data) as server:
+            service = self._get_service(server, api_key="wrong")
+            with self.assertRaises(requests.exceptions.HTTPError) as ctx:
+                service.get_outages()
+
+        self.assertEqual(ctx.exception.response.status_code, 403)
+
+    def test_not_found(self):
+        """
+        test that unknown sites are answered with 404
+        """
+        with StubServer(self.data) as server:
+            service = self._get_service(server)
+            with self.assertRaises(requests.exceptions.HTTPError) as ctx:
+                service.get_site_info("unknown")
+
+        self.assertEqual(ctx.exception.response.status_code, 404)
+
+    def test_invalid_post(self):
+        """
+        test that posts of malformed outages are answered with 400
+        """
+        with StubServer(self.data) as server:
+            service = self._get_service(server)
+            with self.assertRaises(requests.exceptions.HTTPError) as ctx:
+                service.post_outages_to_site("site-0000", [{"id": "d1"}])
+
+        self.assertEqual(ctx.exception.response.status_code, 400)
+        self.assertEqual(server.posted, {})
+
+    def test_error_bursts(self):
+        """
+        test that bursts of 500 are injected and retried by the requester
+        """
+        with StubServer(
+            self.data, error_burst_every=3, error_burst_length=1
+        ) as server:
+            service = self._get_service(server)
+            for _ in range(3):
+                service.get_site_info("site-0000")
+
+        # the third request fails and is retried
+        self.assertEqual(server.requests, 4)
+        self.assertEqual(server.errors, 1)
+
+    def test_timeout(self):
+        """
+        test that a response slower than the timeout fails the request
+        instead of blocking it
+        """
+        with StubServer(self.data, latency=1.0) as server:
+            service = self._get_service(server, max_retries=0, timeout=0.1)
+            started = time.monotonic()
+            with self.assertRaises(requests.exceptions.RequestException):
+                service.get_site_info("site-0000")
+
+        self.assertLess(time.monotonic() - started, 0.9)
+
+    def test_error_rate(self):
+        """
+        test that every request fails with an error rate of 1
+        """
+        with StubServer(self.data, error_rate=1.0) as server:
+            service = self._get_service(server, max_retries=1)
+            with self.assertRaises(requests.exceptions.RetryError):
+                service.get_site_info("site-0000")
+
+        self.assertEqual(server.errors, 2)
+
+    def test_error_status(self):
+        """
+        test that injected errors have the given status and Retry-After
+        """
+        with StubServer(
+            self.data, error_rate=1.0, error_status=429, retry_after="3"
+        ) as server:
+            res = requests.get(
+                server.url + "site-info/site-0000",
+                headers={"X-API-Key": server.api_key}
+            )
+
+        self.assertEqual(res.status_code, 429)
+        self.assertEqual(res.headers["Retry-After"], "3")
+
+    def test_conditional_get(self):
+        """
+        test that a matching If-None-Match is answered with 304
+        """
+        with StubServer(self.data) as server:
+            headers = {"X-API-Key": server.api_key}
+            with requests.Session() as session:
+                res = session.get(server.url + "outages", headers=headers)
+                headers["If-None-Match"] = res.headers["ETag"]
+                revalidated = session.get(
+                    server.url + "outages", headers=headers)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(revalidated.status_code, 304)
+
+    def test_compression(self):
+        """
+        test that gzipped responses and posts are decoded on both sides and
+        counted by the requester
+        """
+        outages = [{
+            "id": "d1",
+            "name": "Device 1",
+            "begin": "2022-01-01T00:00:00.000Z",
+            "end": "2022-01-02T00:00:00.000Z",
+        }] * 100
+        with StubServer(self.data, compress_responses=True) as server:
+            service = self._get_service(
+                server,
+                compression="gzip",
+                accept_encoding="gzip"
+            )
+            streamed = list(service.iter_outages())
+            parsed = service.get_outages()
+            service.post_outages_to_site("site-0001", outages)
+
+        self.assertEqual(streamed, parsed)
+        self.assertEqual(len(parsed), 100)
+        self.assertEqual(server.posted["site-0001"], outages)
+        self.assertLess(
+            server.bytes_received, server.bytes_received_decoded)
+        metrics = service.requester.transfer.get_metrics()
+        self.assertEqual(metrics["bytes_sent"], server.bytes_received)
+        self.assertGreater(metrics["bytes_saved_sent"], 0)
+        self.assertGreater(metrics["bytes_saved_received"], 0)
+        self.assertEqual(
+            metrics["bytes_received_decoded"],
+            2 * len(server.get_outages_body()[0])
+        )
+
+    def test_identity_encoding(self):
+        """
+        test that responses are not compressed when only identity is
+        accepted, and that transfers are counted when asked for
+        """
+        with StubServer(self.data, compress_responses=True) as server:
+            for accept_encoding, count_transfer in (
+                ("identity", True), ("gzip", False)
+            ):
+                with self.subTest(accept_encoding=accept_encoding):
+                    service = self._get_service(
+                        server,
+                        accept_encoding=accept_encoding,
+                        count_transfer=count_transfer
+                    )
+                    self.assertEqual(len(service.get_outages()), 100)
+                    metrics = service.requester.transfer.get_metrics()
+                    if count_transfer:
+                        self.assertGreater(metrics["bytes_received"], 0)
+                        self.assertEqual(metrics["bytes_saved_received"], 0)
+                    else:
+                        self.assertEqual(metrics["bytes_received"], 0)
+
+    def test_invalid_encoding(self):
+        """
+        test that posts with an unknown content encoding are answered with
+        400
+        """
+        with StubServer(self.data) as server:
+            res = requests.post(
+                server.url + "site-outages/site-0000",
+                data=b"[]",
+                headers={
+                    "X-API-Key": server.api_key,
+                    "Content-Encoding": "zip"
+                }
+            )
+
+        self.assertEqual(res.status_code, 400)
+        self.assertEqual(server.posted, {})
+
+    def test_codecs(self):
+        """
+        test that every available codec retrieves and posts the same data
+        """
+        outages = [{
+            "id": "d1",
+            "name": "Device 1",
+            "begin": "2022-01-01T00:00:00.000Z",
+            "end": "2022-01-02T00:00:00.000Z",
+        }]
+        expected = [Outage.from_dict(outage) for outage in self.data.outages]
+        for name in get_available_codecs():
+            with StubServer(self.data) as server:
+                service = self._get_service(server, codec=get_codec(name))
+                self.assertEqual(service.get_outages(), expected)
+                self.assertEqual(
+                    service.get_site_info("site-0001"),
+                    SiteInfo.from_dict(self.data.sites["site-0001"])
+                )
+                service.post_outages_to_site("site-0001", outages)
+            self.assertEqual(server.posted["site-0001"], outages)
@@ -0,0 +1,113 @@
+"""
+Unit tests for sync state
+"""
+
+import os
+import tempfile
+import unittest
+from datetime import datetime, timedelta, timezone
+
+from src.sync_state import SyncState
+
+OUTAGES = [
+    {
+        "id": "002b28fc",
+        "name": "Battery 1",
+        "begin": "2022-01-01T00:00:00.000Z",
+        "end": "2022-01-01T00:10:00.000Z"
+    },
+    {
+        "id": "086b0d53",
+        "name": "Battery 2",
+        "begin": "2022-01-05T12:00:00.000Z",
+        "end": "2022-01-05T13:00:00.000Z"
+    },
+]
+
+
+class TestSyncState(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "state.sqlite3")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_first_run(self):
+        """
+        test that without a watermark everything since the start date is new
+        """
+        with SyncState(self.path) as sync_state:
+            self.assertIsNone(sync_state.get_watermark("site"))
+            self.assertEqual(
+                sync_state.get_start_date("site", "2021-01-01T00:00:00.000Z"),
+                "2021-01-01T00:00:00.000Z"
+            )
+            self.assertListEqual(
+                sync_state.select_unposted("site", OUTAGES), OUTAGES)
+
+    def test_record_posted(self):
+        """
+        test that posted outages are skipped and the watermark survives
+        reopening the state
+        """
+        with SyncState(self.path, lookback=timedelta(hours=12)) as sync_state:
+            sync_state.record_posted("site", OUTAGES)
+
+        with SyncState(self.path, lookback=timedelta(hours=12)) as sync_state:
+            self.assertEqual(
+                sync_state.get_watermark("site"),
+                datetime(2022, 1, 5, 12, tzinfo=timezone.utc)
+            )
+            self.assertEqual(
+                sync_state.get_start_date("site", "2021-01-01T00:00:00.000Z"),
+                "2022-01-05T00:00:00.000Z"
+            )
+            self.assertEqual(
+                sync_state.get_start_date("site", "2022-01-05T06:00:00.000Z"),
+                "2022-01-05T06:00:00.000Z"
+            )
+            self.assertListEqual(
+                sync_state.select_unposted("site", OUTAGES[1:]), [])
+            self.assertListEqual(
+                sync_state.select_unposted("other_site", OUTAGES), OUTAGES)
+
+    def test_changed_and_new_outages(self):
+        """
+        test that outages whose end changed and new outages are selected
+        """
+        changed = dict(OUTAGES[1], end="2022-01-05T14:00:00.000Z")
+        new = dict(OUTAGES[1], begin="2022-01-06T00:00:00.000Z")
+
+        with SyncState(self.path) as sync_state:
+            sync_state.record_posted("site", OUTAGES)
+            self.assertListEqual(
+                sync_state.select_unposted(
+                    "site", [OUTAGES[1], changed, new]),
+                [changed, new]
+            )
+
+    def test_watermark_never_moves_back(self):
+        """
+        test that recording older outages keeps the watermark
+        """
+        with SyncState(self.path) as sync_state:
+            sync_state.record_posted("site", OUTAGES[1:])
+            sync_state.record_posted("site", OUTAGES[:1])
+
+            self.assertEqual(
+                sync_state.get_watermark("site"),
+                datetime(2022, 1, 5, 12, tzinfo=timezone.utc)
+            )
+
+    def test_ledger_is_pruned(self):
+        """
+        test that ledger entries older than the lookback window are dropped
+        """
+        with SyncState(self.path, lookback=timedelta(days=1)) as sync_state:
+            sync_state.record_posted("site", OUTAGES)
+            posted = sync_state._connection.execute(
+                "SELECT device_id FROM posted").fetchall()
+
+        self.assertListEqual(posted, [("086b0d53",)])
@@ -0,0 +1,264 @@
+"""
+Unit tests for throttle
+"""
+
+import threading
+import unittest
+from unittest import mock
+
+import requests
+
+from src.requester import Requester
+from src.stub_server import StubData, StubServer
+from src.throttle import AdaptiveConcurrencyLimiter, Throttle, TokenBucket
+
+
+def make_response(status_code, headers=None):
+    res = mock.Mock()
+    res.status_code = status_code
+    res.headers = headers or {}
+    return res
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestTokenBucket(unittest.TestCase):
+
+    def test_acquire_waits_for_tokens(self):
+        """
+        test that tokens beyond the burst are spaced by 1 / rate
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(10, burst=2, clock=clock, sleep=clock.sleep)
+
+        waits = [bucket.acquire() for _ in range(4)]
+
+        self.assertEqual(waits[:2], [0.0, 0.0])
+        self.assertAlmostEqual(waits[2], 0.1)
+        self.assertAlmostEqual(waits[3], 0.1)
+        self.assertAlmostEqual(clock.now, 0.2)
+
+    def test_acquire_refills_after_idle(self):
+        """
+        test that an idle bucket refills up to the burst
+        """
+        clock = FakeClock()
+        bucket = TokenBucket(1, burst=3, clock=clock, sleep=clock.sleep)
+        for _ in range(3):
+            bucket.acquire()
+
+        clock.now += 100
+
+        self.assertEqual([bucket.acquire() for _ in range(3)], [0.0] * 3)
+        self.assertAlmostEqual(bucket.acquire(), 1.0)
+
+
+class TestAdaptiveConcurrencyLimiter(unittest.TestCase):
+
+    def test_increase_and_decrease(self):
+        """
+        test that the limit grows after a window of successes and halves on
+        overload, within its bounds
+        """
+        limiter = AdaptiveConcurrencyLimiter(
+            initial_limit=4, min_limit=1, max_limit=5)
+
+        for _ in range(4):
+            limiter.acquire()
+            limiter.release()
+        self.assertEqual(limiter.limit, 4)
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release()
+        self.assertEqual(limiter.limit, 5)
+
+        for _ in range(5):
+            limiter.acquire()
+            limiter.release(overloaded=True)
+        self.assertEqual(limiter.limit, 1)
+
+    def test_acquire_blocks_at_limit(self):
+        """
+        test that acquire waits until a slot is released
+        """
+        limiter = AdaptiveConcurrencyLimiter(initial_limit=1)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def acquire():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=acquire)
+        thread.start()
+        self.assertFalse(acquired.wait(0.05))
+
+        limiter.release()
+        self.assertTrue(acquired.wait(1))
+        thread.join()
+
+
+class TestThrottle(unittest.TestCase):
+
+    def test_call_retries_retryable_statuses(self):
+        """
+        test that 429 and 503 responses are retried, honoring Retry-After
+        """
+        sleeps = []
+        throttle = Throttle(sleep=sleeps.append)
+        responses = [
+            make_response(429, {"Retry-After": "2"}),
+            make_response(503),
+            make_response(200),
+        ]
+        send = mock.Mock(side_effect=responses)
+
+        res = throttle.call(send)
+
+        self.assertIs(res, responses[-1])
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(sleeps[0], 2.0)
+        self.assertTrue(0 <= sleeps[1] <= 0.2)
+        metrics = throttle.get_metrics()
+        self.assertEqual(metrics["calls"], 1)
+        self.assertEqual(metrics["attempts"], 3)
+        self.assertEqual(metrics["retries"], 2)
+        self.assertEqual(metrics["throttled"], 1)
+        self.assertEqual(metrics["failures"], 0)
+        self.assertEqual(metrics["concurrency_limit"], 2)
+
+    def test_call_gives_up_after_max_retries(self):
+        """
+        test that the last retryable response is returned after max retries
+        """
+        throttle = Throttle(max_retries=2, sleep=lambda _: None)
+        send = mock.Mock(return_value=make_response(500))
+
+        res = throttle.call(send)
+
+        self.assertEqual(res.status_code, 500)
+        self.assertEqual(send.call_count, 3)
+        self.assertEqual(throttle.get_metrics()["failures"], 1)
+
+    def test_call_non_idempotent(self):
+        """
+        test that a non idempotent call is only retried on 429 and 503
+        """
+        throttle = Throttle(sleep=lambda _: None)
+        send = mock.Mock(return_value=make_response(500))
+
+        self.assertEqual(throttle.call(send, idempotent=False).status_code,
+                         500)
+        self.assertEqual(send.call_count, 1)
+        self.assertEqual(throttle.get_metrics()["failures"], 1)
+
+        send = mock.Mock(side_effect=[
+            make_response(429), make_response(503), make_response(200)])
+        self.assertEqual(throttle.call(send, idempotent=False).status_code,
+                         200)
+        self.assertEqual(send.call_count, 3)
+
+    def test_call_does_not_retry_client_errors(self):
+        """
+        test that statuses other than the retryable ones are returned as is
+        """
+        throttle = Throttle(sleep=lambda _: None)
+        send = mock.Mock(return_value=make_response(404))
+
+        self.assertEqual(throttle.call(send).status_code, 404)
+        self.assertEqual(send.call_count, 1)
+
+    def test_call_releases_slot_on_exception(self):
+        """
+        test that a connection error is raised and releases its slot
+        """
+        throttle = Throttle(initial_concurrency=1, sleep=lambda _: None)
+        send = mock.Mock(side_effect=requests.exceptions.ConnectionError)
+
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            throttle.call(send)
+
+        send.side_effect = None
+        send.return_value = make_response(200)
+        self.assertEqual(throttle.call(send).status_code, 200)
+        self.assertEqual(throttle.get_metrics()["failures"], 1)
+
+    @mock.patch("src.requester.requests.Session.get")
+    def test_requester_get(self, mock_get):
+        """
+        test that Requester sends get requests through the throttle
+        """
+        mock_get.side_effect = [
+            make_response(429, {"Retry-After": "0"}),
+            mock.Mock(status_code=200, **{"json.return_value": [1]}),
+        ]
+        throttle = Throttle(sleep=lambda _: None)
+        requester = Requester(
+            "https://fooapi:3333", "some_api_key", throttle=throttle)
+
+        self.assertEqual(requester.get("foo"), [1])
+        self.assertEqual(mock_get.call_count, 2)
+        mock_get.assert_called_with(
+            "https://fooapi:3333/foo",
+            headers={
+                'Accept': 'application/json',
+                'X-API-Key': 'some_api_key'
+            },
+            params={}
+        )
+        self.assertEqual(throttle.get_metrics()["retries"], 1)
+
+    def test_requester_get_retry_after(self):
+        """
+        test that 429 responses with Retry-After of a real server are
+        retried by the throttle, not by the connection pool
+        """
+        # requests 1 to 3 of every 4 are answered with 429
+        server = StubServer(
+            StubData.generate(n_outages=10),
+            error_burst_every=4,
+            error_burst_length=3,
+            error_status=429,
+            retry_after="0"
+        )
+        throttle = Throttle(adaptive=True, sleep=lambda _: None)
+        with server, Requester(
+            server.url, server.api_key, throttle=throttle
+        ) as requester:
+            requester.get("site-info/site-0000")
+            site = requester.get("site-info/site-0000")
+
+        self.assertEqual(site["id"], "site-0000")
+        self.assertEqual(server.requests, 5)
+        metrics = throttle.get_metrics()
+        self.assertEqual(metrics["attempts"], 5)
+        self.assertEqual(metrics["retries"], 3)
+        self.assertEqual(metrics["throttled"], 3)
+        self.assertLess(metrics["concurrency_limit"], 4)
+
+    def test_requester_post_not_retried_on_500(self):
+        """
+        test that a post answered with 500 is sent only once
+        """
+        server = StubServer(StubData.generate(n_outages=10), error_rate=1)
+        throttle = Throttle(sleep=lambda _: None)
+        with server, Requester(
+            server.url, server.api_key, throttle=throttle
+        ) as requester:
+            with self.assertRaises(requests.exceptions.HTTPError):
+                requester.post("site-outages/site-0000", [])
+
+        self.assertEqual(server.requests, 1)
+        self.assertEqual(throttle.get_metrics()["failures"], 1)